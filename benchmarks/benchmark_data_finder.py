@@ -0,0 +1,184 @@
+"""Benchmark finding input data in a synthetic CMIP6 directory tree.
+
+The tree follows the BADC directory structure for CMIP6. The time needed to
+find the data for a recipe-like set of variables is measured, both with the
+compiled template matcher used by ESMValCore and with the previous approach
+of globbing every combination of facets and walking the matching
+directories.
+
+Run with e.g.
+
+    python benchmarks/benchmark_data_finder.py --files 1000000
+"""
+import argparse
+import fnmatch
+import glob
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+import esmvalcore._config
+from esmvalcore._data_finder import (_replace_tags, get_input_filelists,
+                                     select_files)
+
+DRS = {'CMIP6': 'BADC'}
+TEMPLATE = ('CMIP/{institute}/{dataset}/{exp}/{ensemble}/{mip}/{short_name}/'
+            '{grid}/v20190101/{filename}')
+MIPS = ('Amon', 'Omon', 'Lmon', 'day')
+EXPS = ('historical', 'ssp126', 'ssp245', 'ssp370', 'ssp585')
+
+
+def create_tree(root, n_files):
+    """Create a CMIP6 directory tree with about `n_files` empty files."""
+    n_datasets = max(1, round((n_files / 1e6)**(1 / 3) * 20))
+    n_ensembles = max(1, round((n_files / 1e6)**(1 / 3) * 10))
+    n_variables = max(1, round((n_files / 1e6)**(1 / 3) * 25))
+    n_per_dir = max(
+        1, n_files //
+        (n_datasets * n_ensembles * n_variables * len(MIPS) * len(EXPS)))
+    facets = {
+        'dataset': [f'MODEL-{i}' for i in range(n_datasets)],
+        'exp': EXPS,
+        'ensemble': [f'r{i + 1}i1p1f1' for i in range(n_ensembles)],
+        'mip': MIPS,
+        'short_name': [f'var{i}' for i in range(n_variables)],
+    }
+    years_per_file = -(-250 // n_per_dir)
+    count = 0
+    for values in itertools.product(*facets.values()):
+        variable = dict(zip(facets, values))
+        variable['institute'] = 'INST-' + variable['dataset']
+        variable['grid'] = 'gn'
+        variable['filename'] = ''
+        dirname = os.path.join(root, TEMPLATE.format(**variable))
+        os.makedirs(dirname)
+        for i in range(n_per_dir):
+            start = 1850 + i * years_per_file
+            end = start + years_per_file - 1
+            filename = ('{short_name}_{mip}_{dataset}_{exp}_{ensemble}_gn_'
+                        '{start}01-{end}12.nc'.format(start=start,
+                                                      end=end,
+                                                      **variable))
+            with open(os.path.join(dirname, filename), 'w'):
+                pass
+            count += 1
+    return facets, count
+
+
+def get_variables(facets):
+    """Get variables similar to those in a large recipe."""
+    variables = []
+    for dataset in facets['dataset']:
+        for short_name in facets['short_name'][:5]:
+            for mip in facets['mip'][:2]:
+                variables.append({
+                    'activity': 'CMIP',
+                    'dataset': dataset,
+                    'institute': 'INST-' + dataset,
+                    'project': 'CMIP6',
+                    'exp': ['historical', 'ssp585'],
+                    'ensemble': facets['ensemble'],
+                    'mip': mip,
+                    'short_name': short_name,
+                    'grid': 'gn',
+                    'frequency': 'mon',
+                    'start_year': 1950,
+                    'end_year': 2050,
+                })
+    return variables
+
+
+def find_files_glob_walk(variables, rootpath):
+    """Find files by globbing each combination of facets and walking."""
+    cfg = esmvalcore._config.CFG['CMIP6']
+    results = []
+    for variable in variables:
+        template = cfg['input_dir'][DRS['CMIP6']].replace(
+            '{latestversion}', 'v20190101')
+        dirnames = []
+        for dirname in _replace_tags(template, variable):
+            for base_path in rootpath['CMIP6']:
+                dirnames.extend(glob.glob(os.path.join(base_path, dirname)))
+        files = []
+        for dirname in dirnames:
+            for path, _, filenames in os.walk(dirname, followlinks=True):
+                for pattern in _replace_tags(cfg['input_file'], variable):
+                    files.extend(
+                        os.path.join(path, f)
+                        for f in fnmatch.filter(filenames, pattern))
+        files = select_files(files, variable['start_year'],
+                             variable['end_year'])
+        results.append(files)
+    return results
+
+
+class ScandirCounter:
+    """Count the number of directories listed using :func:`os.scandir`."""
+
+    def __init__(self):
+        self.count = 0
+        self._scandir = os.scandir
+
+    def __call__(self, *args, **kwargs):
+        """Call :func:`os.scandir`."""
+        self.count += 1
+        return self._scandir(*args, **kwargs)
+
+    def __enter__(self):
+        """Start counting."""
+        os.scandir = self
+        return self
+
+    def __exit__(self, *_):
+        """Stop counting."""
+        os.scandir = self._scandir
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files',
+                        type=int,
+                        default=1000000,
+                        help="Approximate number of files in the tree.")
+    parser.add_argument('--root', help="Use or create the tree here.")
+    args = parser.parse_args()
+
+    esmvalcore._config.CFG.update(
+        esmvalcore._config.read_config_developer_file())
+
+    root = args.root or tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        facets, count = create_tree(root, args.files)
+        print(f"Created {count} files in {root} in "
+              f"{time.perf_counter() - start:.1f} s")
+
+        variables = get_variables(facets)
+        rootpath = {'CMIP6': [root]}
+
+        start = time.perf_counter()
+        with ScandirCounter() as counter:
+            reference = find_files_glob_walk(variables, rootpath)
+        print(f"glob and walk: found {sum(map(len, reference))} files for "
+              f"{len(variables)} variables in "
+              f"{time.perf_counter() - start:.2f} s, listing "
+              f"{counter.count} directories")
+
+        start = time.perf_counter()
+        with ScandirCounter() as counter:
+            results = get_input_filelists(variables, rootpath, DRS)
+        print(f"compiled templates: found "
+              f"{sum(len(r[0]) for r in results)} files for "
+              f"{len(variables)} variables in "
+              f"{time.perf_counter() - start:.2f} s, listing "
+              f"{counter.count} directories")
+    finally:
+        if not args.root:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Benchmark recipe initialisation for large ensembles.
+
+A recipe deriving a variable from two input variables is set up for an
+increasing number of ensemble members. The total time needed to create the
+tasks is measured, as well as the time spent matching the input products
+to the derived variables with :func:`esmvalcore._recipe._match_products`.
+For small ensembles, the matching is also timed with the previous
+approach of scoring every product against every variable.
+
+Run with e.g.
+
+    python benchmarks/benchmark_recipe.py --datasets 10 100 1000 10000
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from textwrap import dedent
+
+import yaml
+
+import esmvalcore._recipe
+from esmvalcore._config import read_config_user_file
+
+RECIPE = dedent("""
+    documentation:
+      description: Benchmark recipe.
+      authors:
+        - andela_bouwe
+
+    preprocessors:
+      derive:
+        annual_statistics:
+          operator: mean
+
+    diagnostics:
+      diagnostic_name:
+        variables:
+          lwp:
+            preprocessor: derive
+            derive: true
+            force_derivation: true
+            project: CMIP6
+            mip: Amon
+            exp: historical
+            grid: gn
+            start_year: 2000
+            end_year: 2001
+            additional_datasets:
+              - {{dataset: UKESM1-0-LL, ensemble: "r(1:{n})i1p1f2"}}
+        scripts: null
+    """)
+
+
+def match_products_scoring(products, variables):
+    """Match products to variables by scoring all attributes."""
+    grouped_products = {}
+
+    def get_matching(attributes):
+        score = 0
+        filenames = []
+        for variable in variables:
+            filename = variable['filename']
+            tmp = sum(v == variable.get(k) for k, v in attributes.items())
+            if tmp > score:
+                score = tmp
+                filenames = [filename]
+            elif tmp == score:
+                filenames.append(filename)
+        return filenames
+
+    for product in products:
+        for filename in get_matching(product.attributes):
+            grouped_products.setdefault(filename, []).append(product)
+    return grouped_products
+
+
+class Timer:
+    """Measure the time spent in a function."""
+
+    def __init__(self, function):
+        self.function = function
+        self.seconds = 0.
+
+    def __call__(self, *args, **kwargs):
+        """Call the function."""
+        start = time.perf_counter()
+        result = self.function(*args, **kwargs)
+        self.seconds += time.perf_counter() - start
+        return result
+
+
+def create_files(root, n_datasets):
+    """Create empty input files for all ensemble members."""
+    for short_name in ('clwvi', 'clivi'):
+        for i in range(n_datasets):
+            filename = (f'{short_name}_Amon_UKESM1-0-LL_historical_'
+                        f'r{i + 1}i1p1f2_gn_200001-200112.nc')
+            with open(os.path.join(root, filename), 'w'):
+                pass
+
+
+def initialize_recipe(tmp_dir, n_datasets, match_products):
+    """Initialize the recipe and return the timings."""
+    input_dir = os.path.join(tmp_dir, 'input')
+    os.makedirs(input_dir)
+    create_files(input_dir, n_datasets)
+
+    config_file = os.path.join(tmp_dir, 'config-user.yml')
+    with open(config_file, 'w') as file:
+        yaml.safe_dump(
+            {
+                'output_dir': os.path.join(tmp_dir, 'output'),
+                'rootpath': {
+                    'default': input_dir
+                },
+                'cache_dir': None,
+            }, file)
+    recipe_file = os.path.join(tmp_dir, 'recipe_benchmark.yml')
+    with open(recipe_file, 'w') as file:
+        file.write(RECIPE.format(n=n_datasets))
+    config_user = read_config_user_file(config_file, 'recipe_benchmark')
+    config_user['synda_download'] = False
+
+    timer = Timer(match_products)
+    esmvalcore._recipe._match_products = timer
+    start = time.perf_counter()
+    esmvalcore._recipe.read_recipe_file(recipe_file, config_user)
+    return time.perf_counter() - start, timer.seconds
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--datasets',
+                        type=int,
+                        nargs='+',
+                        default=[10, 100, 1000, 10000],
+                        help="Numbers of ensemble members to benchmark.")
+    parser.add_argument('--max-scoring',
+                        type=int,
+                        default=1000,
+                        help="Largest ensemble to match by scoring.")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    match_products = esmvalcore._recipe._match_products
+    implementations = {'indexed': match_products}
+    implementations['scoring'] = match_products_scoring
+    for n_datasets in args.datasets:
+        for name, function in implementations.items():
+            if name == 'scoring' and n_datasets > args.max_scoring:
+                continue
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                total, matching = initialize_recipe(tmp_dir, n_datasets,
+                                                    function)
+            finally:
+                esmvalcore._recipe._match_products = match_products
+                shutil.rmtree(tmp_dir)
+            print(f"{n_datasets:6d} datasets, {name} matching: recipe "
+                  f"initialised in {total:.2f} s, of which matching "
+                  f"{matching:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Persistent caches for information read from input files or data."""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+
+import dask.array as da
+import numpy as np
+
+from ._config import CFG_USER
+
+logger = logging.getLogger(__name__)
+
+
+def get_file_identity(filename):
+    """Get the identity of a file: its path, size and modification time.
+
+    Returns None if the file does not exist.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+
+
+def get_array_fingerprint(array):
+    """Get a fingerprint of the values and the mask of an array.
+
+    Lazy arrays are identified by the name of their computation, which
+    depends on the paths of the files the data are read from and the
+    operations applied, but not on the contents of the files.
+
+    Parameters
+    ----------
+    array: numpy.ndarray or dask.array.Array or None
+        An array.
+
+    Returns
+    -------
+        tuple or str or None: A hashable fingerprint of the array.
+    """
+    if array is None:
+        return None
+    if isinstance(array, da.Array):
+        return array.name
+    digest = hashlib.sha1(np.ascontiguousarray(np.ma.getdata(array)))
+    if np.ma.is_masked(array):
+        digest.update(np.ascontiguousarray(np.ma.getmaskarray(array)))
+    return (array.shape, array.dtype.str, digest.hexdigest())
+
+
+class FileCache:
+    """Cache for information derived from files.
+
+    Values are stored by file identity (see :func:`get_file_identity`), so
+    they are invalidated automatically when a file is modified. Values are
+    kept in memory and, if ``cache_dir`` is set in the user configuration
+    file, also stored in an SQLite database in that directory so they can
+    be reused in later runs.
+
+    Parameters
+    ----------
+    name: str
+        Name of the cache, used as the name of the database file.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_id = None
+
+    def __repr__(self):
+        """Get a string representation of the cache."""
+        return "{}({!r})".format(type(self).__name__, self.name)
+
+    def _get_connection(self):
+        """Get a connection to the database, or None if not configured."""
+        cache_dir = CFG_USER.get('cache_dir')
+        if not cache_dir:
+            return None
+        filename = os.path.join(cache_dir, self.name + '.sqlite')
+        # Connections cannot be shared with forked processes
+        connection_id = (filename, os.getpid())
+        if connection_id != self._connection_id:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                connection = sqlite3.connect(filename,
+                                             timeout=60,
+                                             check_same_thread=False)
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (path TEXT PRIMARY KEY, "
+                    "size INTEGER, mtime INTEGER, value BLOB)")
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Unable to use cache %s: %s", filename, exc)
+                return None
+            self._connection = connection
+            self._connection_id = connection_id
+        return self._connection
+
+    def get_many(self, filenames):
+        """Get the cached values for `filenames`.
+
+        Returns
+        -------
+        dict
+            The cached values by filename, files without a (valid) cached
+            value are not included.
+        """
+        identities = {}
+        for filename in filenames:
+            identity = get_file_identity(filename)
+            if identity is not None:
+                identities[filename] = identity
+
+        result = {}
+        with self._lock:
+            missing = {}
+            for filename, identity in identities.items():
+                if identity in self._memory:
+                    result[filename] = self._memory[identity]
+                else:
+                    missing[identity[0]] = filename
+            connection = self._get_connection() if missing else None
+            if connection is not None:
+                paths = list(missing)
+                for i in range(0, len(paths), 500):
+                    chunk = paths[i:i + 500]
+                    query = ("SELECT path, size, mtime, value FROM cache "
+                             "WHERE path IN ({})".format(', '.join(
+                                 '?' * len(chunk))))
+                    cursor = connection.execute(query, chunk)
+                    for path, size, mtime, value in cursor:
+                        filename = missing[path]
+                        identity = identities[filename]
+                        if identity == (path, size, mtime):
+                            value = pickle.loads(value)
+                            self._memory[identity] = value
+                            result[filename] = value
+        return result
+
+    def get(self, filename, default=None):
+        """Get the cached value for `filename`."""
+        return self.get_many([filename]).get(filename, default)
+
+    def set_many(self, items):
+        """Store values in the cache.
+
+        Parameters
+        ----------
+        items: iterable(tuple)
+            Pairs of (filename, value).
+        """
+        rows = []
+        with self._lock:
+            for filename, value in items:
+                identity = get_file_identity(filename)
+                if identity is None:
+                    continue
+                self._memory[identity] = value
+                rows.append(identity + (pickle.dumps(value), ))
+            connection = self._get_connection() if rows else None
+            if connection is not None:
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT OR REPLACE INTO cache "
+                            "(path, size, mtime, value) VALUES (?, ?, ?, ?)",
+                            rows)
+                except sqlite3.Error as exc:
+                    logger.warning("Unable to update cache %s: %s", self.name,
+                                   exc)
+
+    def set(self, filename, value):
+        """Store the value for `filename` in the cache."""
+        self.set_many([(filename, value)])
+
+
+class DiskCache:
+    """Cache for values identified by a key, e.g. a fingerprint of data.
+
+    Values are pickled to a file per key in a subdirectory of ``cache_dir``,
+    if that is set in the user configuration file.
+
+    Parameters
+    ----------
+    name: str
+        Name of the cache, used as the name of the subdirectory.
+    option: str, optional
+        Name of a user configuration option that also needs to be set to
+        use the cache.
+    """
+
+    def __init__(self, name, option=None):
+        self.name = name
+        self.option = option
+
+    def __repr__(self):
+        """Get a string representation of the cache."""
+        return "{}({!r})".format(type(self).__name__, self.name)
+
+    def _get_filename(self, key):
+        """Get the file storing the value for `key`, or None."""
+        cache_dir = CFG_USER.get('cache_dir')
+        if not cache_dir or (self.option and not CFG_USER.get(self.option)):
+            return None
+        return os.path.join(cache_dir, self.name, key + '.pickle')
+
+    def get(self, key, default=None):
+        """Get the cached value for `key`."""
+        filename = self._get_filename(key)
+        if filename is None or not os.path.exists(filename):
+            return default
+        try:
+            with open(filename, 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logger.warning("Unable to read cache file %s: %s", filename, exc)
+            return default
+
+    def set(self, key, value):
+        """Store the value for `key` in the cache."""
+        filename = self._get_filename(key)
+        if filename is None:
+            return
+        # Write to a temporary file first, so other processes never read a
+        # partially written file.
+        tmp_filename = '{}.{}'.format(filename, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(tmp_filename, 'wb') as file:
+                pickle.dump(value, file)
+            os.replace(tmp_filename, filename)
+        except OSError as exc:
+            logger.warning("Unable to write cache file %s: %s", filename,
+                           exc)
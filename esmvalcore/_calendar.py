@@ -0,0 +1,93 @@
+"""Calendar aware operations on arrays of time points."""
+import cf_units
+import numpy as np
+
+_DAYS_PER_MONTH = {
+    '365_day': [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    '366_day': [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    '360_day': [30] * 12,
+}
+_CALENDAR_ALIASES = {
+    'noleap': '365_day',
+    'all_leap': '366_day',
+    'gregorian': 'standard',
+}
+# Dates from this day onwards are identical in the standard and the
+# proleptic gregorian calendar.
+_GREGORIAN_START = np.datetime64('1582-10-15', 'D')
+
+
+def _from_fixed_length(ref, days, calendar):
+    """Get year, month and day for a calendar without leap years."""
+    days_per_month = np.array(_DAYS_PER_MONTH[calendar])
+    start_of_month = np.concatenate([[0], np.cumsum(days_per_month)])
+    days_per_year = start_of_month[-1]
+    ordinal = (ref.year * days_per_year + start_of_month[ref.month - 1] +
+               ref.day - 1 + days)
+    years, day_of_year = np.divmod(ordinal, days_per_year)
+    months = np.searchsorted(start_of_month, day_of_year, side='right')
+    days = day_of_year - start_of_month[months - 1] + 1
+    return years, months, days
+
+
+def _from_datetime64(ref, days):
+    """Get year, month and day for the proleptic gregorian calendar."""
+    dates = (np.datetime64('{:04d}-{:02d}-{:02d}'.format(
+        ref.year, ref.month, ref.day), 'D') + days.astype('timedelta64[D]'))
+    months = dates.astype('datetime64[M]')
+    return (
+        dates.astype('datetime64[Y]').astype(np.int64) + 1970,
+        months.astype(np.int64) % 12 + 1,
+        (dates - months).astype(np.int64) + 1,
+        dates,
+    )
+
+
+def get_time_components(points, units):
+    """Convert time points to integer calendar components.
+
+    The conversion is done on whole arrays at once, without creating a
+    date object for every time point, except for dates in the julian
+    calendar or before the start of the gregorian calendar.
+
+    Parameters
+    ----------
+    points: array_like
+        Time points.
+    units: cf_units.Unit
+        Time reference units of the points, including the calendar.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Year, month, day and seconds since the start of the day of each
+        time point, rounded to whole seconds.
+    """
+    calendar = units.calendar or 'standard'
+    calendar = _CALENDAR_ALIASES.get(calendar, calendar)
+    ref = units.num2date(0)
+    days_units = cf_units.Unit(
+        'days since {:04d}-{:02d}-{:02d}'.format(ref.year, ref.month,
+                                                 ref.day),
+        calendar=units.calendar,
+    )
+    points = np.asarray(points, dtype=np.float64)
+    seconds = np.round(units.convert(points, days_units) * 86400)
+    days, seconds = np.divmod(seconds.astype(np.int64), 86400)
+
+    if calendar in _DAYS_PER_MONTH:
+        years, months, days = _from_fixed_length(ref, days, calendar)
+        return years, months, days, seconds
+    if calendar in ('standard', 'proleptic_gregorian') and ref.year > 0:
+        years, months, days_, dates = _from_datetime64(ref, days)
+        if (calendar == 'proleptic_gregorian' or not dates.size
+                or dates.min() >= _GREGORIAN_START):
+            return years, months, days_, seconds
+
+    dates = days_units.num2date(days)
+    return (
+        np.array([d.year for d in dates], dtype=np.int64),
+        np.array([d.month for d in dates], dtype=np.int64),
+        np.array([d.day for d in dates], dtype=np.int64),
+        seconds,
+    )
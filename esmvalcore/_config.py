@@ -7,6 +7,7 @@ import time
 
 import yaml
 
+from .cmor._fixes.fix import register_package as register_fix_package
 from .cmor.table import read_cmor_tables, CMOR_TABLES
 
 logger = logging.getLogger(__name__)
@@ -48,6 +49,12 @@ def read_config_user_file(config_file, recipe_name):
         'profile_diagnostic': False,
         'config_developer_file': None,
         'drs': {},
+        'data_index': None,
+        'cache_dir': os.path.join('~', '.esmvaltool', 'cache'),
+        'cache_climatologies': False,
+        'cache_area_weights': False,
+        'provenance_database': False,
+        'fix_packages': [],
     }
 
     for key in defaults:
@@ -62,6 +69,11 @@ def read_config_user_file(config_file, recipe_name):
 
     cfg['config_developer_file'] = _normalize_path(
         cfg['config_developer_file'])
+    cfg['data_index'] = _normalize_path(cfg['data_index'])
+    cfg['cache_dir'] = _normalize_path(cfg['cache_dir'])
+
+    for package in cfg['fix_packages']:
+        register_fix_package(package)
 
     for key in cfg['rootpath']:
         root = cfg['rootpath'][key]
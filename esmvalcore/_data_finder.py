@@ -6,45 +6,94 @@
 
 import fnmatch
 import logging
+import multiprocessing
 import os
 import re
-import glob
+import threading
 
+import cf_units
 import iris
+import numpy as np
+from netCDF4 import Dataset
 
+from ._cache import FileCache
 from ._config import get_project_config
 
 logger = logging.getLogger(__name__)
 
+_TIME_RANGE_CACHE = FileCache('time_ranges')
+_READ_LOCK = threading.Lock()
 
-def find_files(dirnames, filenames):
+
+class DirectoryTree:
+    """Cached view of the directory tree.
+
+    Each directory is listed at most once, so finding the input files for
+    many variables using the same :class:`DirectoryTree` does not scan
+    any directory more than once.
+    """
+
+    def __init__(self):
+        self._listings = {}
+        self._isdir = {}
+
+    def listdir(self, path):
+        """Return the names of the subdirectories and files in `path`."""
+        if path not in self._listings:
+            dirs = []
+            files = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                        else:
+                            files.append(entry.name)
+            except OSError:
+                pass
+            self._listings[path] = (dirs, files)
+        return self._listings[path]
+
+    def isdir(self, path):
+        """Return True if `path` is a directory."""
+        parent, name = os.path.split(path)
+        if parent in self._listings:
+            return name in self._listings[parent][0]
+        if path not in self._isdir:
+            self._isdir[path] = os.path.isdir(path)
+        return self._isdir[path]
+
+    def walk(self, top):
+        """Walk the tree below `top` like :func:`os.walk` following links."""
+        dirs, files = self.listdir(top)
+        yield top, dirs, files
+        for name in dirs:
+            yield from self.walk(os.path.join(top, name))
+
+
+def find_files(dirnames, filenames, tree=None):
     """Find files matching filenames in dirnames."""
     logger.debug("Looking for files matching %s in %s", filenames, dirnames)
+    if not filenames:
+        return []
+    if tree is None:
+        tree = DirectoryTree()
+    pattern = re.compile('|'.join(fnmatch.translate(f) for f in filenames))
 
     result = []
     for dirname in dirnames:
-        for path, _, files in os.walk(dirname, followlinks=True):
-            for filename in filenames:
-                matches = fnmatch.filter(files, filename)
-                result.extend(os.path.join(path, f) for f in matches)
+        for path, _, files in tree.walk(dirname):
+            result.extend(
+                os.path.join(path, f) for f in files if pattern.match(f))
 
     return result
 
 
-def get_start_end_year(filename):
-    """Get the start and end year from a file name.
-
-    This works for filenames matching
+def _get_start_end_year_from_name(filename):
+    """Get the start and end year from a file name only.
 
-    *[-,_]YYYY*[-,_]YYYY*.*
-      or
-    *[-,_]YYYY*.*
-      or
-    YYYY*[-,_]*.*
-      or
-    YYYY*[-,_]YYYY*[-,_]*.*
-      or
-    YYYY*[-,_]*[-,_]YYYY*.* (Does this make sense? Is this worth catching?)
+    Returns ``(None, None)`` if the file name does not match any of the
+    patterns described in :func:`get_start_end_year`.
     """
     name = os.path.splitext(filename)[0]
 
@@ -76,39 +125,156 @@ def get_start_end_year(filename):
         end_year = start_year
     elif len(dates) == 2:
         start_year, end_year = int(dates[0][:4]), int(dates[1][:4])
-    else:
-        # Slower than just parsing the name
+    return start_year, end_year
+
+
+def _find_time_variable(dataset):
+    """Find the time variable in a :class:`netCDF4.Dataset`."""
+    for variable in dataset.variables.values():
+        if getattr(variable, 'standard_name', None) == 'time':
+            return variable
+    return dataset.variables.get('time')
+
+
+def _load_start_end_year(filename):
+    """Get the start and end year by loading a file with iris."""
+    try:
+        cubes = iris.load(filename)
+    except OSError:
+        raise ValueError('File {0} can not be read'.format(filename))
+
+    for cube in cubes:
+        logger.debug(cube)
         try:
-            cubes = iris.load(filename)
-        except OSError:
-            raise ValueError('File {0} can not be read'.format(filename))
+            time = cube.coord('time')
+        except iris.exceptions.CoordinateNotFoundError:
+            continue
+        return time.cell(0).point.year, time.cell(-1).point.year
+    return None, None
 
-        for cube in cubes:
-            logger.debug(cube)
-            try:
-                time = cube.coord('time')
-            except iris.exceptions.CoordinateNotFoundError:
-                continue
-            start_year = time.cell(0).point.year
-            end_year = time.cell(-1).point.year
-            break
 
+def _read_start_end_year(filename):
+    """Read the start and end year from the time variable in a file.
+
+    Only the first and last value of the time variable and its units and
+    calendar are read from NetCDF files, other files are loaded with iris.
+    """
+    try:
+        dataset = Dataset(filename, 'r')
+    except OSError:
+        return _load_start_end_year(filename)
+
+    with dataset:
+        time = _find_time_variable(dataset)
+        if (time is None or time.ndim != 1 or time.size == 0
+                or not hasattr(time, 'units')):
+            return None, None
+        unit = cf_units.Unit(time.units,
+                             calendar=getattr(time, 'calendar', None))
+        points = np.array([time[0], time[-1]], dtype=np.float64)
+    start, end = unit.num2date(points)
+    return start.year, end.year
+
+
+def _check_start_end_year(filename, start_year, end_year):
     if start_year is None or end_year is None:
         raise ValueError(
             'File {0} dates do not match a recognized pattern and time can '
             'not be read from the file'.format(filename)
         )
+
+
+def get_start_end_year(filename):
+    """Get the start and end year from a file name.
+
+    This works for filenames matching
+
+    *[-,_]YYYY*[-,_]YYYY*.*
+      or
+    *[-,_]YYYY*.*
+      or
+    YYYY*[-,_]*.*
+      or
+    YYYY*[-,_]YYYY*[-,_]*.*
+      or
+    YYYY*[-,_]*[-,_]YYYY*.* (Does this make sense? Is this worth catching?)
+
+    For other files, the years are read from the time coordinate in the file
+    and cached, see :func:`get_start_end_years`.
+    """
+    start_year, end_year = _get_start_end_year_from_name(filename)
+    if start_year is None or end_year is None:
+        # Slower than just parsing the name
+        years = _TIME_RANGE_CACHE.get(filename)
+        if years is None:
+            # The netCDF library is not thread-safe
+            with _READ_LOCK:
+                years = _read_start_end_year(filename)
+            _TIME_RANGE_CACHE.set(filename, years)
+        start_year, end_year = years
+
+    _check_start_end_year(filename, start_year, end_year)
     return start_year, end_year
 
 
-def select_files(filenames, start_year, end_year):
+def get_start_end_years(filenames, processes=None):
+    """Get the start and end year of many files.
+
+    Like :func:`get_start_end_year`, but files that need to be read are
+    read in parallel using at most `processes` processes. Outside of the
+    main thread, they are read one by one.
+
+    Returns
+    -------
+    dict
+        The tuple (start_year, end_year) by filename.
+    """
+    years = {}
+    unresolved = []
+    for filename in filenames:
+        start_year, end_year = _get_start_end_year_from_name(filename)
+        if start_year is None or end_year is None:
+            unresolved.append(filename)
+        else:
+            years[filename] = (start_year, end_year)
+
+    years.update(_TIME_RANGE_CACHE.get_many(unresolved))
+    unresolved = list(dict.fromkeys(f for f in unresolved if f not in years))
+    if unresolved:
+        logger.debug("Reading time range from files:\n%s",
+                     '\n'.join(unresolved))
+        # Daemonic processes, e.g. the ones running tasks, cannot have
+        # children. Forking from the threads that look up input files is
+        # not safe either, so those read the files one by one.
+        if (len(unresolved) > 1
+                and not multiprocessing.current_process().daemon
+                and threading.current_thread() is threading.main_thread()):
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_read_start_end_year, unresolved)
+        else:
+            # The netCDF library is not thread-safe
+            with _READ_LOCK:
+                results = [_read_start_end_year(f) for f in unresolved]
+        _TIME_RANGE_CACHE.set_many(zip(unresolved, results))
+        years.update(zip(unresolved, results))
+
+    for filename in filenames:
+        _check_start_end_year(filename, *years[filename])
+    return {filename: years[filename] for filename in filenames}
+
+
+def select_files(filenames, start_year, end_year, data_index=None):
     """Select files containing data between start_year and end_year.
 
     This works for filenames matching *_YYYY*-YYYY*.* or *_YYYY*.*
     """
+    if data_index is None:
+        years = get_start_end_years(filenames)
+    else:
+        years = {f: data_index.get_start_end_year(f) for f in filenames}
     selection = []
     for filename in filenames:
-        start, end = get_start_end_year(filename)
+        start, end = years[filename]
         if start <= end_year and end >= start_year:
             selection.append(filename)
     return selection
@@ -168,23 +334,154 @@ def _apply_caps(original, lower, upper):
     return original
 
 
-def _resolve_latestversion(dirname_template):
-    """Resolve the 'latestversion' tag."""
-    if '{latestversion}' not in dirname_template:
-        return dirname_template
+_GLOB_TOKENS = re.compile(r'(\*|\?|\[!?\]?[^\]]*\])')
+
+
+def _glob_to_regex(text):
+    """Translate a glob pattern for a single path component to a regex."""
+    result = []
+    for i, part in enumerate(_GLOB_TOKENS.split(text)):
+        if i % 2 == 0:
+            result.append(re.escape(part))
+        elif part == '*':
+            result.append('.*')
+        elif part == '?':
+            result.append('.')
+        elif part.startswith('[!'):
+            result.append('[^' + part[2:])
+        else:
+            result.append(part)
+    return ''.join(result)
+
+
+def _get_tag_values(tag, variable):
+    """Get the values of a tag, with the capitalization applied."""
+    name, lower, upper = _get_caps_options(tag)
+    if name not in variable:
+        raise KeyError("Dataset key {} must be specified for {}, check "
+                       "your recipe entry".format(name, variable))
+    values = variable[name]
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    return [_apply_caps(str(value), lower, upper) for value in values]
+
 
-    # Find latest version
-    part1, part2 = dirname_template.split('{latestversion}')
-    part2 = part2.lstrip(os.sep)
-    if os.path.exists(part1):
-        versions = os.listdir(part1)
-        versions.sort(reverse=True)
-        for version in ['latest'] + versions:
-            dirname = os.path.join(part1, version, part2)
-            if os.path.isdir(dirname):
-                return dirname
+def _tag_to_regex(tag, variable):
+    """Translate a tag to a regex matching any of its values."""
+    values = _get_tag_values(tag, variable)
+    if not values:
+        return '(?!)'
+    return '(?:{})'.format('|'.join(_glob_to_regex(v) for v in values))
 
-    return dirname_template
+
+def _get_literal_names(component, variable):
+    """Get the directory names a template component can expand to.
+
+    Returns None if the component contains glob patterns or the
+    'latestversion' tag, so the names can only be found by listing the
+    parent directory.
+    """
+    names = ['']
+    for i, part in enumerate(re.split(r'{([^}]*)}', component)):
+        if i % 2 == 0:
+            values = [part]
+        elif part == 'latestversion':
+            return None
+        else:
+            values = _get_tag_values(part, variable)
+        if any(_GLOB_TOKENS.search(value) for value in values):
+            return None
+        names = [name + value for name in names for value in values]
+    return tuple(sorted(set(names)))
+
+
+def _compile_template(template, variable):
+    """Compile a path template from the config-developer file.
+
+    Instead of a path for each combination of the values of the tags, as
+    returned by :func:`_replace_tags`, this returns a single regex for the
+    full path and, for pruning the search, a description of each path
+    component: a tuple of directory names if the component can only take
+    a few literal values, a regex if it contains glob patterns or None for
+    the 'latestversion' tag.
+    """
+    template = template.strip('/')
+    components = []
+    full_regex = []
+    groups = {}
+    for component in template.split('/') if template else []:
+        if component == '{latestversion}':
+            components.append(None)
+            full_regex.extend(['[^/]+', '/'])
+            continue
+        component_regex = []
+        for i, part in enumerate(re.split(r'{([^}]*)}', component)):
+            if i % 2 == 0:
+                component_regex.append(_glob_to_regex(part))
+                full_regex.append(_glob_to_regex(part))
+            elif part == 'latestversion':
+                component_regex.append('.*')
+                full_regex.append('[^/]*')
+            else:
+                regex = _tag_to_regex(part, variable)
+                component_regex.append(regex)
+                # The same tag should have the same value everywhere
+                if part in groups:
+                    full_regex.append('(?P={})'.format(groups[part]))
+                else:
+                    groups[part] = 'tag{}'.format(len(groups))
+                    full_regex.append('(?P<{}>{})'.format(
+                        groups[part], regex))
+        names = _get_literal_names(component, variable)
+        if names is None:
+            components.append(re.compile(''.join(component_regex)))
+        else:
+            components.append(names)
+        full_regex.append('/')
+    if full_regex:
+        full_regex.pop()
+    return components, re.compile(''.join(full_regex))
+
+
+def _match_dirs(tree, base_path, components, path=''):
+    """Find the directories below `base_path` that match `components`."""
+    if not components:
+        return [path]
+
+    component = components[0]
+    matches = []
+    if isinstance(component, tuple):
+        # Like glob, check for literal names without listing the directory
+        for name in component:
+            subpath = os.path.join(path, name)
+            if tree.isdir(os.path.join(base_path, subpath)):
+                matches.extend(
+                    _match_dirs(tree, base_path, components[1:], subpath))
+        return matches
+
+    dirs, _ = tree.listdir(os.path.join(base_path, path))
+    if component is None:
+        # Resolve the 'latestversion' tag: use 'latest' if available or
+        # else the last version containing matching directories.
+        versions = sorted(dirs, reverse=True)
+        if 'latest' in dirs:
+            versions.insert(0, 'latest')
+        for version in versions:
+            matches = _match_dirs(tree, base_path, components[1:],
+                                  os.path.join(path, version))
+            if matches:
+                return matches
+        return []
+
+    for name in dirs:
+        # Like glob, only match hidden directories if explicitly requested
+        if name.startswith('.') and not component.pattern.startswith(r'\.'):
+            continue
+        if component.fullmatch(name):
+            matches.extend(
+                _match_dirs(tree, base_path, components[1:],
+                            os.path.join(path, name)))
+    return matches
 
 
 def _select_drs(input_type, drs, project):
@@ -212,26 +509,39 @@ def get_rootpath(rootpath, project):
     raise KeyError('default rootpath must be specified in config-user file')
 
 
-def _find_input_dirs(variable, rootpath, drs):
+def _find_input_dirs(variable, rootpath, drs, data_index=None, tree=None):
     """Return a the full paths to input directories."""
     project = variable['project']
 
     root = get_rootpath(rootpath, project)
     path_template = _select_drs('input_dir', drs, project)
+    components, regex = _compile_template(path_template, variable)
+    if tree is None:
+        tree = DirectoryTree()
 
     dirnames = []
-    for dirname_template in _replace_tags(path_template, variable):
-        for base_path in root:
-            dirname = os.path.join(base_path, dirname_template)
-            dirname = _resolve_latestversion(dirname)
-            matches = glob.glob(dirname)
-            matches = [match for match in matches if os.path.isdir(match)]
-            if matches:
-                for match in matches:
-                    logger.debug("Found %s", match)
-                    dirnames.append(match)
-            else:
-                logger.debug("Skipping non-existent %s", dirname)
+    for base_path in root:
+        if data_index is not None and data_index.covers(base_path):
+            matches = []
+            for dirname_template in _replace_tags(path_template, variable):
+                dirname = os.path.join(base_path, dirname_template)
+                dirname = data_index.resolve_latestversion(dirname)
+                matches.extend(data_index.glob(dirname))
+        elif os.path.isdir(base_path):
+            matches = [
+                os.path.join(base_path, path)
+                for path in _match_dirs(tree, base_path, components)
+                if regex.fullmatch(path)
+            ]
+        else:
+            matches = []
+        if matches:
+            for match in matches:
+                logger.debug("Found %s", match)
+                dirnames.append(match)
+        else:
+            logger.debug("No directories matching %s in %s", regex.pattern,
+                         base_path)
 
     return dirnames
 
@@ -243,28 +553,92 @@ def _get_filenames_glob(variable, drs):
     return filenames_glob
 
 
-def _find_input_files(variable, rootpath, drs):
-    input_dirs = _find_input_dirs(variable, rootpath, drs)
+def _find_input_files(variable, rootpath, drs, data_index=None, tree=None):
+    input_dirs = _find_input_dirs(variable, rootpath, drs, data_index, tree)
     filenames_glob = _get_filenames_glob(variable, drs)
-    files = find_files(input_dirs, filenames_glob)
+    if data_index is None:
+        files = find_files(input_dirs, filenames_glob, tree=tree)
+    else:
+        files = data_index.find_files(input_dirs, filenames_glob)
 
     return (files, input_dirs, filenames_glob)
 
 
-def get_input_filelist(variable, rootpath, drs):
-    """Return the full path to input files."""
-    # change ensemble to fixed r0i0p0 for fx variables
+def set_fx_ensemble(variable):
+    """Change the ensemble to the fixed r0i0p0 for CMIP5 fx variables."""
     # this is needed and is not a duplicate effort
-    if variable['project'] == 'CMIP5' and variable['frequency'] == 'fx':
+    if (variable.get('project') == 'CMIP5'
+            and variable.get('frequency') == 'fx'):
         variable['ensemble'] = 'r0i0p0'
-    (files, dirnames, filenames) = _find_input_files(variable, rootpath, drs)
+
+
+def _freeze(value):
+    """Make a facet value hashable."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def get_input_key(variable, drs):
+    """Return the facets that determine the input files of `variable`.
+
+    Variables with the same key have the same input files, so the key can
+    be used to avoid looking up the same files more than once.
+    """
+    project = variable.get('project')
+    facets = {
+        'project', 'frequency', 'start_year', 'end_year', 'dataset', 'mip',
+        'ensemble', 'exp', 'short_name'
+    }
+    for input_type in ('input_dir', 'input_file'):
+        try:
+            template = _select_drs(input_type, drs, project)
+        except (KeyError, ValueError):
+            continue
+        for tag in re.findall(r'{([^}]*)}', template):
+            facets.add(_get_caps_options(tag)[0])
+    facets.discard('latestversion')
+    return tuple(
+        (facet, _freeze(variable.get(facet))) for facet in sorted(facets))
+
+
+def get_input_filelist(variable, rootpath, drs, data_index=None, tree=None):
+    """Return the full path to input files.
+
+    If `data_index` (a :class:`esmvalcore._data_index.DataIndex`) is given,
+    it is used instead of the filesystem for the rootpaths it covers.
+    Directory listings are taken from `tree` (a :class:`DirectoryTree`)
+    if given.
+    """
+    set_fx_ensemble(variable)
+    (files, dirnames, filenames) = _find_input_files(variable, rootpath, drs,
+                                                     data_index, tree)
     # do time gating only for non-fx variables
     if variable['frequency'] != 'fx':
         files = select_files(files, variable['start_year'],
-                             variable['end_year'])
+                             variable['end_year'], data_index)
     return (files, dirnames, filenames)
 
 
+def get_input_filelists(variables, rootpath, drs, data_index=None):
+    """Return the full path to input files for many variables.
+
+    The directories are scanned only once for all variables.
+
+    Returns
+    -------
+    list
+        The result of :func:`get_input_filelist` for each variable.
+    """
+    tree = DirectoryTree()
+    return [
+        get_input_filelist(variable, rootpath, drs, data_index, tree)
+        for variable in variables
+    ]
+
+
 def get_output_file(variable, preproc_dir):
     """Return the full path to the output (preprocessed) file."""
     cfg = get_project_config(variable['project'])
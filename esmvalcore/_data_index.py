@@ -0,0 +1,396 @@
+"""Persistent filesystem index for finding input data.
+
+The index is an SQLite database that stores the directories and files found
+below the configured rootpaths, together with the start and end year parsed
+from each file name. It is built and refreshed with the ``esmvaltool_index``
+command and used by the data finder instead of walking the filesystem when
+the ``data_index`` option is set in the user configuration file.
+"""
+import argparse
+import fnmatch
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ._config import read_config_user_file
+from ._data_finder import (_get_start_end_year_from_name, find_files,
+                           get_start_end_year)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, dirname TEXT, name TEXT,
+    start_year INTEGER, end_year INTEGER);
+CREATE INDEX IF NOT EXISTS files_dirname ON files (dirname);
+"""
+
+_DATA_INDEXES = {}
+
+
+def _subtree(path):
+    """Return the bounds of all paths below `path` for a range query."""
+    # '0' is the character directly following os.sep in ASCII
+    return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+def _match_path(path, pattern):
+    """Match `path` against the glob `pattern` like :func:`glob.glob`."""
+    names = path.split(os.sep)
+    patterns = pattern.split(os.sep)
+    if len(names) != len(patterns):
+        return False
+    for name, pat in zip(names, patterns):
+        if name.startswith('.') and not pat.startswith('.'):
+            return False
+        if not fnmatch.fnmatchcase(name, pat):
+            return False
+    return True
+
+
+def _scan_dir(path, known_mtime):
+    """Scan a single directory.
+
+    Returns the modification time and, if it differs from `known_mtime`,
+    the subdirectories and files in the directory.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None, None, None
+    if mtime == known_mtime:
+        return path, mtime, None, None
+
+    dirs = []
+    files = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.is_symlink() and _is_loop(entry.path):
+                        logger.warning("Skipping symlink loop %s", entry.path)
+                        continue
+                    dirs.append(entry.path)
+                else:
+                    files.append(entry.name)
+    except OSError as exc:
+        logger.warning("Unable to scan %s: %s", path, exc)
+        return path, None, None, None
+    return path, mtime, dirs, files
+
+
+def _is_loop(path):
+    """Check if the symlinked directory `path` points to one of its parents."""
+    target = os.path.realpath(path)
+    parent = os.path.realpath(os.path.dirname(path))
+    return parent == target or parent.startswith(target + os.sep)
+
+
+class DataIndex:
+    """Index of the directories and files below a set of rootpaths.
+
+    Parameters
+    ----------
+    filename: str
+        Path to the SQLite database holding the index. It is created if it
+        does not exist.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._roots = self._get_roots()
+
+    def __repr__(self):
+        """Get a string representation of the index."""
+        return "{}({!r})".format(type(self).__name__, self.filename)
+
+    def _get_roots(self):
+        cursor = self._connection.execute("SELECT path FROM roots")
+        return sorted(row[0] for row in cursor)
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+    def covers(self, path):
+        """Check if `path` is located below an indexed rootpath."""
+        path = os.path.normpath(path)
+        return any(path == root or path.startswith(root + os.sep)
+                   for root in self._roots)
+
+    def _children(self, path):
+        cursor = self._connection.execute(
+            "SELECT path FROM dirs WHERE parent = ?", (path, ))
+        return [row[0] for row in cursor]
+
+    def _remove(self, path):
+        """Remove directory `path` and everything below it from the index."""
+        start, end = _subtree(path)
+        self._connection.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+            (path, start, end))
+        self._connection.execute(
+            "DELETE FROM files "
+            "WHERE dirname = ? OR (dirname >= ? AND dirname < ?)",
+            (path, start, end))
+
+    def _store(self, path, mtime, files):
+        """Store directory `path` and the files it contains."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO dirs (path, parent, mtime) "
+            "VALUES (?, ?, ?)", (path, os.path.dirname(path), mtime))
+        self._connection.execute("DELETE FROM files WHERE dirname = ?",
+                                 (path, ))
+        self._connection.executemany(
+            "INSERT INTO files (path, dirname, name, start_year, end_year) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((os.path.join(path, name), path, name) +
+             _get_start_end_year_from_name(name) for name in files))
+
+    def update(self, rootpaths, max_workers=None, rebuild=False):
+        """Add or refresh the index for the directories in `rootpaths`.
+
+        Only directories whose modification time changed since the
+        previous update are listed again, all other directories only
+        need a single ``stat`` call. Directories are scanned in parallel
+        using `max_workers` threads.
+
+        Parameters
+        ----------
+        rootpaths: list(str)
+            Directories to index.
+        max_workers: int, optional
+            Maximum number of threads used for scanning.
+        rebuild: bool, optional
+            Discard the existing index for `rootpaths` and build it from
+            scratch.
+        """
+        rootpaths = list(
+            dict.fromkeys(os.path.normpath(path) for path in rootpaths))
+        with self._lock, ThreadPoolExecutor(max_workers) as executor:
+            if rebuild:
+                for root in rootpaths:
+                    self._remove(root)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO roots (path) VALUES (?)",
+                ((root, ) for root in rootpaths))
+
+            n_dirs = n_scanned = 0
+            level = [root for root in rootpaths if os.path.isdir(root)]
+            for root in set(rootpaths) - set(level):
+                logger.warning("Rootpath %s does not exist", root)
+                self._remove(root)
+            while level:
+                known = [self._get_mtime(path) for path in level]
+                next_level = []
+                for path, mtime, dirs, files in executor.map(
+                        _scan_dir, level, known):
+                    n_dirs += 1
+                    if mtime is None:
+                        self._remove(path)
+                    elif dirs is None:
+                        next_level.extend(self._children(path))
+                    else:
+                        n_scanned += 1
+                        for removed in set(self._children(path)) - set(dirs):
+                            self._remove(removed)
+                        self._store(path, mtime, files)
+                        next_level.extend(dirs)
+                self._connection.commit()
+                level = next_level
+            self._roots = self._get_roots()
+
+        logger.info("Checked %s directories, %s of which were (re)scanned",
+                    n_dirs, n_scanned)
+
+    def _get_mtime(self, path):
+        row = self._connection.execute(
+            "SELECT mtime FROM dirs WHERE path = ?", (path, )).fetchone()
+        return None if row is None else row[0]
+
+    def _isdir(self, path):
+        with self._lock:
+            return self._get_mtime(os.path.normpath(path)) is not None
+
+    def resolve_latestversion(self, dirname_template):
+        """Resolve the 'latestversion' tag using the index."""
+        if '{latestversion}' not in dirname_template:
+            return dirname_template
+
+        part1, part2 = dirname_template.split('{latestversion}')
+        part2 = part2.lstrip(os.sep)
+        with self._lock:
+            versions = [
+                os.path.basename(path)
+                for path in self._children(os.path.normpath(part1))
+            ]
+        versions.sort(reverse=True)
+        for version in ['latest'] + versions:
+            dirname = os.path.join(part1, version, part2)
+            if self._isdir(dirname):
+                return dirname
+
+        return dirname_template
+
+    def glob(self, pattern):
+        """Return the indexed directories matching `pattern`."""
+        suffix = os.sep if pattern.endswith(os.sep) else ''
+        pattern = os.path.normpath(pattern)
+        if not any(char in pattern for char in '*?['):
+            return [pattern + suffix] if self._isdir(pattern) else []
+
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT path FROM dirs WHERE path GLOB ?",
+                (pattern.replace('[!', '[^'), ))
+            paths = [row[0] for row in cursor]
+        return sorted(path + suffix for path in paths
+                      if _match_path(path, pattern))
+
+    def find_files(self, dirnames, filenames):
+        """Find files matching filenames in dirnames.
+
+        This is equivalent to :func:`esmvalcore._data_finder.find_files`,
+        but uses the index for the directories it covers.
+        """
+        result = []
+        for dirname in dirnames:
+            if not self.covers(dirname):
+                result.extend(find_files([dirname], filenames))
+                continue
+            path = os.path.normpath(dirname)
+            start, end = _subtree(path)
+            with self._lock:
+                cursor = self._connection.execute(
+                    "SELECT dirname, name FROM files "
+                    "WHERE dirname = ? OR (dirname >= ? AND dirname < ?) "
+                    "ORDER BY dirname", (path, start, end))
+                files = {}
+                for subdir, name in cursor:
+                    files.setdefault(subdir, []).append(name)
+            for subdir, names in files.items():
+                # Use the same prefix as os.walk would
+                subdir = dirname + subdir[len(path):]
+                for filename in filenames:
+                    matches = fnmatch.filter(names, filename)
+                    result.extend(os.path.join(subdir, f) for f in matches)
+        return result
+
+    def get_start_end_year(self, filename):
+        """Get the start and end year of a file.
+
+        The years parsed from the file name are stored in the index. If the
+        file name does not contain the years, they are read from the file
+        and stored in the index for later use.
+        """
+        path = os.path.normpath(filename)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT start_year, end_year FROM files WHERE path = ?",
+                (path, )).fetchone()
+        if row is not None and None not in row:
+            return tuple(row)
+
+        start_year, end_year = get_start_end_year(filename)
+        if row is not None:
+            with self._lock:
+                self._connection.execute(
+                    "UPDATE files SET start_year = ?, end_year = ? "
+                    "WHERE path = ?", (start_year, end_year, path))
+                self._connection.commit()
+        return start_year, end_year
+
+
+def get_data_index(filename):
+    """Get the index stored in `filename`.
+
+    Returns None if `filename` is None or the index has not been built yet.
+    """
+    if not filename:
+        return None
+    if filename not in _DATA_INDEXES:
+        if not os.path.exists(filename):
+            logger.warning(
+                "Data index %s does not exist, searching the filesystem "
+                "instead. Run 'esmvaltool_index' to create it.", filename)
+            return None
+        _DATA_INDEXES[filename] = DataIndex(filename)
+    return _DATA_INDEXES[filename]
+
+
+def get_args():
+    """Define the `esmvaltool_index` command line."""
+    parser = argparse.ArgumentParser(
+        description="Build or refresh the index of the input data rootpaths "
+        "that is used for finding data if 'data_index' is set in the user "
+        "configuration file.")
+    parser.add_argument(
+        'projects',
+        nargs='*',
+        help="Only index the rootpaths of these projects, e.g. CMIP6. "
+        "By default, all rootpaths are indexed.")
+    parser.add_argument(
+        '-c',
+        '--config-file',
+        default=os.path.join(os.path.dirname(__file__), 'config-user.yml'),
+        help='Config file')
+    parser.add_argument(
+        '-j',
+        '--max-workers',
+        type=int,
+        help="Number of threads used to scan the filesystem.")
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help="Discard the existing index and scan all directories again.")
+    return parser.parse_args()
+
+
+def main(args):
+    """Define the `esmvaltool_index` program."""
+    config_file = os.path.abspath(
+        os.path.expandvars(os.path.expanduser(args.config_file)))
+    cfg = read_config_user_file(config_file, 'data_index')
+    if not cfg['data_index']:
+        raise ValueError(
+            "Please set 'data_index' in the configuration file {}".format(
+                config_file))
+
+    projects = args.projects or list(cfg['rootpath'])
+    rootpaths = []
+    for project in projects:
+        if project not in cfg['rootpath']:
+            raise ValueError("No rootpath configured for project {}".format(
+                project))
+        if project == 'RAWOBS':
+            continue
+        for path in cfg['rootpath'][project]:
+            if path not in rootpaths:
+                rootpaths.append(path)
+
+    logger.info("Updating index %s for rootpaths:\n%s", cfg['data_index'],
+                '\n'.join(rootpaths))
+    index = DataIndex(cfg['data_index'])
+    try:
+        index.update(rootpaths,
+                     max_workers=args.max_workers,
+                     rebuild=args.rebuild)
+    finally:
+        index.close()
+
+
+def run():
+    """Run the `esmvaltool_index` program."""
+    logging.basicConfig(format="%(asctime)s [%(process)d] %(levelname)-8s "
+                        "%(name)s,%(lineno)s\t%(message)s",
+                        level=logging.INFO)
+    main(get_args())
@@ -97,6 +97,12 @@ def get_args():
         '--diagnostics',
         nargs='*',
         help="Only run the named diagnostics from the recipe.")
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help="Set up the recipe without running it and write a plan with "
+        "the input files and estimated resource usage of each task to "
+        "plan.json in the run directory.")
     args = parser.parse_args()
     return args
 
@@ -143,6 +149,7 @@ def main(args):
         for pattern in args.diagnostics or ()
     }
     cfg['synda_download'] = args.synda_download
+    cfg['dry_run'] = args.dry_run
     for limit in ('max_datasets', 'max_years'):
         value = getattr(args, limit)
         if value is not None:
@@ -202,8 +209,15 @@ def process_recipe(recipe_file, config_user):
     recipe = read_recipe_file(recipe_file, config_user)
     logger.debug("Recipe summary:\n%s", recipe)
 
-    # run
-    recipe.run()
+    if config_user.get('dry_run'):
+        # plan, only imported when needed to keep starting up fast
+        from ._plan import write_plan
+        write_plan(recipe.tasks,
+                   os.path.join(config_user['run_dir'], 'plan.json'),
+                   max_parallel_tasks=config_user['max_parallel_tasks'])
+    else:
+        # run
+        recipe.run()
 
     # End time timing
     timestamp2 = datetime.datetime.utcnow()
@@ -0,0 +1,502 @@
+"""Plan the tasks in a recipe without running them.
+
+The plan lists the input files of each preprocessor task and estimates
+the shape and size of the data after each preprocessor step, the peak
+memory needed to run the task and the volume of the output files. The
+shape of the input data is read from the file headers only.
+"""
+import copy
+import json
+import logging
+import math
+import multiprocessing
+import os
+
+import numpy as np
+from netCDF4 import Dataset
+
+from ._cache import FileCache
+from ._data_finder import get_start_end_year
+from ._task import get_flattened_tasks
+from .preprocessor import MULTI_MODEL_FUNCTIONS, PreprocessingTask
+from .preprocessor._regrid import parse_cell_spec
+
+logger = logging.getLogger(__name__)
+
+_VARIABLES_CACHE = FileCache('variables')
+
+_AXES = {
+    'time': 'T',
+    't': 'T',
+    'latitude': 'Y',
+    'lat': 'Y',
+    'rlat': 'Y',
+    'j': 'Y',
+    'y': 'Y',
+    'longitude': 'X',
+    'lon': 'X',
+    'rlon': 'X',
+    'i': 'X',
+    'x': 'X',
+    'air_pressure': 'Z',
+    'plev': 'Z',
+    'lev': 'Z',
+    'depth': 'Z',
+    'olevel': 'Z',
+    'alevel': 'Z',
+    'height': 'Z',
+    'altitude': 'Z',
+}
+
+
+def _get_axis(dataset, dim):
+    """Get the axis (T, Z, Y or X) of a dimension, or None if unknown."""
+    variable = dataset.variables.get(dim)
+    axis = getattr(variable, 'axis', None)
+    if axis in ('T', 'Z', 'Y', 'X'):
+        return axis
+    standard_name = getattr(variable, 'standard_name', None)
+    return _AXES.get(standard_name, _AXES.get(dim.lower()))
+
+
+def _read_variables(filename):
+    """Read the dimensions and data type of the variables in a file."""
+    variables = {}
+    if os.path.splitext(filename)[1].lower() != '.nc':
+        return variables
+    try:
+        dataset = Dataset(filename, 'r')
+    except OSError as exc:
+        logger.warning("Unable to read %s: %s", filename, exc)
+        return variables
+
+    with dataset:
+        for name, variable in dataset.variables.items():
+            if name in dataset.dimensions:
+                continue
+            dtype = variable.dtype
+            if hasattr(variable, 'scale_factor') or hasattr(
+                    variable, 'add_offset'):
+                dtype = np.float32
+            variables[name] = {
+                'shape': [[
+                    _get_axis(dataset, dim),
+                    len(dataset.dimensions[dim]),
+                ] for dim in variable.dimensions],
+                'dtype': np.dtype(dtype).name,
+            }
+    return variables
+
+
+def read_variables(filenames, processes=None):
+    """Read the dimensions and data type of the variables in many files.
+
+    The results are cached, files that have not been read before are read
+    in parallel using at most `processes` processes.
+
+    Returns
+    -------
+    dict
+        For each filename, the shape and data type by variable name.
+    """
+    variables = _VARIABLES_CACHE.get_many(filenames)
+    unresolved = list(dict.fromkeys(f for f in filenames
+                                    if f not in variables))
+    if unresolved:
+        logger.debug("Reading variables from files:\n%s",
+                     '\n'.join(unresolved))
+        # Daemonic processes, e.g. the ones running tasks, cannot have
+        # children.
+        if len(unresolved) > 1 and not multiprocessing.current_process(
+        ).daemon:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_read_variables, unresolved)
+        else:
+            results = [_read_variables(f) for f in unresolved]
+        _VARIABLES_CACHE.set_many(zip(unresolved, results))
+        variables.update(zip(unresolved, results))
+    return {f: copy.deepcopy(variables.get(f, {})) for f in filenames}
+
+
+def _select_variable(variables, short_name):
+    """Select the description of variable `short_name` from a file."""
+    if short_name in variables:
+        return variables[short_name]
+    # Assume the variable with the most data is the one we need
+    candidates = sorted(
+        variables.values(),
+        key=lambda v: np.prod([n for _, n in v['shape']], dtype=np.int64))
+    return candidates[-1] if candidates else None
+
+
+def _get_size(shape, dtype):
+    """Get the size in bytes of an array."""
+    count = np.prod([n for _, n in shape], dtype=np.int64)
+    return int(count) * np.dtype(dtype).itemsize
+
+
+def _get_length(shape, axis):
+    """Get the length of `axis`, or None if the shape does not have it."""
+    for name, length in shape:
+        if name == axis:
+            return length
+    return None
+
+
+def _set_length(shape, axis, length):
+    """Set the length of `axis`, dropping the axis if `length` is None."""
+    if length is None:
+        return [d for d in shape if d[0] != axis]
+    return [[name, length if name == axis else size] for name, size in shape]
+
+
+def _get_years(settings, attributes):
+    """Get the number of years covered by the data."""
+    if 'extract_time' in settings:
+        return max(
+            1, settings['extract_time']['end_year'] -
+            settings['extract_time']['start_year'])
+    if 'start_year' in attributes and 'end_year' in attributes:
+        return attributes['end_year'] - attributes['start_year'] + 1
+    return None
+
+
+def _limit_time(shape, per_year, years):
+    """Limit the length of the time axis to `per_year` times `years`."""
+    length = _get_length(shape, 'T')
+    if length is None or years is None:
+        return shape
+    return _set_length(shape, 'T',
+                       min(length, max(1, math.ceil(per_year * years))))
+
+
+def _regrid_shape(shape, target_grid):
+    """Get the shape after regridding to `target_grid`."""
+    if isinstance(target_grid, str) and os.path.isfile(target_grid):
+        variables = read_variables([target_grid])[target_grid]
+        target = _select_variable(variables, None)
+        if target is None:
+            return shape
+        lengths = {
+            axis: _get_length(target['shape'], axis)
+            for axis in ('Y', 'X')
+        }
+    else:
+        try:
+            dlon, dlat = parse_cell_spec(target_grid)
+        except (TypeError, ValueError):
+            return shape
+        lengths = {'Y': int(180 / dlat), 'X': int(360 / dlon)}
+    for axis, length in lengths.items():
+        if length is not None and _get_length(shape, axis) is not None:
+            shape = _set_length(shape, axis, length)
+    return shape
+
+
+def _extract_region_shape(shape, settings):
+    """Get the shape after extracting a region."""
+    fractions = {
+        'Y': (settings['end_latitude'] - settings['start_latitude']) / 180.,
+        'X': ((settings['end_longitude'] - settings['start_longitude']) %
+              360.) / 360.,
+    }
+    for axis, fraction in fractions.items():
+        length = _get_length(shape, axis)
+        if length is not None and fraction > 0:
+            shape = _set_length(shape, axis,
+                                max(1, math.ceil(length * fraction)))
+    return shape
+
+
+def _extract_levels_shape(shape, settings):
+    """Get the shape after extracting levels."""
+    levels = settings['levels']
+    if isinstance(levels, (int, float)):
+        levels = [levels]
+    if isinstance(levels, (list, tuple)):
+        return _set_length(shape, 'Z', len(levels))
+    return shape
+
+
+def _extract_trajectory_shape(shape, settings):
+    """Get the shape after extracting a trajectory."""
+    shape = _set_length(shape, 'Y', None)
+    shape = _set_length(shape, 'X', settings.get('number_points', 2))
+    return [[None if name == 'X' else name, size] for name, size in shape]
+
+
+def _extract_transect_shape(shape, settings):
+    """Get the shape after extracting a transect."""
+    for axis, key in (('Y', 'latitude'), ('X', 'longitude')):
+        if isinstance(settings.get(key), (int, float)):
+            shape = _set_length(shape, axis, None)
+    return shape
+
+
+def _climate_statistics_shape(shape, settings):
+    """Get the shape after computing climate statistics."""
+    period = settings.get('period', 'full')
+    per_period = {
+        'season': 4,
+        'seasonal': 4,
+        'month': 12,
+        'monthly': 12,
+        'mon': 12,
+        'day': 366,
+        'daily': 366,
+    }
+    if period in per_period:
+        return _limit_time(shape, per_period[period], 1)
+    return _set_length(shape, 'T', None)
+
+
+def _drop(*axes):
+    """Get a function that drops `axes` from the shape."""
+    def drop(shape, _):
+        for axis in axes:
+            shape = _set_length(shape, axis, None)
+        return shape
+
+    return drop
+
+
+def _scale_time(fraction):
+    """Get a function that scales the length of the time axis."""
+    def scale(shape, _):
+        length = _get_length(shape, 'T')
+        if length is None:
+            return shape
+        return _set_length(shape, 'T', max(1, math.ceil(length * fraction)))
+
+    return scale
+
+
+# Preprocessor steps that change the shape of the data, the other steps
+# are assumed to leave it unchanged.
+_SHAPE_CHANGES = {
+    'extract_season': _scale_time(3 / 12),
+    'extract_month': _scale_time(1 / 12),
+    'extract_levels': _extract_levels_shape,
+    'regrid': lambda shape, s: _regrid_shape(shape, s['target_grid']),
+    'extract_region': _extract_region_shape,
+    'extract_trajectory': _extract_trajectory_shape,
+    'extract_transect': _extract_transect_shape,
+    'depth_integration': _drop('Z'),
+    'area_statistics': _drop('Y', 'X'),
+    'volume_statistics': _drop('Z', 'Y', 'X'),
+    'zonal_statistics': _drop('X'),
+    'meridional_statistics': _drop('Y'),
+    'climate_statistics': _climate_statistics_shape,
+}
+
+# Number of time points per year after temporal statistics
+_TIME_STATISTICS = {
+    'daily_statistics': 366,
+    'monthly_statistics': 12,
+    'seasonal_statistics': 4,
+    'annual_statistics': 1,
+    'decadal_statistics': 0.1,
+}
+
+
+class _Planner:
+    """Estimate the resources needed by the preprocessor tasks."""
+
+    def __init__(self, tasks):
+        self.tasks = get_flattened_tasks(tasks)
+        self._products = {}
+        filenames = [
+            filename for task in self.tasks
+            if isinstance(task, PreprocessingTask) for product in task.products
+            for filename in product.files if os.path.isfile(filename)
+        ]
+        self._variables = read_variables(filenames)
+
+    def _get_input(self, product):
+        """Get the shape and data type of the input data of `product`."""
+        ancestors = [
+            self._products[a.filename] for a in product._ancestors
+            if a.filename in self._products
+        ]
+        if ancestors:
+            # Input from other preprocessor tasks, e.g. for derivation
+            largest = max(ancestors, key=lambda p: p['output_size'])
+            return largest['steps'][-1]['shape'], largest['steps'][-1][
+                'dtype'], None
+
+        short_name = product.attributes.get('short_name')
+        shape = None
+        dtype = 'float32'
+        file_years = 0
+        for filename in product.files:
+            variable = _select_variable(self._variables.get(filename, {}),
+                                        short_name)
+            if variable is None:
+                continue
+            dtype = variable['dtype']
+            if shape is None:
+                shape = variable['shape']
+            else:
+                # Files are concatenated along the time axis, if known
+                length = _get_length(shape, 'T')
+                file_length = _get_length(variable['shape'], 'T')
+                if length is not None and file_length is not None:
+                    shape = _set_length(shape, 'T', length + file_length)
+            try:
+                start_year, end_year = get_start_end_year(filename)
+            except ValueError:
+                continue
+            file_years += end_year - start_year + 1
+        return shape, dtype, file_years
+
+    def _plan_product(self, product, order):
+        """Estimate the data size after each preprocessor step."""
+        settings = product.settings
+        shape, dtype, file_years = self._get_input(product)
+        steps = []
+        input_size = sum(
+            os.path.getsize(f) for f in product.files if os.path.isfile(f))
+        if shape is not None:
+            years = _get_years(settings, product.attributes)
+            for step in order[order.index('load'):]:
+                if step not in settings:
+                    continue
+                step_settings = settings[step]
+                if step == 'extract_time' and file_years:
+                    length = _get_length(shape, 'T')
+                    if length is not None:
+                        shape = _set_length(
+                            shape, 'T',
+                            min(length,
+                                math.ceil(length * years / file_years)))
+                elif step in _TIME_STATISTICS:
+                    shape = _limit_time(shape, _TIME_STATISTICS[step], years)
+                elif step in _SHAPE_CHANGES:
+                    shape = _SHAPE_CHANGES[step](shape, step_settings)
+                steps.append({
+                    'step': step,
+                    'shape': shape,
+                    'dtype': dtype,
+                    'size': _get_size(shape, dtype),
+                })
+        plan = {
+            'filename': product.filename,
+            'input_files': list(product.files),
+            'input_size': input_size,
+            'steps': steps,
+            'peak_memory': 2 * max((s['size'] for s in steps), default=0),
+            'output_size': steps[-1]['size'] if steps else 0,
+        }
+        self._products[product.filename] = plan
+        return plan
+
+    def _plan_preprocessing_task(self, task):
+        """Estimate the resources needed by a preprocessor task."""
+        products = [
+            self._plan_product(p, task.order)
+            for p in sorted(task.products, key=lambda p: p.filename)
+        ]
+        peak_memory = max((p['peak_memory'] for p in products), default=0)
+        output_size = sum(p['output_size'] for p in products)
+
+        # Multi-model steps keep the data of all products in memory
+        for step in MULTI_MODEL_FUNCTIONS:
+            sizes = [
+                s['size'] for p in products for s in p['steps']
+                if s['step'] == step
+            ]
+            if sizes:
+                peak_memory = max(peak_memory, sum(sizes) + max(sizes))
+        for product in task.products:
+            statistics = product.settings.get('multi_model_statistics', {})
+            for statistic in statistics.get('output_products', {}).values():
+                output_size += self._products[product.filename]['output_size']
+                self._products[statistic.filename] = dict(
+                    self._products[product.filename],
+                    filename=statistic.filename)
+            if statistics:
+                break
+
+        return {
+            'input_size': sum(p['input_size'] for p in products),
+            'peak_memory': peak_memory,
+            'output_size': output_size,
+            'products': products,
+        }
+
+    def get_plan(self, max_parallel_tasks=None):
+        """Get the plan."""
+        plans = []
+        done = set()
+
+        def add(task):
+            if task in done:
+                return
+            for ancestor in task.ancestors:
+                add(ancestor)
+            done.add(task)
+            plan = {
+                'name': task.name,
+                'ancestors': sorted(t.name for t in task.ancestors),
+            }
+            if isinstance(task, PreprocessingTask):
+                plan['type'] = 'preprocessor'
+                plan.update(self._plan_preprocessing_task(task))
+            else:
+                plan['type'] = 'diagnostic'
+                plan['script'] = getattr(task, 'script', None)
+            plans.append(plan)
+
+        for task in sorted(self.tasks, key=lambda t: t.name):
+            add(task)
+
+        peaks = sorted((p.get('peak_memory', 0) for p in plans), reverse=True)
+        parallel = max_parallel_tasks or os.cpu_count()
+        return {
+            'tasks': plans,
+            'input_size': sum(p.get('input_size', 0) for p in plans),
+            'output_size': sum(p.get('output_size', 0) for p in plans),
+            'max_task_memory': peaks[0] if peaks else 0,
+            'max_parallel_tasks': parallel,
+            'peak_memory': sum(peaks[:parallel]),
+        }
+
+
+def get_plan(tasks, max_parallel_tasks=None):
+    """Estimate the resources needed to run `tasks`.
+
+    The in-memory size of the data after each preprocessor step is
+    estimated from the shape and data type of the input data, assuming
+    the data is fully realized. The peak memory of a run is estimated as
+    the sum of the peak memory of the `max_parallel_tasks` most memory
+    hungry tasks.
+
+    Parameters
+    ----------
+    tasks: iterable(esmvalcore._task.BaseTask)
+        The tasks to plan.
+    max_parallel_tasks: int
+        The number of tasks that will run in parallel, defaults to the
+        number of CPUs.
+
+    Returns
+    -------
+    dict
+        The plan.
+    """
+    return _Planner(tasks).get_plan(max_parallel_tasks)
+
+
+def write_plan(tasks, filename, max_parallel_tasks=None):
+    """Write the plan for running `tasks` to a JSON file.
+
+    See :func:`get_plan` for a description of the plan.
+    """
+    plan = get_plan(tasks, max_parallel_tasks)
+    with open(filename, 'w') as file:
+        json.dump(plan, file, indent=2)
+    logger.info(
+        "Estimated input size %.1f MB, peak memory %.1f MB and output "
+        "size %.1f MB, plan written to %s", plan['input_size'] / 2**20,
+        plan['peak_memory'] / 2**20, plan['output_size'] / 2**20, filename)
+    return plan
@@ -1,6 +1,7 @@
 """Provenance module."""
 import copy
 import logging
+import multiprocessing
 import os
 
 from netCDF4 import Dataset
@@ -9,12 +10,15 @@ from PIL.PngImagePlugin import PngInfo
 from prov.dot import prov_to_dot
 from prov.model import ProvDocument
 
+from ._cache import FileCache
 from ._version import __version__
 
 logger = logging.getLogger(__name__)
 
 ESMVALTOOL_URI_PREFIX = 'https://www.esmvaltool.org/'
 
+_ATTRIBUTES_CACHE = FileCache('attributes')
+
 
 def update_without_duplicating(bundle, other):
     """Add new records from other provenance bundle."""
@@ -107,15 +111,148 @@ def get_task_provenance(task, recipe_entity):
     return activity
 
 
+def _read_attributes(filename):
+    """Read the attributes from a netcdf file."""
+    attributes = {}
+    if not (os.path.exists(filename)
+            and os.path.splitext(filename)[1].lower() == '.nc'):
+        return attributes
+
+    with Dataset(filename, 'r') as dataset:
+        for attr in dataset.ncattrs():
+            attributes[attr] = dataset.getncattr(attr)
+    return attributes
+
+
+def read_attributes(filenames, processes=None):
+    """Read the global attributes of many netcdf files.
+
+    The attributes are cached, files that have not been read before are
+    read in parallel using at most `processes` processes.
+
+    Returns
+    -------
+    dict
+        The attributes by filename.
+    """
+    attributes = _ATTRIBUTES_CACHE.get_many(filenames)
+    unresolved = list(dict.fromkeys(f for f in filenames
+                                    if f not in attributes))
+    if unresolved:
+        logger.debug("Reading attributes from files:\n%s",
+                     '\n'.join(unresolved))
+        # Daemonic processes, e.g. the ones running tasks, cannot have
+        # children.
+        if len(unresolved) > 1 and not multiprocessing.current_process(
+        ).daemon:
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(_read_attributes, unresolved)
+        else:
+            results = [_read_attributes(f) for f in unresolved]
+        _ATTRIBUTES_CACHE.set_many(zip(unresolved, results))
+        attributes.update(zip(unresolved, results))
+    return {f: copy.deepcopy(attributes[f]) for f in filenames}
+
+
+def _get_provenance_document(items):
+    """Combine the provenance of tracked files into a single document.
+
+    The provenance graph is traversed from `items`, each record that is
+    shared between files is only added once.
+    """
+    bundles = []
+    visited = set()
+    todo = list(reversed(items))
+    while todo:
+        item = todo.pop()
+        if id(item) in visited:
+            continue
+        visited.add(id(item))
+        if isinstance(item, TrackedFile):
+            bundles.extend([item._document, item.activity.bundle])
+            todo.extend(reversed(item._sources))
+        else:
+            bundles.append(item.bundle)
+
+    namespaces = set()
+    records = {}
+    for bundle in bundles:
+        namespaces.update(bundle.namespaces)
+        records.update(dict.fromkeys(bundle.records))
+    provenance = ProvDocument(namespaces=namespaces)
+    for record in records:
+        provenance.add_record(record)
+    return provenance
+
+
+def _export_provenance(product):
+    """Write the provenance of a single file to xml and svg files."""
+    product._export_provenance(product.provenance)
+
+
+def export_provenance(products, filename=None, processes=None):
+    """Export the provenance of many files.
+
+    Parameters
+    ----------
+    products: iterable of TrackedFile
+        Files with initialized provenance.
+    filename: str, optional
+        If given, the provenance of all files is written to this xml file,
+        instead of writing xml and svg files next to each file.
+    processes: int, optional
+        Maximum number of processes used for exporting.
+    """
+    products = sorted(products, key=lambda p: p.filename)
+    if not products:
+        return
+    if filename is not None:
+        logger.info("Writing provenance of %s files to %s", len(products),
+                    filename)
+        provenance = _get_provenance_document(products)
+        provenance.serialize(filename, format='xml')
+        return
+
+    logger.info("Writing provenance of %s files", len(products))
+    # Daemonic processes, e.g. the ones running tasks, cannot have children.
+    if len(products) > 1 and not multiprocessing.current_process().daemon:
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_export_provenance, products)
+    else:
+        for product in products:
+            _export_provenance(product)
+
+
+def _copy_document(document):
+    """Copy a provenance document containing a few records."""
+    new = ProvDocument(namespaces=document.namespaces)
+    for record in document.records:
+        new.add_record(record)
+    return new
+
+
 class TrackedFile(object):
-    """File with provenance tracking."""
+    """File with provenance tracking.
+
+    The provenance of a file is stored as a small document describing only
+    the file itself and the files and entities it was derived from. These
+    are not copied into the provenance of the file, but referenced, so the
+    provenance of all files in a run forms a single shared graph. A
+    complete provenance document is only built when :attr:`provenance` is
+    accessed.
+    """
 
-    def __init__(self, filename, attributes, ancestors=None):
-        """Create an instance of a file with provenance tracking."""
+    def __init__(self, filename, attributes=None, ancestors=None):
+        """Create an instance of a file with provenance tracking.
+
+        If `attributes` is None, the global attributes of the file are
+        used. These are only read when they are first needed.
+        """
         self._filename = filename
-        self.attributes = copy.deepcopy(attributes)
+        self._attributes = copy.deepcopy(attributes)
 
-        self.provenance = None
+        self._document = None
+        self._sources = []
         self.entity = None
         self.activity = None
         self._ancestors = [] if ancestors is None else ancestors
@@ -126,7 +263,7 @@ class TrackedFile(object):
 
     def copy_provenance(self, target=None):
         """Create a copy with identical provenance information."""
-        if self.provenance is None:
+        if self._document is None:
             raise ValueError("Provenance of {} not initialized".format(self))
         if target is None:
             new = TrackedFile(self.filename, self.attributes)
@@ -136,9 +273,12 @@ class TrackedFile(object):
                     "Attempt to copy provenance to incompatible file.")
             new = target
             new.attributes = copy.deepcopy(self.attributes)
-        new.provenance = copy.deepcopy(self.provenance)
-        new.entity = new.provenance.get_record(self.entity.identifier)[0]
-        new.activity = new.provenance.get_record(self.activity.identifier)[0]
+        # Only the records describing this file need to be copied, the
+        # provenance of the sources is shared.
+        new._document = _copy_document(self._document)
+        new._sources = list(self._sources)
+        new.entity = new._document.get_record(self.entity.identifier)[0]
+        new.activity = self.activity
         return new
 
     @property
@@ -146,17 +286,39 @@ class TrackedFile(object):
         """Filename."""
         return self._filename
 
+    @property
+    def attributes(self):
+        """Attributes."""
+        if self._attributes is None:
+            self._attributes = read_attributes([self.filename])[self.filename]
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, value):
+        self._attributes = value
+
+    @property
+    def provenance(self):
+        """Provenance document, None if provenance is not initialized.
+
+        The document contains the provenance of the file and of all files
+        and entities it was derived from.
+        """
+        if self._document is None:
+            return None
+        return _get_provenance_document([self])
+
     def initialize_provenance(self, activity):
         """Initialize the provenance document.
 
-        Note: this also copies the ancestor provenance. Therefore, changes
-        made to ancestor provenance after calling this function will not
-        propagate into the provenance of this file.
+        Note: the provenance of the ancestors is not copied, but shared.
+        It is combined with the provenance of this file when
+        :attr:`provenance` is accessed.
         """
-        if self.provenance is not None:
+        if self._document is not None:
             raise ValueError(
                 "Provenance of {} already initialized".format(self))
-        self.provenance = ProvDocument()
+        self._document = ProvDocument()
         self._initialize_namespaces()
         self._initialize_activity(activity)
         self._initialize_entity()
@@ -165,12 +327,11 @@ class TrackedFile(object):
     def _initialize_namespaces(self):
         """Inialize the namespaces."""
         for namespace in ('file', 'attribute', 'preprocessor', 'task'):
-            create_namespace(self.provenance, namespace)
+            create_namespace(self._document, namespace)
 
     def _initialize_activity(self, activity):
-        """Copy the preprocessor task activity."""
+        """Set the preprocessor task activity."""
         self.activity = activity
-        update_without_duplicating(self.provenance, activity.bundle)
 
     def _initialize_entity(self):
         """Initialize the entity representing the file."""
@@ -179,17 +340,22 @@ class TrackedFile(object):
             for k, v in self.attributes.items()
             if k not in ('authors', 'projects')
         }
-        self.entity = self.provenance.entity('file:' + self.filename,
-                                             attributes)
+        self.entity = self._document.entity('file:' + self.filename,
+                                            attributes)
         attribute_to_authors(self.entity, self.attributes.get('authors', []))
         attribute_to_projects(self.entity, self.attributes.get('projects', []))
 
     def _initialize_ancestors(self, activity):
         """Register ancestor files for provenance tracking."""
+        # Read the attributes of all input files at once
+        unread = [a for a in self._ancestors if a._attributes is None]
+        if unread:
+            attributes = read_attributes([a.filename for a in unread])
+            for ancestor in unread:
+                ancestor.attributes = attributes[ancestor.filename]
         for ancestor in self._ancestors:
-            if ancestor.provenance is None:
+            if ancestor._document is None:
                 ancestor.initialize_provenance(activity)
-            update_without_duplicating(self.provenance, ancestor.provenance)
             self.wasderivedfrom(ancestor)
 
     def wasderivedfrom(self, other):
@@ -198,14 +364,14 @@ class TrackedFile(object):
             other_entity = other.entity
         else:
             other_entity = other
-        update_without_duplicating(self.provenance, other_entity.bundle)
         if not self.activity:
             raise ValueError("Activity not initialized.")
+        self._sources.append(other)
         self.entity.wasDerivedFrom(other_entity, self.activity)
 
-    def _select_for_include(self):
+    def _select_for_include(self, provenance):
         attributes = {
-            'provenance': self.provenance.serialize(format='xml'),
+            'provenance': provenance.serialize(format='xml'),
             'software': "Created with ESMValTool v{}".format(__version__),
         }
         if 'caption' in self.attributes:
@@ -231,9 +397,9 @@ class TrackedFile(object):
         with Image.open(filename) as image:
             image.save(filename, pnginfo=pnginfo)
 
-    def _include_provenance(self):
+    def _include_provenance(self, provenance):
         """Include provenance information as metadata."""
-        attributes = self._select_for_include()
+        attributes = self._select_for_include(provenance)
 
         # List of files to attach provenance to
         files = [self.filename]
@@ -247,15 +413,24 @@ class TrackedFile(object):
             if write:
                 write(filename, attributes)
 
-    def save_provenance(self):
-        """Export provenance information."""
-        self._include_provenance()
+    def _export_provenance(self, provenance):
+        """Write provenance information to xml and svg files."""
         filename = os.path.splitext(self.filename)[0] + '_provenance'
-        self.provenance.serialize(filename + '.xml', format='xml')
+        provenance.serialize(filename + '.xml', format='xml')
         # Only plot provenance if there are not too many records.
-        if len(self.provenance.records) > 100:
+        if len(provenance.records) > 100:
             logger.debug("Not plotting large provenance tree of %s",
                          self.filename)
         else:
-            figure = prov_to_dot(self.provenance)
+            figure = prov_to_dot(provenance)
             figure.write_svg(filename + '.svg')
+
+    def include_provenance(self):
+        """Include provenance information as metadata in the file(s).
+
+        The files are written by the diagnostic scripts, so the attributes
+        cannot be added while saving them and the files are reopened to
+        append them. Exporting the provenance to separate xml and svg files
+        is done at the end of the run, see :func:`export_provenance`.
+        """
+        self._include_provenance(self.provenance)
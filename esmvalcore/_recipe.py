@@ -3,19 +3,23 @@ import fnmatch
 import logging
 import os
 import re
-from collections import OrderedDict
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from pprint import pformat
 
 import yaml
-from netCDF4 import Dataset
 
 from . import __version__
 from . import _recipe_checks as check
 from ._config import TAGS, get_activity, get_institutes, replace_tags
-from ._data_finder import (get_input_filelist, get_output_file,
-                           get_statistic_output_file)
-from ._provenance import TrackedFile, get_recipe_provenance
+from ._data_finder import (DirectoryTree, _freeze, get_input_filelist,
+                           get_input_key, get_output_file,
+                           get_statistic_output_file, set_fx_ensemble)
+from ._data_index import get_data_index
+from ._provenance import (TrackedFile, export_provenance,
+                          get_recipe_provenance)
 from ._recipe_checks import RecipeError
 from ._task import (DiagnosticTask, get_flattened_tasks, get_independent_tasks,
                     run_tasks)
@@ -489,7 +493,8 @@ def _update_fx_settings(settings, variable, config_user):
         settings['weighting_landsea_fraction']['fx_files'] = fx_dict
         logger.info(msg, 'land/sea fraction weighting', pformat(fx_dict))
 
-    for step in ('area_statistics', 'volume_statistics'):
+    for step in ('area_statistics', 'region_statistics',
+                 'volume_statistics'):
         if settings.get(step, {}).get('fx_files'):
             var = dict(variable)
             var['fx_files'] = settings.get(step, {}).get('fx_files')
@@ -500,34 +505,113 @@ def _update_fx_settings(settings, variable, config_user):
             logger.info(msg, step, pformat(fx_files_dict))
 
 
-def _read_attributes(filename):
-    """Read the attributes from a netcdf file."""
-    attributes = {}
-    if not (os.path.exists(filename)
-            and os.path.splitext(filename)[1].lower() == '.nc'):
-        return attributes
+class InputFileLookup:
+    """Find the input files of the datasets in a recipe.
+
+    The result of each query is cached by the facets that determine the
+    input files (see :func:`esmvalcore._data_finder.get_input_key`), so
+    e.g. an fx variable needed by many preprocessor steps and datasets is
+    looked up only once. Directory listings are shared by all queries.
+
+    Parameters
+    ----------
+    config_user: dict
+        The user configuration.
+    max_workers: int
+        Maximum number of threads used by :meth:`prefetch`.
+    """
+
+    def __init__(self, config_user, max_workers=None):
+        self._config_user = config_user
+        self._max_workers = max_workers
+        self._data_index = get_data_index(config_user.get('data_index'))
+        self._tree = DirectoryTree()
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _key(self, variable):
+        return get_input_key(variable, self._config_user['drs'])
+
+    def _find(self, variable):
+        """Find the input files (locally and via download)."""
+        (input_files, dirnames, filenames) = get_input_filelist(
+            variable=variable,
+            rootpath=self._config_user['rootpath'],
+            drs=self._config_user['drs'],
+            data_index=self._data_index,
+            tree=self._tree)
+
+        # Set up downloading using synda if requested.
+        # Do not download if files are already available locally.
+        if self._config_user['synda_download'] and not input_files:
+            input_files = synda_search(variable)
+            dirnames = None
+            filenames = None
+
+        return (input_files, dirnames, filenames)
+
+    def get(self, variable):
+        """Get the input files for a single dataset.
+
+        Returns
+        -------
+        tuple
+            The input files, the directories and the file name patterns
+            used to find them, as new lists that can be modified.
+        """
+        set_fx_ensemble(variable)
+        key = self._key(variable)
+        with self._lock:
+            result = self._results.get(key)
+        if result is None:
+            result = self._find(variable)
+            with self._lock:
+                self._results[key] = result
+        return tuple(None if r is None else list(r) for r in result)
+
+    def prefetch(self, variables):
+        """Look up the input files for many datasets concurrently.
+
+        Errors are ignored here, they are raised again when the files of
+        the dataset are requested with :meth:`get`.
+        """
+        queries = {}
+        for variable in variables:
+            variable = dict(variable)
+            set_fx_ensemble(variable)
+            queries.setdefault(self._key(variable), variable)
+        with self._lock:
+            queries = {
+                key: variable
+                for key, variable in queries.items()
+                if key not in self._results
+            }
+        if not queries:
+            return
 
-    with Dataset(filename, 'r') as dataset:
-        for attr in dataset.ncattrs():
-            attributes[attr] = dataset.getncattr(attr)
-    return attributes
+        logger.debug("Looking up input files for %s datasets", len(queries))
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            futures = {
+                key: executor.submit(self._find, variable)
+                for key, variable in queries.items()
+            }
+        with self._lock:
+            for key, future in futures.items():
+                if future.exception() is None:
+                    self._results[key] = future.result()
 
 
-def _get_input_files(variable, config_user):
-    """Get the input files for a single dataset (locally and via download)."""
-    (input_files, dirnames, filenames) = get_input_filelist(
-        variable=variable,
-        rootpath=config_user['rootpath'],
-        drs=config_user['drs'])
+def _get_input_file_lookup(config_user):
+    """Get the input file lookup of the recipe, or a new one."""
+    lookup = config_user.get('input_file_lookup')
+    if lookup is None:
+        lookup = InputFileLookup(config_user)
+    return lookup
 
-    # Set up downloading using synda if requested.
-    # Do not download if files are already available locally.
-    if config_user['synda_download'] and not input_files:
-        input_files = synda_search(variable)
-        dirnames = None
-        filenames = None
 
-    return (input_files, dirnames, filenames)
+def _get_input_files(variable, config_user):
+    """Get the input files for a single dataset (locally and via download)."""
+    return _get_input_file_lookup(config_user).get(variable)
 
 
 def _get_ancestors(variable, config_user):
@@ -542,10 +626,9 @@ def _get_ancestors(variable, config_user):
             or variable['dataset'] == variable.get('reference_dataset')):
         check.data_availability(input_files, variable, dirnames, filenames)
 
-    # Set up provenance tracking
+    # Set up provenance tracking, the attributes are read when needed
     for i, filename in enumerate(input_files):
-        attributes = _read_attributes(filename)
-        input_files[i] = TrackedFile(filename, attributes)
+        input_files[i] = TrackedFile(filename)
 
     return input_files
 
@@ -633,38 +716,71 @@ def _update_statistic_settings(products, order, preproc_dir):
 
 
 def _update_extract_shape(settings, config_user):
-    if 'extract_shape' in settings:
-        shapefile = settings['extract_shape'].get('shapefile')
+    for step in ('extract_shape', 'region_statistics'):
+        if step not in settings:
+            continue
+        shapefile = settings[step].get('shapefile')
         if shapefile:
             if not os.path.exists(shapefile):
                 shapefile = os.path.join(
                     config_user['auxiliary_data_dir'],
                     shapefile,
                 )
-                settings['extract_shape']['shapefile'] = shapefile
-        check.extract_shape(settings['extract_shape'])
+                settings[step]['shapefile'] = shapefile
+        getattr(check, step)(settings[step])
+
+
+def _get_facet_index(variables):
+    """Index variables by the values of the facets that differ between them.
+
+    Facets that have the same value for all variables are left out,
+    because they do not help to tell the variables apart.
+
+    Returns
+    -------
+    dict
+        For each facet, the indices of the variables by facet value.
+    """
+    facets = {}
+    keys = dict.fromkeys(key for variable in variables for key in variable)
+    for key in keys:
+        index = {}
+        for i, variable in enumerate(variables):
+            index.setdefault(_freeze(variable.get(key)), []).append(i)
+        if len(index) > 1:
+            facets[key] = index
+    return facets
 
 
 def _match_products(products, variables):
-    """Match a list of input products to output product attributes."""
+    """Match a list of input products to output product attributes.
+
+    Each input product is matched to the variables that have the largest
+    number of attributes in common with it. Instead of comparing all
+    attributes of every product to every variable, only the variables
+    that share a value of one of the facets that differ between the
+    variables are counted.
+    """
     grouped_products = {}
+    facets = _get_facet_index(variables)
 
     def get_matching(attributes):
         """Find the output filename which matches input attributes best."""
-        score = 0
-        filenames = []
-        for variable in variables:
-            filename = variable['filename']
-            tmp = sum(v == variable.get(k) for k, v in attributes.items())
-            if tmp > score:
-                score = tmp
-                filenames = [filename]
-            elif tmp == score:
-                filenames.append(filename)
+        scores = Counter()
+        for key, value in attributes.items():
+            if key in facets:
+                scores.update(facets[key].get(_freeze(value), ()))
+        if scores:
+            best = max(scores.values())
+            matches = sorted(i for i, n in scores.items() if n == best)
+        else:
+            # All variables match equally well
+            matches = range(len(variables))
+        filenames = [variables[i]['filename'] for i in matches]
         if not filenames:
             logger.warning(
                 "Unable to find matching output file for input file %s",
-                filename)
+                attributes.get('filename'))
         return filenames
 
     # Group input files by output file
@@ -874,6 +990,8 @@ def _get_preprocessor_task(variables, profiles, config_user, task_name):
                                 config_user.get('max_datasets'))
     for variable in variables:
         _add_cmor_info(variable)
+    _get_input_file_lookup(config_user).prefetch(
+        v for v in variables if not v.get('force_derivation'))
     # Create preprocessor task(s)
     derive_tasks = []
     if variable.get('derive'):
@@ -1260,11 +1378,9 @@ class Recipe:
                         ancestors.extend(tasks[a] for a in ancestor_ids)
                     tasks[task_id].ancestors = ancestors
 
-    def initialize_tasks(self):
-        """Define tasks in recipe."""
-        logger.info("Creating tasks from recipe")
+    def _create_tasks(self):
+        """Create the tasks of all diagnostics."""
         tasks = set()
-
         priority = 0
         for diagnostic_name, diagnostic in self.diagnostics.items():
             logger.info("Creating tasks for diagnostic %s", diagnostic_name)
@@ -1298,6 +1414,17 @@ class Recipe:
                 task.priority = priority
                 tasks.add(task)
                 priority += 1
+        return tasks
+
+    def initialize_tasks(self):
+        """Define tasks in recipe."""
+        logger.info("Creating tasks from recipe")
+        self._cfg['input_file_lookup'] = InputFileLookup(self._cfg)
+        try:
+            tasks = self._create_tasks()
+        finally:
+            # All input files have been found
+            self._cfg.pop('input_file_lookup')
 
         check.tasks_valid(tasks)
 
@@ -1336,3 +1463,18 @@ class Recipe:
         """Run all tasks in the recipe."""
         run_tasks(self.tasks,
                   max_parallel_tasks=self._cfg['max_parallel_tasks'])
+        self.write_provenance()
+
+    def write_provenance(self):
+        """Export the provenance of the diagnostic output files."""
+        products = {
+            product
+            for task in get_flattened_tasks(self.tasks)
+            if isinstance(task, DiagnosticTask) for product in task.products
+        }
+        filename = None
+        if self._cfg.get('provenance_database'):
+            filename = os.path.join(self._cfg['run_dir'], 'provenance.xml')
+        export_provenance(products,
+                          filename=filename,
+                          processes=self._cfg['max_parallel_tasks'])
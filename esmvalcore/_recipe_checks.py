@@ -6,7 +6,7 @@ import subprocess
 
 import yamale
 
-from ._data_finder import get_start_end_year
+from ._data_finder import get_start_end_years
 from ._task import get_flattened_tasks, which
 from .preprocessor import PreprocessingTask
 
@@ -122,8 +122,7 @@ def data_availability(input_files, var, dirnames, filenames):
     required_years = set(range(var['start_year'], var['end_year'] + 1))
     available_years = set()
 
-    for filename in input_files:
-        start, end = get_start_end_year(filename)
+    for start, end in get_start_end_years(input_files).values():
         available_years.update(range(start, end + 1))
 
     missing_years = required_years - available_years
@@ -182,3 +181,40 @@ def extract_shape(settings):
                 f"In preprocessor function `extract_shape`: Invalid value "
                 f"'{value}' for argument '{key}', choose from "
                 "{}".format(', '.join(f"'{k}'".lower() for k in valid[key])))
+
+
+def region_statistics(settings):
+    """Check that `region_statistics` arguments are valid."""
+    shapefile = settings.get('shapefile')
+    regions = settings.get('regions')
+    if (shapefile is None) == (regions is None):
+        raise RecipeError("In preprocessor function `region_statistics`: "
+                          "Specify exactly one of 'shapefile' or 'regions'")
+    if shapefile is not None and not os.path.exists(shapefile):
+        raise RecipeError("In preprocessor function `region_statistics`: "
+                          f"Unable to find 'shapefile: {shapefile}'")
+    if regions is not None and not isinstance(regions, dict):
+        raise RecipeError("In preprocessor function `region_statistics`: "
+                          "'regions' should map the names of the regions to "
+                          "boxes")
+    box = {'start_longitude', 'end_longitude', 'start_latitude',
+           'end_latitude'}
+    for name, region in (regions or {}).items():
+        if not isinstance(region, dict) or set(region) != box:
+            raise RecipeError(
+                f"In preprocessor function `region_statistics`: Invalid "
+                f"region '{name}', specify it with the arguments "
+                "{}".format(', '.join(sorted(box))))
+
+    valid = {
+        'operator': {'mean', 'sum'},
+        'method': {'contains', 'representative'},
+        'fractional': {True, False},
+    }
+    for key in valid:
+        value = settings.get(key)
+        if not (value is None or value in valid[key]):
+            raise RecipeError(
+                f"In preprocessor function `region_statistics`: Invalid "
+                f"value '{value}' for argument '{key}', choose from "
+                "{}".format(', '.join(f"'{k}'".lower() for k in valid[key])))
@@ -3,7 +3,7 @@
 from cf_units import Unit
 from dask import array as da
 
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class FgCo2(Fix):
@@ -27,25 +27,8 @@ class FgCo2(Fix):
         self.get_cube_from_list(cubes).units = Unit('kg m-2 s-1')
         return cubes
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes cube units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 12.0 / 44.0
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=12.0 / 44.0)
+    """The data are in kg CO2 instead of kg C."""
 
 
 class Ch4(Fix):
@@ -69,25 +52,8 @@ class Ch4(Fix):
         self.get_cube_from_list(cubes).units = Unit('1e-9')
         return cubes
 
-    def fix_data(self, cube):
-        """
-        Fix metadata.
-
-        Fixes cube units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 29.0 / 16.0 * 1.e9
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=29.0 / 16.0 * 1.e9)
+    """The data are a mass mixing ratio instead of a mole fraction in 1e-9."""
 
 
 class Co2(Fix):
@@ -111,49 +77,15 @@ class Co2(Fix):
         self.get_cube_from_list(cubes).units = Unit('1e-6')
         return cubes
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes cube units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 29.0 / 44.0 * 1.e6
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=29.0 / 44.0 * 1.e6)
+    """The data are a mass mixing ratio instead of a mole fraction in 1e-6."""
 
 
 class SpCo2(Fix):
     """Fixes for spco2."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes cube units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 1.e6
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=1.e6)
+    """The data are a factor 1e6 smaller than declared by their units."""
 
 
 class Od550Aer(Fix):
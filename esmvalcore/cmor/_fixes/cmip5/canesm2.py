@@ -1,27 +1,10 @@
 
 """Fixes for CanESM2 model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class FgCo2(Fix):
     """Fixes for fgco2."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 12.0 / 44.0
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=12.0 / 44.0)
+    """The data are in kg CO2 instead of kg C."""
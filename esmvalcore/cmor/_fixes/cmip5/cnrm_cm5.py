@@ -1,30 +1,13 @@
 
 """Fixes for CNRM-CM5 model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class Msftmyz(Fix):
     """Fixes for msftmyz."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 1e6
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=1e6)
+    """The data are a factor 1e6 smaller than declared by their units."""
 
 
 class Msftmyzba(Msftmyz):
@@ -1,78 +1,27 @@
 """Fixes for EC-Earth model."""
-from dask import array as da
-
-from ..fix import Fix
+from ..fix import DataFix, Fix
 from ..shared import add_scalar_height_coord
 
 
 class Sic(Fix):
     """Fixes for sic."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Sftlf(Fix):
     """Fixes for sftlf."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Tos(Fix):
     """Fixes for tos."""
 
-    def fix_data(self, cube):
-        """
-        Fix tos data.
-
-        Fixes mask
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        cube.data = da.ma.masked_equal(cube.core_data(), 273.15)
-        return cube
+    data_fix = DataFix(mask_values=[273.15])
+    """Land points are stored as 273.15 K instead of being masked."""
 
 
 class Tas(Fix):
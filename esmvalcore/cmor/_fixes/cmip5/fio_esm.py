@@ -1,51 +1,17 @@
 
 """Fixes for FIO ESM model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class Co2(Fix):
     """Fixes for co2."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 29. / 44. * 1.e6
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=29. / 44. * 1.e6)
+    """The data are a mass mixing ratio instead of a mole fraction in 1e-6."""
 
 
 class Ch4(Fix):
     """Fixes for ch4."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 29. / 16. * 1.e9
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=29. / 16. * 1.e9)
+    """The data are a mass mixing ratio instead of a mole fraction in 1e-9."""
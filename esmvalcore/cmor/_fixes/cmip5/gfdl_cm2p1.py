@@ -1,7 +1,7 @@
 """Fixes for GFDL CM2p1 model."""
 from copy import deepcopy
 
-from ..fix import Fix
+from ..fix import DataFix, Fix
 from ..cmip5.gfdl_esm2g import AllVars as BaseAllVars
 
 
@@ -35,25 +35,8 @@ class Areacello(Fix):
 class Sftof(Fix):
     """Fixes for sftof."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Tos(Fix):
@@ -1,5 +1,5 @@
 """Fixes for GFDL CM3 model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 from ..cmip5.gfdl_esm2g import AllVars as BaseAllVars
 
@@ -34,25 +34,8 @@ class Areacello(Fix):
 class Sftof(Fix):
     """Fix sftof."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units.
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Tos(Fix):
@@ -1,7 +1,7 @@
 
 """Fixes for GFDL ESM2M."""
 
-from ..fix import Fix
+from ..fix import DataFix, Fix
 from ..cmip5.gfdl_esm2g import AllVars as BaseAllVars
 
 
@@ -35,49 +35,15 @@ class Areacello(Fix):
 class Sftof(Fix):
     """Fixes for sftof."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Co2(Fix):
     """Fixes for co2."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 1e6
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=1e6)
+    """The data are a mole fraction instead of a mole fraction in 1e-6."""
 
 
 class Tos(Fix):
@@ -2,55 +2,21 @@
 """Fixes for inmcm4 model."""
 import iris
 
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class Gpp(Fix):
     """Fixes for gpp."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= -1
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=-1)
+    """The data have the wrong sign."""
 
 
 class Lai(Fix):
     """Fixes for lai."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 0.01
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=0.01)
+    """The data are a factor 100 larger than declared by their units."""
 
 
 class Nbp(Fix):
@@ -1,56 +1,20 @@
 """Fixes for MIROC5 model."""
-from dask import array as da
-
-from ..fix import Fix
+from ..fix import DataFix, Fix
 from ..shared import round_coordinates
 
 
 class Sftof(Fix):
     """Fixes for sftof."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a fraction instead of a percentage."""
 
 
 class Snw(Fix):
     """Fixes for snw."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a factor 100 smaller than declared by their units."""
 
 
 class Snc(Snw):
@@ -89,23 +53,8 @@ class Snc(Snw):
 class Msftmyz(Fix):
     """Fixes for msftmyz."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes mask
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        cube.data = da.ma.masked_equal(cube.core_data(), 0.)
-        return cube
+    data_fix = DataFix(mask_values=[0.])
+    """Missing values are stored as 0 instead of being masked."""
 
 
 class Tas(Fix):
@@ -133,20 +82,5 @@ class Tas(Fix):
 class Tos(Fix):
     """Fixes for tos."""
 
-    def fix_data(self, cube):
-        """
-        Fix tos data.
-
-        Fixes mask
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        cube.data = da.ma.masked_equal(cube.core_data(), 0.)
-        return cube
+    data_fix = DataFix(mask_values=[0.])
+    """Land points are stored as 0 instead of being masked."""
@@ -1,30 +1,13 @@
 
 """Fixes for MIROC ESM CHEM model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class Tro3(Fix):
     """Fixes for tro3."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 1000
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=1000)
+    """The data are a factor 1000 smaller than declared by their units."""
 
 
 # if (name .eq. "tro3") then
@@ -1,27 +1,10 @@
 
 """Fixes for MPI ESM LR model."""
-from ..fix import Fix
+from ..fix import DataFix, Fix
 
 
 class Pctisccp(Fix):
     """Fixes for pctisccp."""
 
-    def fix_data(self, cube):
-        """
-        Fix data.
-
-        Fixes discrepancy between declared units and real units
-
-        Parameters
-        ----------
-        cube: iris.cube.Cube
-
-        Returns
-        -------
-        iris.cube.Cube
-
-        """
-        metadata = cube.metadata
-        cube *= 100
-        cube.metadata = metadata
-        return cube
+    data_fix = DataFix(scale=100)
+    """The data are a factor 100 smaller than declared by their units."""
@@ -1,7 +1,333 @@
 """Contains the base class for dataset fixes"""
 import importlib
-import os
+import importlib.util
 import inspect
+import os
+import pkgutil
+from functools import lru_cache, partial
+
+import dask.array as da
+import numpy as np
+from cf_units import Unit
+
+FIX_PACKAGES = ['esmvalcore.cmor._fixes']
+"""list of str: Packages to look for fixes, see :func:`register_package`."""
+
+
+def register_package(package):
+    """Register a package containing additional fixes.
+
+    The package should have the same layout as
+    :mod:`esmvalcore.cmor._fixes`, i.e. the fixes for a dataset are found
+    in the module ``package.PROJECT.DATASET``. They are applied after the
+    fixes in the packages that were registered before.
+
+    Parameters
+    ----------
+    package: str
+        Name of the package.
+    """
+    if package not in FIX_PACKAGES:
+        FIX_PACKAGES.append(package)
+        _get_fixes.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _get_datasets(package, project):
+    """Get the names of the datasets with fixes, without importing them."""
+    try:
+        spec = importlib.util.find_spec('{}.{}'.format(package, project))
+    except ImportError:
+        spec = None
+    if spec is None or spec.submodule_search_locations is None:
+        return frozenset()
+    return frozenset(
+        module.name
+        for module in pkgutil.iter_modules(spec.submodule_search_locations))
+
+
+@lru_cache(maxsize=None)
+def _get_fix_classes(package, project, dataset):
+    """Get the classes defined in a module with fixes by lower case name."""
+    if dataset not in _get_datasets(package, project):
+        return {}
+    fixes_module = importlib.import_module('{}.{}.{}'.format(
+        package, project, dataset))
+    classes = inspect.getmembers(fixes_module, inspect.isclass)
+    return {name.lower(): value for name, value in classes}
+
+
+@lru_cache(maxsize=None)
+def _get_fixes(project, dataset, variable):
+    """Get the fix instances for a dataset, these are shared."""
+    fixes = []
+    for package in FIX_PACKAGES:
+        classes = _get_fix_classes(package, project, dataset)
+        for fix_name in ('allvars', variable):
+            if fix_name in classes:
+                fixes.append(classes[fix_name]())
+    return tuple(fixes)
+
+
+class FileOverlay(object):
+    """
+    Changes to the metadata of a file, applied while the file is loaded.
+
+    This allows fixing files without copying them, see
+    :attr:`Fix.file_overlay`.
+
+    Parameters
+    ----------
+    rename_variables: dict, optional
+        New names of data or coordinate variables by original name.
+    rename_attributes: dict, optional
+        New names of global or data variable attributes by original name.
+    attributes: dict, optional
+        Attribute values to set, a value of None removes the attribute.
+    fill_values: dict, optional
+        Fill value of a data variable by original variable name, values
+        equal to it are masked.
+    """
+
+    def __init__(self, rename_variables=None, rename_attributes=None,
+                 attributes=None, fill_values=None):
+        self.rename_variables = dict(rename_variables or {})
+        self.rename_attributes = dict(rename_attributes or {})
+        self.attributes = dict(attributes or {})
+        self.fill_values = dict(fill_values or {})
+
+    def __repr__(self):
+        return '{}({})'.format(
+            self.__class__.__name__,
+            ', '.join('{}={!r}'.format(k, v) for k, v in vars(self).items()
+                      if v))
+
+    def apply(self, cube):
+        """
+        Apply the changes to a cube loaded from the file.
+
+        Parameters
+        ----------
+        cube: iris.cube.Cube
+            Cube to fix in-place
+        """
+        if cube.var_name in self.fill_values:
+            fill_value = self.fill_values[cube.var_name]
+            if cube.has_lazy_data():
+                cube.data = da.ma.masked_equal(cube.core_data(), fill_value)
+            else:
+                cube.data = np.ma.masked_equal(cube.data, fill_value)
+
+        for name in list(cube.attributes):
+            if name in self.rename_attributes:
+                cube.attributes[self.rename_attributes[name]] = \
+                    cube.attributes.pop(name)
+        for name, value in self.attributes.items():
+            if value is None:
+                cube.attributes.pop(name, None)
+            else:
+                cube.attributes[name] = value
+
+        for item in [cube] + cube.coords():
+            if item.var_name in self.rename_variables:
+                item.var_name = self.rename_variables[item.var_name]
+
+
+class VirtualFile(str):
+    """
+    Path to a file with changes that are applied while loading it.
+
+    Attributes
+    ----------
+    overlays: tuple(FileOverlay)
+        Changes to apply, in order.
+    """
+
+    def __new__(cls, path, overlays=()):
+        virtual_file = super().__new__(cls, path)
+        virtual_file.overlays = tuple(overlays)
+        return virtual_file
+
+
+def _as_data_type(data, value):
+    """Convert a scalar to the floating point precision of the data."""
+    if np.issubdtype(data.dtype, np.floating):
+        return data.dtype.type(value)
+    return value
+
+
+def _mask_values(data, values):
+    """Mask the elements equal to any of the values.
+
+    The values are compared in the precision of the data, e.g. 273.15
+    matches the same value stored as float32.
+    """
+    select = np.zeros(data.shape, dtype=bool)
+    for value in values:
+        select |= np.ma.getdata(data) == _as_data_type(data, value)
+    return np.ma.masked_where(select, data)
+
+
+def _scale(data, factor):
+    """Multiply by a factor."""
+    return data * _as_data_type(data, factor)
+
+
+def _add_offset(data, offset):
+    """Add an offset."""
+    return data + _as_data_type(data, offset)
+
+
+def _convert_units(data, from_units, to_units):
+    """Convert between units."""
+    return from_units.convert(data, to_units)
+
+
+def _apply_steps(data, steps):
+    """Apply elementwise operations to a block of data."""
+    for step in steps:
+        data = step(data)
+    return data
+
+
+class DataFix(object):
+    """
+    Elementwise changes to the data of a cube.
+
+    The data fixes of all fixes for a variable are combined with the unit
+    conversion of the CMOR checker into a single operation that keeps the
+    data lazy, see :attr:`Fix.data_fix`. The changes are applied in the
+    order of the parameters below.
+
+    Parameters
+    ----------
+    flip: list(str or int), optional
+        Names or indices of the dimensions along which the data is stored
+        in the reverse order of its coordinate.
+    mask_values: list(float), optional
+        Values to mask.
+    scale: float, optional
+        Factor to multiply the data with.
+    offset: float, optional
+        Value to add to the data.
+    units: str, optional
+        Actual units of the data, the data is converted from these to the
+        units of the cube.
+    """
+
+    def __init__(self, flip=None, mask_values=None, scale=None, offset=None,
+                 units=None):
+        self.flip = list(flip or [])
+        self.mask_values = list(mask_values or [])
+        self.scale = scale
+        self.offset = offset
+        self.units = units
+
+    def __repr__(self):
+        return '{}({})'.format(
+            self.__class__.__name__,
+            ', '.join('{}={!r}'.format(k, v) for k, v in vars(self).items()
+                      if v or v == 0))
+
+    def get_flip_dims(self, cube):
+        """Get the indices of the dimensions to reverse."""
+        dims = []
+        for dim in self.flip:
+            if isinstance(dim, str):
+                dims.extend(cube.coord_dims(dim))
+            else:
+                dims.append(dim)
+        return dims
+
+    def get_steps(self, cube):
+        """Get the elementwise operations as functions of a data block."""
+        steps = []
+        if self.mask_values:
+            steps.append(partial(_mask_values, values=self.mask_values))
+        if self.scale is not None:
+            steps.append(partial(_scale, factor=self.scale))
+        if self.offset is not None:
+            steps.append(partial(_add_offset, offset=self.offset))
+        if self.units is not None:
+            steps.append(
+                partial(_convert_units,
+                        from_units=Unit(self.units),
+                        to_units=cube.units))
+        return steps
+
+    def apply(self, cube):
+        """
+        Apply the changes to a cube.
+
+        Parameters
+        ----------
+        cube: iris.cube.Cube
+            Cube to fix in-place
+
+        Returns
+        -------
+        iris.cube.Cube
+            Fixed cube.
+        """
+        return apply_data_fixes(cube, [self])
+
+
+def apply_data_fixes(cube, data_fixes, units=None):
+    """
+    Apply data fixes and a unit conversion in a single operation.
+
+    Lazy data stays lazy: all elementwise changes are applied to each
+    chunk in one pass.
+
+    Parameters
+    ----------
+    cube: iris.cube.Cube
+        Cube to fix in-place
+    data_fixes: list(DataFix)
+        Changes to apply, in order.
+    units: str or cf_units.Unit, optional
+        Units to convert the cube to after applying the data fixes.
+
+    Returns
+    -------
+    iris.cube.Cube
+        Fixed cube.
+    """
+    flip_dims = set()
+    steps = []
+    for data_fix in data_fixes:
+        flip_dims.symmetric_difference_update(data_fix.get_flip_dims(cube))
+        steps.extend(data_fix.get_steps(cube))
+    if units is not None:
+        units = Unit(units)
+        if units != cube.units:
+            steps.append(
+                partial(_convert_units, from_units=cube.units,
+                        to_units=units))
+
+    data = cube.core_data()
+    if flip_dims:
+        data = data[tuple(
+            slice(None, None, -1) if dim in flip_dims else slice(None)
+            for dim in range(data.ndim))]
+    if steps:
+        # Applying the steps to a small sample raises errors, e.g. for
+        # units that cannot be converted, immediately and gives the dtype.
+        sample = _apply_steps(np.ma.zeros((1, ), dtype=data.dtype), steps)
+        if cube.has_lazy_data():
+            data = da.map_blocks(
+                partial(_apply_steps, steps=steps),
+                data,
+                dtype=sample.dtype,
+                meta=np.ma.zeros((0, ) * data.ndim, dtype=sample.dtype),
+            )
+        else:
+            data = _apply_steps(data, steps)
+    if flip_dims or steps:
+        cube.data = data
+    if units is not None:
+        cube.units = units
+    return cube
 
 
 class Fix(object):
@@ -9,13 +335,32 @@ class Fix(object):
     Base class for dataset fixes.
     """
 
+    file_overlay = None
+    """
+    FileOverlay: Changes applied to the file while loading it.
+
+    Use this instead of :meth:`fix_file` for fixes that only change
+    variable or attribute names or fill values, to avoid copying the file.
+    """
+
+    data_fix = None
+    """
+    DataFix: Elementwise changes applied to the data.
+
+    Use this instead of overriding :meth:`fix_data` for fixes that only
+    scale, offset, mask or reverse the data or correct its units. The data
+    fixes of a variable are combined with the unit conversion of the CMOR
+    checker into a single lazy operation.
+    """
+
     def fix_file(self, filepath, output_dir):
         """
         Apply fixes to the files prior to creating the cube.
 
         Should be used only to fix errors that prevent loading or can
         not be fixed in the cube (i.e. those related with missing_value
-        and _FillValue)
+        and _FillValue), and that cannot be described by
+        :attr:`file_overlay`.
 
         Parameters
         ----------
@@ -100,6 +445,8 @@ class Fix(object):
             Fixed cube. It can be a difference instance.
 
         """
+        if self.data_fix is not None:
+            cube = self.data_fix.apply(cube)
         return cube
 
     def __eq__(self, other):
@@ -114,7 +461,8 @@ class Fix(object):
         Get the fixes that must be applied for a given dataset.
 
         It will look for them at the module
-        esmvalcore.cmor._fixes.PROJECT in the file DATASET, and get
+        esmvalcore.cmor._fixes.PROJECT in the file DATASET, and in the same
+        place in the packages added with :func:`register_package`, and get
         the classes named allvars (which should be use for fixes that are
         present in all the variables of a dataset, i.e. bad name for the time
         coordinate) and VARIABLE (which should be use for fixes for the
@@ -124,6 +472,9 @@ class Fix(object):
         before checking because it is not possible to use the character '-' in
         python names.
 
+        The fixes are looked up only once for each dataset and variable and
+        the same instances are returned on every call.
+
         Parameters
         ----------
         project: str
@@ -138,22 +489,7 @@ class Fix(object):
         project = project.replace('-', '_').lower()
         dataset = dataset.replace('-', '_').lower()
         variable = variable.replace('-', '_').lower()
-
-        fixes = []
-        try:
-            fixes_module = importlib.import_module(
-                'esmvalcore.cmor._fixes.{0}.{1}'.format(project, dataset))
-
-            classes = inspect.getmembers(fixes_module, inspect.isclass)
-            classes = dict((name.lower(), value) for name, value in classes)
-            for fix_name in ('allvars', variable):
-                try:
-                    fixes.append(classes[fix_name]())
-                except KeyError:
-                    pass
-        except ImportError:
-            pass
-        return fixes
+        return list(_get_fixes(project, dataset, variable))
 
     @staticmethod
     def get_fixed_filepath(output_dir, filepath):
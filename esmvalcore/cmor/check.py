@@ -8,8 +8,17 @@ import iris.exceptions
 import iris.util
 import numpy as np
 
+from .._cache import get_array_fingerprint
+from .._calendar import get_time_components
+from ._fixes.fix import apply_data_fixes
 from .table import CMOR_TABLES
 
+_COORDS_CHECK_CACHE = {}
+"""dict: Messages from checking the coordinates, by coordinates fingerprint."""
+_COORDS_CHECK_CACHE_SIZE = 64
+"""int: Number of fingerprints kept in the cache, the least recently used
+fingerprints are removed first."""
+
 
 class CMORCheckError(Exception):
     """Exception raised when a cube does not pass the CMORCheck."""
@@ -95,11 +104,9 @@ class CMORCheck():
 
         self._check_var_metadata()
         self._check_fill_value()
-        self._check_dim_names()
-        self._check_coords()
+        self._check_coords_metadata()
         if self.frequency != 'fx':
             self._check_time_coord()
-        self._check_rank()
 
         self.report_debug_messages(logger)
         self.report_warnings(logger)
@@ -148,7 +155,7 @@ class CMORCheck():
                 self._cube.var_name, '\n '.join(self._debug_messages))
             logger.debug(msg)
 
-    def check_data(self, logger=None):
+    def check_data(self, logger=None, data_fixes=()):
         """Check the cube data.
 
         Performs all the tests that require to have the data in memory.
@@ -157,6 +164,14 @@ class CMORCheck():
 
         It will also report some warnings in case of minor errors.
 
+        Parameters
+        ----------
+        logger: logging.Logger, optional
+            Logger to report warnings to.
+        data_fixes: list(esmvalcore.cmor._fixes.fix.DataFix), optional
+            Data fixes to apply together with the unit conversion, so the
+            data is only processed once.
+
         Raises
         ------
         CMORCheckError
@@ -168,10 +183,12 @@ class CMORCheck():
         if logger is None:
             logger = logging.getLogger(__name__)
 
+        units = None
         if self._cmor_var.units:
             units = self._get_effective_units()
-            if str(self._cube.units) != units:
-                self._cube.convert_units(units)
+            if str(self._cube.units) == units:
+                units = None
+        self._cube = apply_data_fixes(self._cube, data_fixes, units)
 
         self._check_coords_data()
 
@@ -257,6 +274,81 @@ class CMORCheck():
             units = self._cmor_var.units
         return units
 
+    def _get_coords_fingerprint(self):
+        """Get a fingerprint of everything the coordinate checks look at.
+
+        The points and units of the time coordinate are left out, they are
+        checked for every cube.
+        """
+        dim_coords = [id(c) for c in self._cube.coords(dim_coords=True)]
+        fingerprint = [self._cube.ndim]
+        for coord in self._cube.coords():
+            item = (
+                coord.var_name,
+                coord.standard_name,
+                coord.long_name,
+                self._cube.coord_dims(coord),
+                id(coord) in dim_coords,
+            )
+            if coord.var_name != 'time':
+                item += (
+                    str(coord.units),
+                    get_array_fingerprint(coord.core_points()),
+                    get_array_fingerprint(coord.core_bounds()),
+                )
+            fingerprint.append(item)
+        return tuple(fingerprint)
+
+    def _get_coords_names_and_units(self):
+        """Get the names and units of the coordinates.
+
+        These, and the cube itself, are what the coordinate checks change
+        when they fix the cube.
+        """
+        return [(c.var_name, str(c.units)) for c in self._cube.coords()]
+
+    def _check_coords_metadata(self):
+        """Check names, values and rank of the coordinates.
+
+        The files of a dataset usually have the same coordinates, except
+        for time. The messages of these checks are therefore cached by a
+        fingerprint of the coordinates and reported again for cubes with
+        the same fingerprint. Results are only cached if the checks did not
+        change the cube.
+        """
+        key = (self._cmor_var, self.automatic_fixes,
+               self._get_coords_fingerprint())
+        messages = _COORDS_CHECK_CACHE.pop(key, None)
+        if messages is not None:
+            # Move to the end, so the least recently used key comes first
+            _COORDS_CHECK_CACHE[key] = messages
+            errors, warnings, debug_messages = messages
+            for msg in debug_messages:
+                self.report_debug_message('{}', msg)
+            for msg in warnings:
+                self.report_warning('{}', msg)
+            for msg in errors:
+                self.report_error('{}', msg)
+            return
+
+        n_errors = len(self._errors)
+        n_warnings = len(self._warnings)
+        n_debug_messages = len(self._debug_messages)
+        cube = self._cube
+        names_and_units = self._get_coords_names_and_units()
+        self._check_dim_names()
+        self._check_coords()
+        self._check_rank()
+        if (self._cube is cube
+                and self._get_coords_names_and_units() == names_and_units):
+            _COORDS_CHECK_CACHE[key] = (
+                self._errors[n_errors:],
+                self._warnings[n_warnings:],
+                self._debug_messages[n_debug_messages:],
+            )
+            while len(_COORDS_CHECK_CACHE) > _COORDS_CHECK_CACHE_SIZE:
+                del _COORDS_CHECK_CACHE[next(iter(_COORDS_CHECK_CACHE))]
+
     def _check_rank(self):
         """Check rank, excluding scalar dimensions."""
         rank = 0
@@ -506,28 +598,15 @@ class CMORCheck():
         if freq.lower().endswith('pt'):
             freq = freq[:-2]
         if freq in ['mon', 'mo']:
-            for i in range(len(coord.points) - 1):
-                first = coord.cell(i).point
-                second = coord.cell(i + 1).point
-                second_month = first.month + 1
-                second_year = first.year
-                if second_month == 13:
-                    second_month = 1
-                    second_year += 1
-                if second_month != second.month or \
-                   second_year != second.year:
-                    msg = '{}: Frequency {} does not match input data'
-                    self.report_error(msg, var_name, freq)
-                    break
+            years, months = get_time_components(coord.points, coord.units)[:2]
+            if np.any(np.diff(years * 12 + months) != 1):
+                msg = '{}: Frequency {} does not match input data'
+                self.report_error(msg, var_name, freq)
         elif freq == 'yr':
-            for i in range(len(coord.points) - 1):
-                first = coord.cell(i).point
-                second = coord.cell(i + 1).point
-                second_month = first.month + 1
-                if first.year + 1 != second.year:
-                    msg = '{}: Frequency {} does not match input data'
-                    self.report_error(msg, var_name, freq)
-                    break
+            years = get_time_components(coord.points, coord.units)[0]
+            if np.any(np.diff(years) != 1):
+                msg = '{}: Frequency {} does not match input data'
+                self.report_error(msg, var_name, freq)
         else:
             if freq in intervals:
                 interval = intervals[freq]
@@ -544,13 +623,11 @@ class CMORCheck():
                 msg = '{}: Frequency {} not supported by checker'
                 self.report_error(msg, var_name, freq)
                 return
-            for i in range(len(coord.points) - 1):
-                interval = coord.points[i + 1] - coord.points[i]
-                if (interval < target_interval[0]
-                        or interval > target_interval[1]):
-                    msg = '{}: Frequency {} does not match input data'
-                    self.report_error(msg, var_name, freq)
-                    break
+            interval = np.diff(coord.points)
+            if np.any((interval < target_interval[0])
+                      | (interval > target_interval[1])):
+                msg = '{}: Frequency {} does not match input data'
+                self.report_error(msg, var_name, freq)
 
     @staticmethod
     def _simplify_calendar(calendar):
@@ -12,7 +12,7 @@ from collections import defaultdict
 
 from iris.cube import CubeList
 
-from ._fixes.fix import Fix
+from ._fixes.fix import Fix, VirtualFile, apply_data_fixes
 from .check import _get_cmor_checker
 
 logger = logging.getLogger(__name__)
@@ -25,7 +25,9 @@ def fix_file(file, short_name, project, dataset, output_dir):
     This fixes are only for issues that prevent iris from loading the cube or
     that cannot be fixed after the cube is loaded.
 
-    Original files are not overwritten.
+    Original files are not overwritten. Changes that are described by
+    :attr:`Fix.file_overlay` are not applied to the file, but when it is
+    loaded.
 
     Parameters
     ----------
@@ -41,12 +43,18 @@ def fix_file(file, short_name, project, dataset, output_dir):
     Returns
     -------
     str:
-        Path to the fixed file
+        Path to the fixed file, a :class:`VirtualFile` if changes need to
+        be applied while loading it.
 
     """
+    overlays = []
     for fix in Fix.get_fixes(
             project=project, dataset=dataset, variable=short_name):
+        if fix.file_overlay is not None:
+            overlays.append(fix.file_overlay)
         file = fix.fix_file(file, output_dir)
+    if overlays:
+        file = VirtualFile(file, overlays)
     return file
 
 
@@ -195,9 +203,18 @@ def fix_data(cube,
         If the checker detects errors in the data that it can not fix.
 
     """
+    # Declarative data fixes are collected and applied together with the
+    # unit conversion of the checker, to process the data only once.
+    data_fixes = []
     for fix in Fix.get_fixes(
             project=project, dataset=dataset, variable=short_name):
-        cube = fix.fix_data(cube)
+        if isinstance(fix, Fix) and type(fix).fix_data is Fix.fix_data:
+            if fix.data_fix is not None:
+                data_fixes.append(fix.data_fix)
+        else:
+            cube = apply_data_fixes(cube, data_fixes)
+            data_fixes = []
+            cube = fix.fix_data(cube)
     if cmor_table and mip:
         checker = _get_cmor_checker(
             frequency=frequency,
@@ -206,5 +223,7 @@ def fix_data(cube,
             short_name=short_name,
             fail_on_error=False,
             automatic_fixes=True)
-        cube = checker(cube).check_data()
+        cube = checker(cube).check_data(data_fixes=data_fixes)
+    else:
+        cube = apply_data_fixes(cube, data_fixes)
     return cube
@@ -4,6 +4,7 @@ CMOR information reader for ESMValTool.
 Read variable information from CMOR 2 and CMOR 3 tables and make it easily
 available for the other components of ESMValTool
 """
+from collections.abc import MutableMapping
 from functools import total_ordering
 import copy
 import errno
@@ -11,12 +12,98 @@ import glob
 import json
 import logging
 import os
+import pickle
+
+from .._version import __version__
 
 logger = logging.getLogger(__name__)
 
 CMOR_TABLES = {}
 """dict of str, obj: CMOR info objects."""
 
+_TABLES_CACHE = None
+
+
+def _get_tables_cache():
+    """Get the cache for parsed CMOR tables."""
+    global _TABLES_CACHE  # pylint: disable=global-statement
+    if _TABLES_CACHE is None:
+        # Imported here because the cache depends on the configuration,
+        # which in turn depends on this module.
+        from .._cache import FileCache
+        _TABLES_CACHE = FileCache('cmor_tables')
+    return _TABLES_CACHE
+
+
+def _get_folder_identity(info):
+    """Get an identifier that changes when any of the table files change."""
+    files = []
+    for filename in sorted(glob.glob(os.path.join(info._cmor_folder, '*'))):
+        stat = os.stat(filename)
+        files.append((filename, stat.st_size, stat.st_mtime_ns))
+    return (type(info).__name__, __version__, tuple(files))
+
+
+def _load_cached_tables(info, attributes):
+    """Load previously parsed tables into `info`.
+
+    The tables are only unpickled when they are first accessed.
+
+    Returns
+    -------
+    bool
+        True if the tables were found in the cache.
+    """
+    cached = _get_tables_cache().get(info._cmor_folder)
+    if cached is None or cached['identity'] != _get_folder_identity(info):
+        return False
+    for attribute in attributes:
+        setattr(info, attribute, pickle.loads(cached['attributes'][attribute]))
+    info.tables = _LazyTables(cached['tables'])
+    return True
+
+
+def _cache_tables(info, attributes):
+    """Store the parsed tables of `info` in the cache."""
+    cached = {
+        'identity': _get_folder_identity(info),
+        'attributes': {
+            attribute: pickle.dumps(getattr(info, attribute))
+            for attribute in attributes
+        },
+        'tables': {
+            name: pickle.dumps(table)
+            for name, table in info.tables.items()
+        },
+    }
+    _get_tables_cache().set(info._cmor_folder, cached)
+
+
+class _LazyTables(MutableMapping):
+    """Tables by name, parsed from their pickled form when first used."""
+
+    def __init__(self, tables):
+        self._tables = dict(tables)
+
+    def __getitem__(self, name):
+        table = self._tables[name]
+        if isinstance(table, bytes):
+            table = pickle.loads(table)
+            self._tables[name] = table
+        return table
+
+    def __setitem__(self, name, table):
+        self._tables[name] = table
+
+    def __delitem__(self, name):
+        del self._tables[name]
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self):
+        return len(self._tables)
+
 
 def read_cmor_tables(cfg_developer):
     """Read cmor tables required in the configuration.
@@ -87,15 +174,20 @@ class CMIP6Info(object):
         cmor_tables_path = self._get_cmor_path(cmor_tables_path)
 
         self._cmor_folder = os.path.join(cmor_tables_path, 'Tables')
-        if glob.glob(os.path.join(self._cmor_folder, '*_CV.json')):
-            self._load_controlled_vocabulary()
         self.default = default
         self.strict = strict
         self.default_table_prefix = default_table_prefix
 
+        attributes = ['coords', 'var_to_freq']
+        if glob.glob(os.path.join(self._cmor_folder, '*_CV.json')):
+            attributes.extend(['activities', 'institutes'])
+        if _load_cached_tables(self, attributes):
+            return
+
+        if 'activities' in attributes:
+            self._load_controlled_vocabulary()
         self.tables = {}
         self.var_to_freq = {}
-        self.strict = strict
 
         self._load_coordinates()
         for json_file in glob.glob(os.path.join(self._cmor_folder, '*.json')):
@@ -111,6 +203,7 @@ class CMIP6Info(object):
                 else:
                     print(msg)
                 raise
+        _cache_tables(self, attributes)
 
     @staticmethod
     def _get_cmor_path(cmor_tables_path):
@@ -540,14 +633,15 @@ class CMIP5Info(object):
             raise OSError(errno.ENOTDIR, "CMOR tables path is not a directory",
                           self._cmor_folder)
 
-        self.strict = strict
-        self.tables = {}
-        self.coords = {}
         self.default = default
         self.strict = strict
         self._current_table = None
         self._last_line_read = None
+        if _load_cached_tables(self, ['coords']):
+            return
 
+        self.tables = {}
+        self.coords = {}
         for table_file in glob.glob(os.path.join(self._cmor_folder, '*')):
             if '_grids' in table_file:
                 continue
@@ -561,6 +655,7 @@ class CMIP5Info(object):
                 else:
                     print(msg)
                 raise
+        _cache_tables(self, ['coords'])
 
     @staticmethod
     def _get_cmor_path(cmor_tables_path):
@@ -768,15 +863,20 @@ class CustomInfo(CMIP5Info):
     def __init__(self, cmor_tables_path=None):
         cwd = os.path.dirname(os.path.realpath(__file__))
         self._cmor_folder = os.path.join(cwd, 'tables', 'custom')
+        self._coordinates_file = os.path.join(
+            self._cmor_folder,
+            'CMOR_coordinates.dat',
+        )
+        self._current_table = None
+        self._last_line_read = None
+        if _load_cached_tables(self, ['coords', 'var_to_freq']):
+            return
+
         self.tables = {}
         self.var_to_freq = {}
         table = TableInfo()
         table.name = 'custom'
         self.tables[table.name] = table
-        self._coordinates_file = os.path.join(
-            self._cmor_folder,
-            'CMOR_coordinates.dat',
-        )
         self.coords = {}
         self._read_table_file(self._coordinates_file, self.tables['custom'])
         for dat_file in glob.glob(os.path.join(self._cmor_folder, '*.dat')):
@@ -792,6 +892,7 @@ class CustomInfo(CMIP5Info):
                 else:
                     print(msg)
                 raise
+        _cache_tables(self, ['coords', 'var_to_freq'])
 
     def get_table(self, table):
         """
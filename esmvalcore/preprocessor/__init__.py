@@ -8,7 +8,8 @@ from iris.cube import Cube
 from .._provenance import TrackedFile
 from .._task import BaseTask
 from ._area import (area_statistics, extract_named_regions, extract_region,
-                    extract_shape, zonal_statistics, meridional_statistics)
+                    extract_shape, meridional_statistics, region_statistics,
+                    zonal_statistics)
 from ._derive import derive
 from ._detrend import detrend
 from ._download import download
@@ -21,10 +22,11 @@ from ._multimodel import multi_model_statistics
 from ._reformat import (cmor_check_data, cmor_check_metadata, fix_data,
                         fix_file, fix_metadata)
 from ._regrid import extract_levels, regrid
-from ._time import (annual_statistics, anomalies, climate_statistics,
-                    daily_statistics, decadal_statistics, extract_month,
-                    extract_season, extract_time, monthly_statistics,
-                    regrid_time, seasonal_statistics)
+from ._rolling_window import rolling_window_statistics
+from ._time import (_climatology_input_files, annual_statistics, anomalies,
+                    climate_statistics, daily_statistics, decadal_statistics,
+                    extract_month, extract_season, extract_time,
+                    monthly_statistics, regrid_time, seasonal_statistics)
 from ._units import convert_units
 from ._volume import (depth_integration, extract_trajectory, extract_transect,
                       extract_volume, volume_statistics)
@@ -83,12 +85,14 @@ __all__ = [
     'extract_named_regions',
     'depth_integration',
     'area_statistics',
+    'region_statistics',
     'volume_statistics',
     # Time operations
     # 'annual_cycle': annual_cycle,
     # 'diurnal_cycle': diurnal_cycle,
     'zonal_statistics',
     'meridional_statistics',
+    'rolling_window_statistics',
     'daily_statistics',
     'monthly_statistics',
     'seasonal_statistics',
@@ -270,7 +274,9 @@ class PreprocessorFile(TrackedFile):
             raise ValueError(
                 "PreprocessorFile {} has no settings for step {}".format(
                     self, step))
-        self.cubes = preprocess(self.cubes, step, **self.settings[step])
+        input_files = [a.filename for a in self._ancestors]
+        with _climatology_input_files(input_files):
+            self.cubes = preprocess(self.cubes, step, **self.settings[step])
         if debug:
             logger.debug("Result %s", self.cubes)
             filename = _get_debug_filename(self.filename, step)
@@ -4,21 +4,39 @@ Area operations on data cubes.
 Allows for selecting data subsets using certain latitude and longitude bounds;
 selecting geographical regions; constructing area averages; etc.
 """
+import hashlib
 import logging
 
 import fiona
 import iris
 import numpy as np
+import scipy.sparse
 import shapely
 import shapely.ops
+import shapely.prepared
 from dask import array as da
 from iris.exceptions import CoordinateNotFoundError
 
+from .._cache import DiskCache, get_array_fingerprint, get_file_identity
 from ._shared import (get_iris_analysis_operation, guess_bounds,
                       operator_accept_weights)
 
 logger = logging.getLogger(__name__)
 
+# Grid areas of the horizontal dimensions, by the identity of the fx file or
+# a fingerprint of the latitude and longitude coordinates
+_GRID_AREAS_CACHE = {}
+_GRID_AREAS_CACHE_SIZE = 8
+_AREA_WEIGHTS_DISK_CACHE = DiskCache('area_weights',
+                                     option='cache_area_weights')
+
+# Sparse matrices with the area weights of regions, by a fingerprint of the
+# grid and the regions
+_REGION_WEIGHTS_CACHE = {}
+_REGION_WEIGHTS_CACHE_SIZE = 8
+_REGION_WEIGHTS_DISK_CACHE = DiskCache('region_weights',
+                                       option='cache_area_weights')
+
 
 # slice cube over a restricted area (box)
 def extract_region(cube, start_longitude, end_longitude, start_latitude,
@@ -66,6 +84,16 @@ def extract_region(cube, start_longitude, end_longitude, start_latitude,
     # Irregular grids
     lats = cube.coord('latitude').points
     lons = cube.coord('longitude').points
+    selection = _select_box(lons, lats, start_longitude, end_longitude,
+                            start_latitude, end_latitude)
+    selection = da.broadcast_to(selection, cube.shape)
+    cube.data = da.ma.masked_where(~selection, cube.core_data())
+    return cube
+
+
+def _select_box(lons, lats, start_longitude, end_longitude, start_latitude,
+                end_latitude):
+    """Select the points of a grid that are inside a box."""
     # Convert longitudes to valid range
     if start_longitude != 360.:
         start_longitude %= 360.
@@ -82,10 +110,7 @@ def extract_region(cube, start_longitude, end_longitude, start_latitude,
     else:
         select_lats = (lats >= start_latitude) | (lats <= end_latitude)
 
-    selection = select_lats & select_lons
-    selection = da.broadcast_to(selection, cube.shape)
-    cube.data = da.ma.masked_where(~selection, cube.core_data())
-    return cube
+    return select_lats & select_lons
 
 
 def zonal_statistics(cube, operator):
@@ -152,9 +177,87 @@ def meridional_statistics(cube, operator):
         raise ValueError(msg)
 
 
+def _broadcast_grid_areas(cube, grid_areas, dims):
+    """Broadcast grid areas of the horizontal dimensions to the cube shape.
+
+    The result is a read-only view, or a lazy array with the same chunks
+    as the data for cubes with lazy data, so no copies of the areas are
+    made.
+    """
+    shape = [1] * cube.ndim
+    for dim, size in zip(dims, grid_areas.shape):
+        shape[dim] = size
+    grid_areas = grid_areas.reshape(shape)
+    if cube.has_lazy_data():
+        chunks = cube.lazy_data().chunks
+        grid_areas = da.from_array(grid_areas, chunks=[
+            chunks[dim] if dim in dims else 1 for dim in range(cube.ndim)
+        ])
+        return da.broadcast_to(grid_areas, cube.shape, chunks=chunks)
+    return np.broadcast_to(grid_areas, cube.shape)
+
+
+def _add_to_cache(cache, key, value, size):
+    """Add a value to an in-memory cache, keeping the last `size` values."""
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > size:
+        del cache[next(iter(cache))]
+    return value
+
+
+def _load_grid_areas(fx_file):
+    """Load the grid areas from an fx file, once for every file."""
+    key = get_file_identity(fx_file)
+    grid_areas = _GRID_AREAS_CACHE.get(key)
+    if grid_areas is None:
+        logger.info('Attempting to load grid areas from file: %s', fx_file)
+        grid_areas = iris.load_cube(fx_file).data
+    return _add_to_cache(_GRID_AREAS_CACHE, key, grid_areas,
+                         _GRID_AREAS_CACHE_SIZE)
+
+
+def _get_area_weights_key(cube, dims):
+    """Get a key identifying the horizontal grid of a cube."""
+    items = [dims]
+    for name in ('latitude', 'longitude'):
+        coord = cube.coord(name)
+        items.extend([
+            repr(coord.metadata),
+            get_array_fingerprint(coord.core_points()),
+            get_array_fingerprint(coord.core_bounds()),
+        ])
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+def _compute_area_weights(cube, dims):
+    """Compute the area weights of the horizontal grid of a cube.
+
+    The weights are computed once for every grid and cached in memory and,
+    if ``cache_area_weights`` is set in the user configuration file, in the
+    cache directory.
+    """
+    key = _get_area_weights_key(cube, dims)
+    grid_areas = _GRID_AREAS_CACHE.get(key)
+    if grid_areas is None:
+        grid_areas = _AREA_WEIGHTS_DISK_CACHE.get(key)
+    if grid_areas is None:
+        # Only compute the weights of a single horizontal slice
+        index = tuple(slice(None) if dim in dims else 0
+                      for dim in range(cube.ndim))
+        grid_areas = iris.analysis.cartography.area_weights(cube[index])
+        logger.info('Calculated grid area shape: %s', grid_areas.shape)
+        _AREA_WEIGHTS_DISK_CACHE.set(key, grid_areas)
+    return _add_to_cache(_GRID_AREAS_CACHE, key, grid_areas,
+                         _GRID_AREAS_CACHE_SIZE)
+
+
 def tile_grid_areas(cube, fx_files):
     """
-    Tile the grid area data to match the dataset cube.
+    Broadcast the grid area data to match the dataset cube.
+
+    The grid areas are read once for every fx file. They are broadcast to
+    the shape of the cube without copying them.
 
     Parameters
     ----------
@@ -165,29 +268,29 @@ def tile_grid_areas(cube, fx_files):
 
     Returns
     -------
-    iris.cube.Cube
-        Freshly tiled grid areas cube.
+    numpy.ndarray or dask.array.Array
+        Grid areas with the shape of the cube, or `None` if no (non-zero)
+        grid areas are available.
     """
     grid_areas = None
     if fx_files:
-        for key, fx_file in fx_files.items():
+        for fx_file in fx_files.values():
             if fx_file is None:
                 continue
-            logger.info('Attempting to load %s from file: %s', key, fx_file)
-            fx_cube = iris.load_cube(fx_file)
-
-            grid_areas = fx_cube.core_data()
-            if cube.ndim == 4 and grid_areas.ndim == 2:
-                grid_areas = da.tile(grid_areas,
-                                     [cube.shape[0], cube.shape[1], 1, 1])
-            elif cube.ndim == 4 and grid_areas.ndim == 3:
-                grid_areas = da.tile(grid_areas, [cube.shape[0], 1, 1, 1])
-            elif cube.ndim == 3 and grid_areas.ndim == 2:
-                grid_areas = da.tile(grid_areas, [cube.shape[0], 1, 1])
-            else:
+            grid_areas = _load_grid_areas(fx_file)
+            if (cube.ndim, grid_areas.ndim) not in ((4, 2), (4, 3), (3, 2)):
                 raise ValueError('Grid and dataset number of dimensions not '
                                  'recognised: {} and {}.'
                                  ''.format(cube.ndim, grid_areas.ndim))
+            dims = tuple(range(cube.ndim - grid_areas.ndim, cube.ndim))
+            if tuple(cube.shape[dim] for dim in dims) != grid_areas.shape:
+                raise ValueError('Cube shape ({}) doesn`t match grid area '
+                                 'shape ({})'.format(cube.shape,
+                                                     grid_areas.shape))
+            if not grid_areas.any():
+                grid_areas = None
+                continue
+            grid_areas = _broadcast_grid_areas(cube, grid_areas, dims)
     return grid_areas
 
 
@@ -251,14 +354,12 @@ def area_statistics(cube, operator, fx_files=None):
         raise iris.exceptions.CoordinateMultiDimError(cube.coord('latitude'))
 
     coord_names = ['longitude', 'latitude']
-    if grid_areas is None or not grid_areas.any():
+    if grid_areas is None:
         cube = guess_bounds(cube, coord_names)
-        grid_areas = iris.analysis.cartography.area_weights(cube)
-        logger.info('Calculated grid area shape: %s', grid_areas.shape)
-
-    if cube.shape != grid_areas.shape:
-        raise ValueError('Cube shape ({}) doesn`t match grid area shape '
-                         '({})'.format(cube.shape, grid_areas.shape))
+        dims = tuple(sorted(cube.coord_dims('latitude') +
+                            cube.coord_dims('longitude')))
+        grid_areas = _broadcast_grid_areas(
+            cube, _compute_area_weights(cube, dims), dims)
 
     operation = get_iris_analysis_operation(operator)
 
@@ -349,6 +450,15 @@ def _select_representative_point(shape, lon, lat):
     return select
 
 
+def _get_shape_id(item, index):
+    """Get the ID of a shape from its properties or its index."""
+    if 'ID' in item['properties']:
+        return int(item['properties']['ID'])
+    if 'id' in item['properties']:
+        return int(item['properties']['id'])
+    return index
+
+
 def _get_masks_from_geometries(geometries,
                                lon,
                                lat,
@@ -368,14 +478,7 @@ def _get_masks_from_geometries(geometries,
             select = shapely.vectorized.contains(shape, lon, lat)
         if method == 'representative' or not select.any():
             select = _select_representative_point(shape, lon, lat)
-        if 'ID' in item['properties']:
-            id_ = int(item['properties']['ID'])
-        elif 'id' in item['properties']:
-            id_ = int(item['properties']['id'])
-        else:
-            id_ = i
-
-        selections[id_] = select
+        selections[_get_shape_id(item, i)] = select
 
     if not decomposed and len(selections) > 1:
         selection = np.zeros(lat.shape, dtype=bool)
@@ -497,3 +600,355 @@ def extract_shape(cube,
     cube = cubelist.merge_cube()
 
     return fix_coordinate_ordering(cube)
+
+
+def _get_box_fractions(bounds, start, end, period=None):
+    """Get the fraction of every cell that is inside [start, end].
+
+    For longitudes, `period` is 360 and the box may cross the meridian
+    where longitudes wrap around. For latitudes, the fractions are
+    computed from the sine of the bounds, so they are fractions of the
+    area of the cells.
+    """
+    lower = bounds.min(axis=1)
+    upper = bounds.max(axis=1)
+    if period is None:
+        lower, upper, start, end = (
+            np.sin(np.radians(value))
+            for value in (lower, upper, *sorted((start, end))))
+        intervals = [(start, end)]
+    else:
+        shift = np.floor(lower / period) * period
+        lower = lower - shift
+        upper = upper - shift
+        if start != period:
+            start %= period
+        if end != period:
+            end %= period
+        if start <= end:
+            intervals = [(start, end)]
+        else:
+            intervals = [(start, period), (0., end)]
+        # Cells may extend beyond the period after shifting them
+        intervals += [(low + period, high + period)
+                      for (low, high) in intervals]
+    overlap = np.zeros(lower.shape)
+    for low, high in intervals:
+        overlap += np.clip(np.minimum(upper, high) - np.maximum(lower, low),
+                           0., None)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nan_to_num(overlap / (upper - lower), nan=0.)
+
+
+def _get_shape_fractions(shape, lon_bounds, lat_bounds):
+    """Get the fraction of every cell that is inside a shape.
+
+    The fractions are computed in longitude-latitude space, only for the
+    cells within the bounding box of the shape. The cells are shifted by
+    multiples of 360 degrees, so their upper longitude bounds are in the
+    range (``min_lon``, ``min_lon + 360``] that starts at the shape.
+    """
+    fractions = np.zeros((len(lat_bounds), len(lon_bounds)))
+    min_lon, min_lat, max_lon, max_lat = shape.bounds
+    lon_low, lon_high = lon_bounds.min(axis=1), lon_bounds.max(axis=1)
+    shift = 360. * (np.floor((min_lon - lon_high) / 360.) + 1)
+    lon_low, lon_high = lon_low + shift, lon_high + shift
+    lat_low, lat_high = lat_bounds.min(axis=1), lat_bounds.max(axis=1)
+    lon_indices = np.flatnonzero((lon_high > min_lon) & (lon_low < max_lon))
+    lat_indices = np.flatnonzero((lat_high > min_lat) & (lat_low < max_lat))
+    prepared_shape = shapely.prepared.prep(shape)
+    for i in lat_indices:
+        for j in lon_indices:
+            cell = shapely.geometry.box(lon_low[j], lat_low[i], lon_high[j],
+                                        lat_high[i])
+            if prepared_shape.contains(cell):
+                fractions[i, j] = 1.
+            elif prepared_shape.intersects(cell):
+                fractions[i, j] = shape.intersection(cell).area / cell.area
+    return fractions
+
+
+def _get_region_fractions(cube, shapefile, regions, method, fractional):
+    """Get the fraction of every grid cell that is inside every region.
+
+    Returns a dictionary mapping the region names, or the shape IDs, to
+    arrays with the shape of the horizontal grid, in the order of the
+    dimensions of `cube`.
+    """
+    lon = cube.coord('longitude')
+    lat = cube.coord('latitude')
+    regular = lon.ndim == 1 and lat.ndim == 1
+    if fractional and not regular:
+        raise ValueError(
+            "Fractional coverage of regions is only supported for grids "
+            "with one-dimensional latitude and longitude coordinates")
+    if regular:
+        lons, lats = np.meshgrid(lon.points, lat.points)
+    else:
+        lons, lats = lon.points, lat.points
+
+    fractions = {}
+    if shapefile is not None:
+        with fiona.open(shapefile) as geometries:
+            if fractional:
+                for i, item in enumerate(geometries):
+                    shape = shapely.geometry.shape(item['geometry'])
+                    fractions[_get_shape_id(item, i)] = _get_shape_fractions(
+                        shape, lon.bounds, lat.bounds)
+            else:
+                # Use the longitude range of the shapes, e.g. -180 to 180
+                start_longitude = geometries.bounds[0]
+                lons = (lons - start_longitude) % 360. + start_longitude
+                selections = _get_masks_from_geometries(geometries,
+                                                        lons,
+                                                        lats,
+                                                        method=method,
+                                                        decomposed=True)
+                for id_, select in selections.items():
+                    fractions[id_] = select.astype(np.float64)
+    else:
+        for name, box in regions.items():
+            if fractional:
+                fractions[name] = np.outer(
+                    _get_box_fractions(lat.bounds, box['start_latitude'],
+                                       box['end_latitude']),
+                    _get_box_fractions(lon.bounds, box['start_longitude'],
+                                       box['end_longitude'], period=360.),
+                )
+            else:
+                fractions[name] = _select_box(lons % 360., lats,
+                                              **box).astype(np.float64)
+
+    if regular and cube.coord_dims(lon) < cube.coord_dims(lat):
+        fractions = {name: value.T for name, value in fractions.items()}
+    return fractions
+
+
+def _get_horizontal_grid_areas(cube, dims, fx_files):
+    """Get the grid areas of the horizontal dimensions of a cube."""
+    for fx_file in (fx_files or {}).values():
+        if fx_file is None:
+            continue
+        grid_areas = _load_grid_areas(fx_file)
+        if grid_areas.shape != tuple(cube.shape[dim] for dim in dims):
+            raise ValueError('Cube shape ({}) doesn`t match grid area shape '
+                             '({})'.format(cube.shape, grid_areas.shape))
+        if grid_areas.any():
+            return grid_areas
+    if cube.coord('latitude').ndim == 2:
+        logger.error(
+            'fx_file needed to calculate grid cell area for irregular grids.')
+        raise iris.exceptions.CoordinateMultiDimError(cube.coord('latitude'))
+    return _compute_area_weights(cube, dims)
+
+
+def _get_region_weights(cube, dims, shapefile, regions, method, fractional,
+                        fx_files):
+    """Get the sparse (regions x grid cells) matrix of area weights.
+
+    The matrix is computed once for every grid and set of regions and
+    cached in memory and, if ``cache_area_weights`` is set in the user
+    configuration file, in the cache directory.
+
+    Returns
+    -------
+    tuple
+        The matrix and the names or shape IDs of the regions.
+    """
+    if shapefile is None:
+        region_key = [list(regions.items())]
+    else:
+        region_key = [get_file_identity(shapefile), method]
+    fx_key = [get_file_identity(f) for f in (fx_files or {}).values() if f]
+    key = hashlib.sha1(
+        repr([
+            _get_area_weights_key(cube, dims), region_key, fractional, fx_key
+        ]).encode()).hexdigest()
+    value = _REGION_WEIGHTS_CACHE.get(key)
+    if value is None:
+        value = _REGION_WEIGHTS_DISK_CACHE.get(key)
+    if value is None:
+        grid_areas = _get_horizontal_grid_areas(cube, dims, fx_files).ravel()
+        fractions = _get_region_fractions(cube, shapefile, regions, method,
+                                          fractional)
+        rows, columns, weights = [], [], []
+        for row, fraction in enumerate(fractions.values()):
+            fraction = fraction.ravel()
+            index = np.flatnonzero(fraction)
+            rows.append(np.full(index.shape, row))
+            columns.append(index)
+            weights.append(fraction[index] * grid_areas[index])
+        matrix = scipy.sparse.csr_matrix(
+            (np.concatenate(weights),
+             (np.concatenate(rows), np.concatenate(columns))),
+            shape=(len(fractions), grid_areas.size),
+        )
+        value = (matrix, list(fractions))
+        _REGION_WEIGHTS_DISK_CACHE.set(key, value)
+    return _add_to_cache(_REGION_WEIGHTS_CACHE, key, value,
+                         _REGION_WEIGHTS_CACHE_SIZE)
+
+
+def _get_region_statistics_dtype(dtype):
+    """Get the data type of the statistics of data of type `dtype`."""
+    return dtype if np.issubdtype(dtype, np.floating) else np.dtype('float64')
+
+
+def _apply_region_weights(data, weights, operator):
+    """Compute the statistics of all regions with a single matrix product.
+
+    The grid cells are on the last dimension of `data`, the regions are
+    on the last dimension of the result. Masked values are ignored and
+    regions without valid values are masked.
+    """
+    shape = data.shape[:-1] + (weights.shape[0], )
+    dtype = _get_region_statistics_dtype(data.dtype)
+    values = data.reshape(-1, data.shape[-1])
+    mask = np.ma.getmaskarray(values) if np.ma.isMaskedArray(values) else None
+    values = np.ma.getdata(values)
+    if mask is not None and mask.any():
+        values = np.where(mask, 0, values)
+        totals = (weights @ (~mask).T.astype(np.float64)).T
+    else:
+        totals = np.asarray(weights.sum(axis=1)).ravel()
+    result = (weights @ values.T).T
+    if operator == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = result / totals
+    result = np.ma.masked_array(result,
+                                mask=np.broadcast_to(totals == 0,
+                                                     result.shape))
+    return result.astype(dtype).reshape(shape)
+
+
+def _get_region_cube(cube, data, dims, region_coord):
+    """Get a cube with the regions instead of the horizontal dimensions."""
+    other_dims = [dim for dim in range(cube.ndim) if dim not in dims]
+    new_dims = {dim: i for i, dim in enumerate(other_dims)}
+
+    def _get_dims(coord_dims):
+        if set(coord_dims) & set(dims):
+            return None
+        return tuple(new_dims[dim] for dim in coord_dims)
+
+    dim_coords = []
+    aux_coords = [(region_coord, len(other_dims))]
+    for coord in cube.dim_coords:
+        coord_dims = _get_dims(cube.coord_dims(coord))
+        if coord_dims is not None:
+            dim_coords.append((coord.copy(), coord_dims))
+    for coord in cube.aux_coords:
+        coord_dims = _get_dims(cube.coord_dims(coord))
+        if coord_dims is not None:
+            aux_coords.append((coord.copy(), coord_dims))
+    cell_measures = []
+    for measure in cube.cell_measures():
+        measure_dims = _get_dims(cube.cell_measure_dims(measure))
+        if measure_dims is not None:
+            cell_measures.append((measure.copy(), measure_dims))
+    result = iris.cube.Cube(data,
+                            dim_coords_and_dims=dim_coords,
+                            aux_coords_and_dims=aux_coords,
+                            cell_measures_and_dims=cell_measures)
+    result.metadata = cube.metadata
+    return result
+
+
+def region_statistics(cube,
+                      operator='mean',
+                      shapefile=None,
+                      regions=None,
+                      method='contains',
+                      fractional=False,
+                      fx_files=None):
+    """Compute area weighted statistics of many regions in a single pass.
+
+    The regions are defined by a shapefile or by boxes. A sparse matrix
+    with the area weights of every grid cell in every region is computed
+    once for every grid and cached, and the statistics of all regions are
+    computed with a single (lazy) matrix product over the data. This is
+    much faster than using :func:`extract_shape` or :func:`extract_region`
+    followed by :func:`area_statistics` for every region.
+
+    Parameters
+    ----------
+    cube: iris.cube.Cube
+        input cube.
+    operator: str, optional
+        The operation, options: mean, sum.
+    shapefile: str, optional
+        A shapefile defining the regions, every shape is a region.
+    regions: dict, optional
+        The regions as a dictionary mapping the names of the regions to
+        boxes, given as dictionaries with the arguments `start_longitude`,
+        `end_longitude`, `start_latitude` and `end_latitude` of
+        :func:`extract_region`.
+    method: str, optional
+        Select all points contained by the shapes or select a single
+        representative point, see :func:`extract_shape`. Choose either
+        'contains' or 'representative'.
+    fractional: bool, optional
+        Weight the grid cells by the fraction of their area inside the
+        regions, instead of selecting the cells with their centre inside
+        the regions. Only supported for grids with one-dimensional latitude
+        and longitude coordinates.
+    fx_files: dict, optional
+        dictionary of field:filename for the fx_files with the grid cell
+        areas.
+
+    Returns
+    -------
+    iris.cube.Cube
+        Cube with a `region` coordinate on the last dimension instead of
+        the horizontal dimensions. Its values are the names of the regions,
+        or the IDs of the shapes.
+
+    Raises
+    ------
+    ValueError
+        if not exactly one of `shapefile` or `regions` is given, or the
+        operator is not supported.
+    iris.exceptions.CoordinateMultiDimError
+        if the grid is irregular and no grid areas are given.
+    """
+    if (shapefile is None) == (regions is None):
+        raise ValueError(
+            "Specify exactly one of the arguments `shapefile` or `regions`")
+    if operator not in ('mean', 'sum'):
+        raise ValueError(
+            "Operator '{}' is not supported by region_statistics, choose "
+            "from 'mean', 'sum'".format(operator))
+    lon = cube.coord('longitude')
+    lat = cube.coord('latitude')
+    if lon.ndim == 1 and lat.ndim == 1:
+        cube = guess_bounds(cube, ['longitude', 'latitude'])
+    dims = tuple(sorted(set(cube.coord_dims(lat) + cube.coord_dims(lon))))
+    weights, names = _get_region_weights(cube, dims, shapefile, regions,
+                                         method, fractional, fx_files)
+
+    dtype = _get_region_statistics_dtype(cube.dtype)
+    destination = tuple(range(-len(dims), 0))
+    if cube.has_lazy_data():
+        data = da.moveaxis(cube.lazy_data(), dims, destination)
+        data = data.rechunk({dim: -1 for dim in destination})
+        data = data.reshape(data.shape[:-len(dims)] + (-1, ))
+        data = da.map_blocks(
+            _apply_region_weights,
+            data,
+            chunks=data.chunks[:-1] + ((len(names), ), ),
+            dtype=dtype,
+            meta=np.ma.masked_array(np.empty((0, ) * data.ndim, dtype=dtype)),
+            weights=weights,
+            operator=operator,
+        )
+    else:
+        data = np.moveaxis(cube.data, dims, destination)
+        data = data.reshape(data.shape[:-len(dims)] + (-1, ))
+        data = _apply_region_weights(data, weights, operator)
+
+    region_coord = iris.coords.AuxCoord(names,
+                                        long_name='region',
+                                        units='no_unit')
+    result = _get_region_cube(cube, data, dims, region_coord)
+    get_iris_analysis_operation(operator).update_metadata(result, [lon, lat])
+    return result
@@ -3,7 +3,7 @@ import logging
 import os
 import subprocess
 
-from .._data_finder import get_start_end_year, select_files
+from .._data_finder import get_start_end_years, select_files
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +36,10 @@ def synda_search(variable):
                              variable['end_year'])
 
         # filter partially overlapping files
-        intervals = {get_start_end_year(name): name for name in files}
+        intervals = {
+            years: name
+            for name, years in get_start_end_years(files).items()
+        }
         files = []
         for (start, end), filename in intervals.items():
             for _start, _end in intervals:
@@ -64,8 +64,12 @@ def load(file, callback=None):
         raw_cubes = iris.load_raw(file, callback=callback)
     if not raw_cubes:
         raise Exception('Can not load cubes from {0}'.format(file))
+    # Apply the changes of virtual file fixes
+    for overlay in getattr(file, 'overlays', ()):
+        for cube in raw_cubes:
+            overlay.apply(cube)
     for cube in raw_cubes:
-        cube.attributes['source_file'] = file
+        cube.attributes['source_file'] = str(file)
     return raw_cubes
 
 
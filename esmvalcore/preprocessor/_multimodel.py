@@ -13,13 +13,14 @@ It operates on different (time) spans:
 """
 
 import logging
-from datetime import datetime
 from functools import reduce
 
 import cf_units
 import iris
 import numpy as np
 
+from .._calendar import get_time_components
+
 logger = logging.getLogger(__name__)
 
 
@@ -158,23 +159,25 @@ def _put_in_cube(template_cube, cube_data, statistic, t_axis):
 
 def _datetime_to_int_days(cube):
     """Return list of int(days) converted from cube datetime cells."""
-    time_cells = [cell.point for cell in cube.coord('time').cells()]
-    time_unit = cube.coord('time').units.name
-    time_offset = _get_time_offset(time_unit)
-
-    # extract date info
-    real_dates = []
-    for date_obj in time_cells:
-        # real_date resets the actual data point day
-        # to the 1st of the month so that there are no
-        # wrong overlap indeces
-        # NOTE: this workaround is good only
-        # for monthly data
-        real_date = datetime(date_obj.year, date_obj.month, 1, 0, 0, 0)
-        real_dates.append(real_date)
-
-    days = [(date_obj - time_offset).days for date_obj in real_dates]
-    return days
+    time_coord = cube.coord('time')
+    years, months = get_time_components(time_coord.points,
+                                        time_coord.units)[:2]
+    time_offset = _get_time_offset(time_coord.units.name)
+    time_offset = np.datetime64(
+        '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}'.format(
+            time_offset.year, time_offset.month, time_offset.day,
+            time_offset.hour, time_offset.minute, time_offset.second), 's')
+
+    # the actual data point day is reset to the 1st of the month so that
+    # there are no wrong overlap indeces
+    # NOTE: this workaround is good only
+    # for monthly data
+    real_dates = ((years - 1970) * 12 + months - 1).astype('datetime64[M]')
+
+    seconds = (real_dates.astype('datetime64[s]') -
+               time_offset).astype(np.int64)
+    days = seconds // 86400
+    return days.tolist()
 
 
 def _get_overlap(cubes):
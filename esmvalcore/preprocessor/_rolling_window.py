@@ -0,0 +1,270 @@
+"""Preprocessor functions that compute statistics over rolling windows."""
+import logging
+
+import dask.array as da
+import numpy as np
+
+from ._shared import get_iris_analysis_operation
+
+logger = logging.getLogger(__name__)
+
+# Operators that are computed lazily in a single pass over the data
+_LAZY_OPERATORS = ('mean', 'sum', 'min', 'max')
+
+
+def _take(data, start, stop, axis):
+    """Slice data along axis."""
+    index = [slice(None)] * data.ndim
+    index[axis] = slice(start, stop)
+    return data[tuple(index)]
+
+
+def _window_sums(values, window, axis, dtype):
+    """Sum values over every window along axis using a cumulative sum."""
+    cumsum = np.cumsum(values, axis=axis, dtype=dtype)
+    sums = _take(cumsum, window - 1, None, axis).copy()
+    _take(sums, 1, None, axis)[...] -= _take(cumsum, None, -window, axis)
+    return sums
+
+
+def _window_extremes(values, window, axis, ufunc):
+    """Reduce values over every window along axis with a running ufunc.
+
+    This is the van Herk/Gil-Werman algorithm: the running reductions
+    from the start and from the end of blocks of `window` values give the
+    result for every window with two evaluations of `ufunc` per value.
+    """
+    values = np.moveaxis(values, axis, -1)
+    length = values.shape[-1]
+    padding = -length % window
+    if padding:
+        fill = np.full(values.shape[:-1] + (padding, ), values[..., -1:])
+        values = np.concatenate([values, fill], axis=-1)
+    blocks = values.reshape(values.shape[:-1] + (-1, window))
+    forward = ufunc.accumulate(blocks, axis=-1).reshape(values.shape)
+    backward = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1]
+    backward = backward.reshape(values.shape)
+    result = ufunc(backward[..., :length - window + 1],
+                   forward[..., window - 1:length])
+    return np.moveaxis(result, -1, axis)
+
+
+def _get_extreme_fill(dtype, operator):
+    """Get the value that does not change the minimum or maximum."""
+    if np.issubdtype(dtype, np.floating):
+        info = {'min': np.inf, 'max': -np.inf}
+    else:
+        info = {'min': np.iinfo(dtype).max, 'max': np.iinfo(dtype).min}
+    return info[operator]
+
+
+def _get_non_finite_sums(values, window, axis):
+    """Get the sums of the windows that contain non-finite values.
+
+    Cumulative sums cannot be used for these windows, because the
+    non-finite values would spread to all following windows.
+    """
+    counts = [
+        _window_sums(condition, window, axis, np.int64) for condition in
+        (np.isnan(values), values == np.inf, values == -np.inf)
+    ]
+    nans, positive, negative = counts
+    sums = np.where(positive > 0, np.inf, -np.inf)
+    sums[nans + positive * negative > 0] = np.nan
+    return sums, nans + positive + negative > 0
+
+
+def _rolling_window_statistics(data, operator, window, axis):
+    """Compute statistics over rolling windows of a numpy array.
+
+    The result has `window - 1` fewer elements along `axis` than `data`.
+    Masked values are ignored and a window is masked if all of its values
+    are.
+    """
+    mask = np.ma.getmaskarray(data) if np.ma.isMaskedArray(data) else None
+    values = np.ma.getdata(data)
+    if np.issubdtype(values.dtype, np.floating) or operator in ('min', 'max'):
+        dtype = values.dtype
+    else:
+        dtype = np.dtype(np.float64 if operator == 'mean' else np.int64)
+    if operator in ('min', 'max'):
+        if mask is not None:
+            values = np.where(mask, _get_extreme_fill(values.dtype, operator),
+                              values)
+        ufunc = np.minimum if operator == 'min' else np.maximum
+        result = _window_extremes(values, window, axis, ufunc)
+    else:
+        if mask is not None:
+            values = np.where(mask, 0, values)
+        finite = np.isfinite(values)
+        non_finite = None
+        if not finite.all():
+            non_finite = _get_non_finite_sums(values, window, axis)
+            values = np.where(finite, values, 0)
+        accumulator = (np.float64
+                       if np.issubdtype(dtype, np.floating) else np.int64)
+        result = _window_sums(values, window, axis, accumulator)
+        if non_finite is not None:
+            result = np.where(non_finite[1], non_finite[0], result)
+        if operator == 'mean':
+            if mask is None:
+                count = window
+            else:
+                count = _window_sums(~mask, window, axis, np.int64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = result / count
+    result = result.astype(dtype, copy=False)
+
+    if mask is None:
+        return result
+    count_mask = _window_sums(~mask, window, axis, np.int64) == 0
+    return np.ma.masked_array(result, mask=count_mask)
+
+
+def _rolling_window_chunk(block, operator, window, axis):
+    """Compute the statistics of the windows ending in a chunk.
+
+    Apart from the first chunk, the chunks are extended with the last
+    `window - 1` points of the previous chunk.
+    """
+    return _rolling_window_statistics(block, operator, window, axis)
+
+
+def _get_rolling_chunks(chunks, window):
+    """Merge chunks so that every chunk has at least `window` points."""
+    merged = []
+    for size in chunks:
+        if merged and (merged[-1] < window or size < window):
+            merged[-1] += size
+        else:
+            merged.append(size)
+    return tuple(merged)
+
+
+def _lazy_rolling_window_statistics(data, operator, window, axis):
+    """Compute statistics over rolling windows of a dask array."""
+    chunks = _get_rolling_chunks(data.chunks[axis], window)
+    data = data.rechunk({axis: chunks})
+    out_chunks = list(data.chunks)
+    out_chunks[axis] = (chunks[0] - window + 1, ) + chunks[1:]
+    sample = np.zeros((window, ), dtype=data.dtype)
+    dtype = _rolling_window_statistics(sample, operator, window, 0).dtype
+    meta = np.empty((0, ) * data.ndim, dtype=dtype)
+    if np.ma.isMaskedArray(data._meta):
+        meta = np.ma.masked_array(meta)
+    return da.map_overlap(
+        _rolling_window_chunk,
+        data,
+        depth={axis: (window - 1, 0)},
+        boundary='none',
+        trim=False,
+        chunks=tuple(out_chunks),
+        dtype=dtype,
+        meta=meta,
+        operator=operator,
+        window=window,
+        axis=axis,
+    )
+
+
+def _get_rolling_window_cube(cube, coord, dim, window):
+    """Get a cube with the coordinates of the windows along `dim`.
+
+    The coordinates are the same as the ones of
+    :meth:`iris.cube.Cube.rolling_window`.
+    """
+    index = [slice(None)] * cube.ndim
+    index[dim] = slice(None, cube.shape[dim] - window + 1)
+    result = cube[tuple(index)]
+    for measure in result.cell_measures():
+        if dim in result.cell_measure_dims(measure):
+            result.remove_cell_measure(measure)
+    # Ancillary variables are only available in iris 3 and later
+    for variable in getattr(result, 'ancillary_variables', list)():
+        if dim in result.ancillary_variable_dims(variable):
+            result.remove_ancillary_variable(variable)
+
+    for coord_ in cube.coords(dimensions=dim):
+        if coord_.ndim != 1:
+            raise ValueError(
+                "Cannot calculate the rolling window of {} as it is a "
+                "multidimensional coordinate.".format(coord_.name()))
+        first = coord_.points[:len(coord_.points) - window + 1]
+        last = coord_.points[window - 1:]
+        if np.issubdtype(first.dtype, np.str_):
+            windows = np.stack(
+                [coord_.points[i:i + len(first)] for i in range(window)], -1)
+            points = np.array(['|'.join(values) for values in windows])
+        else:
+            points = (first + last) / 2.
+        new_coord = result.coord(coord_)
+        new_coord.bounds = None
+        new_coord.points = points
+        new_coord.bounds = np.stack([first, last], -1)
+    return result
+
+
+def rolling_window_statistics(cube, coordinate='time', operator='mean',
+                              window_length=5):
+    """
+    Compute statistics over a rolling window along a coordinate.
+
+    The result is the same as the one of
+    :meth:`iris.cube.Cube.rolling_window`. For the operators 'mean', 'sum',
+    'min' and 'max', the statistics are computed lazily with running sums
+    and running extremes, so the cost does not depend on the length of the
+    window. The other operators load the data.
+
+    Parameters
+    ----------
+    cube: iris.cube.Cube
+        input cube.
+    coordinate: str
+        Coordinate over which the rolling window is applied.
+    operator: str, optional
+        Select operator to apply.
+        Available operators: 'mean', 'median', 'std_dev', 'sum', 'variance',
+        'min', 'max'
+    window_length: int
+        Number of points in every window.
+
+    Returns
+    -------
+    iris.cube.Cube
+        Cube with `window_length - 1` fewer points along the coordinate.
+
+    Raises
+    ------
+    ValueError
+        if the window is shorter than 2 points or longer than the
+        coordinate.
+    """
+    aggregator = get_iris_analysis_operation(operator)
+    operator = operator.lower()
+    coord = cube.coord(coordinate)
+    dims = cube.coord_dims(coord)
+    if len(dims) != 1:
+        raise ValueError(
+            "Cannot compute a rolling window over coordinate {}, it must "
+            "map to one data dimension".format(coord.name()))
+    dim = dims[0]
+    if not 2 <= window_length <= cube.shape[dim]:
+        raise ValueError(
+            "The window length {} must be at least 2 and at most the length "
+            "{} of coordinate {}".format(window_length, cube.shape[dim],
+                                         coord.name()))
+    if operator not in _LAZY_OPERATORS:
+        return cube.rolling_window(coord, aggregator, window_length)
+
+    result = _get_rolling_window_cube(cube, coord, dim, window_length)
+    aggregator.update_metadata(
+        result, [coord],
+        action="with a rolling window of length {} over".format(
+            window_length))
+    if cube.has_lazy_data():
+        data = _lazy_rolling_window_statistics(cube.lazy_data(), operator,
+                                               window_length, dim)
+    else:
+        data = _rolling_window_statistics(cube.data, operator,
+                                          window_length, dim)
+    return aggregator.post_process(result, data, [coord])
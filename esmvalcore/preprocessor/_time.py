@@ -3,16 +3,23 @@
 Allows for selecting data subsets using certain time bounds;
 constructing seasonal and area averages.
 """
+import contextlib
 import datetime
+import hashlib
 import logging
 from warnings import filterwarnings
 
+import cf_units
 import dask.array as da
 import iris
+import iris.analysis
 import iris.coord_categorisation
+import iris.coords
 import iris.util
 import numpy as np
 
+from .._cache import DiskCache, get_array_fingerprint, get_file_identity
+from .._calendar import get_time_components
 from ._shared import get_iris_analysis_operation, operator_accept_weights
 
 logger = logging.getLogger(__name__)
@@ -35,6 +42,456 @@ for _coord in (
     )
 
 
+# Realized climatologies by a fingerprint of the input cube, the operator
+# and the period, see _get_climatology
+_CLIMATOLOGY_CACHE = {}
+_CLIMATOLOGY_CACHE_SIZE = 8
+_CLIMATOLOGY_DISK_CACHE = DiskCache('climatologies',
+                                    option='cache_climatologies')
+# Input files of the product being preprocessed, see _climatology_input_files
+_CLIMATOLOGY_INPUT_FILES = []
+
+_SEASONS = np.array(['djf', 'mam', 'jja', 'son'], dtype='U64')
+
+
+def _get_days_units(units):
+    """Get units of days since the day of the reference time of `units`.
+
+    Converting to these units only needs a scale factor and an offset.
+    """
+    ref = units.num2date(0)
+    return cf_units.Unit(
+        'days since {:04d}-{:02d}-{:02d}'.format(ref.year, ref.month,
+                                                 ref.day),
+        calendar=units.calendar,
+    )
+
+
+def _get_day_of_year(time, years):
+    """Get the day of the year of every time point."""
+    days_units = _get_days_units(time.units)
+    days = time.units.convert(time.points.astype(np.float64), days_units)
+    # Round to whole seconds to avoid floating point errors at midnight
+    days = np.floor(np.round(days * 86400.) / 86400.)
+    unique_years, inverse = np.unique(years, return_inverse=True)
+    first_days = np.array([
+        cf_units.Unit('days since {:04d}-01-01'.format(year),
+                      calendar=time.units.calendar).convert(0., days_units)
+        for year in unique_years
+    ])
+    return (days - first_days[inverse]).astype(np.int64) + 1
+
+
+def _categorise_time(cube, period):
+    """Get the group of every time point and coordinates describing them.
+
+    Parameters
+    ----------
+    cube: iris.cube.Cube
+        input cube.
+    period: str
+        One of 'day', 'month', 'season', 'year' or 'decade'.
+
+    Returns
+    -------
+    numpy.ndarray
+        Group id of every time point, increasing with time.
+    list(iris.coords.AuxCoord)
+        Categorisation coordinates of the time points, the same as the ones
+        created by :mod:`iris.coord_categorisation`.
+    """
+    time = cube.coord('time')
+    years, months = get_time_components(time.points, time.units)[:2]
+    if period == 'day':
+        day_of_year = _get_day_of_year(time, years)
+        categories = [('day_of_year', day_of_year), ('year', years)]
+        ids = years * 367 + day_of_year
+    elif period == 'month':
+        categories = [('month_number', months), ('year', years)]
+        ids = years * 12 + months
+    elif period == 'season':
+        season = months % 12 // 3
+        season_year = years + (months == 12)
+        categories = [('clim_season', _SEASONS[season]),
+                      ('season_year', season_year)]
+        ids = season_year * 4 + season
+    elif period == 'year':
+        categories = [('year', years)]
+        ids = years
+    elif period == 'decade':
+        decades = years - years % 10
+        categories = [('decade', decades)]
+        ids = decades
+    else:
+        raise ValueError("Period {} not supported".format(period))
+
+    coords = [
+        _get_categorised_coord(time, name, points)
+        for name, points in categories
+    ]
+    return ids, coords
+
+
+def _get_categorised_coord(time, name, points):
+    """Create a coordinate like :mod:`iris.coord_categorisation` does."""
+    units = 'no_unit' if points.dtype.kind == 'U' else '1'
+    coord = iris.coords.AuxCoord(points,
+                                 units=units,
+                                 attributes=time.attributes.copy())
+    coord.rename(name)
+    return coord
+
+
+_SECONDS_PER_STEP = {
+    'day': 86400,
+    '6hr': 6 * 3600,
+    '3hr': 3 * 3600,
+    '1hr': 3600,
+}
+
+
+def _floor_time_points(time, frequency):
+    """Move time points to the start of their period at the frequency.
+
+    Monthly points are moved to the 15th and yearly ones to the 1st of July
+    of their month or year. The periods are found with integer calendar
+    arithmetic on the whole time axis.
+    """
+    units = time.units
+    days_units = _get_days_units(units)
+    if frequency in _SECONDS_PER_STEP:
+        # Days are whole in every calendar, so sub-daily periods only need
+        # the seconds since a reference midnight.
+        step = _SECONDS_PER_STEP[frequency]
+        seconds = np.round(
+            units.convert(time.points.astype(np.float64), days_units) *
+            86400).astype(np.int64)
+        return days_units.convert((seconds - seconds % step) / 86400., units)
+
+    years, months = get_time_components(time.points, units)[:2]
+    if frequency == 'yr':
+        periods, inverse = np.unique(years, return_inverse=True)
+        dates = ['{:04d}-07-01'.format(year) for year in periods]
+    elif frequency == 'mon':
+        periods, inverse = np.unique(years * 12 + months - 1,
+                                     return_inverse=True)
+        dates = [
+            '{:04d}-{:02d}-15'.format(period // 12, period % 12 + 1)
+            for period in periods
+        ]
+    else:
+        raise ValueError(
+            "Frequency {} not supported, use one of 'yr', 'mon', {}".format(
+                frequency, ', '.join(repr(f) for f in _SECONDS_PER_STEP)))
+    points = np.array([
+        cf_units.Unit('days since ' + date,
+                      calendar=units.calendar).convert(0., days_units)
+        for date in dates
+    ])
+    return days_units.convert(points[inverse], units)
+
+
+def _get_chunks(sizes, chunk_size):
+    """Put consecutive groups in chunks of about chunk_size time points.
+
+    Returns the number of time points and the number of groups per chunk.
+    """
+    starts = np.cumsum(sizes) - sizes
+    group_counts = np.unique(starts // chunk_size, return_counts=True)[1]
+    first_groups = np.cumsum(group_counts) - group_counts
+    return np.add.reduceat(sizes, first_groups), group_counts
+
+
+def _reduceat(data, aggregator, axis, sizes, weights=None):
+    """Compute a mean, sum, minimum or maximum of groups of any size."""
+    starts = np.cumsum(sizes) - sizes
+    mask = np.ma.getmaskarray(data)
+    count = np.add.reduceat(~mask, starts, axis=axis)
+    if aggregator in (iris.analysis.MIN, iris.analysis.MAX):
+        if aggregator is iris.analysis.MIN:
+            func = np.minimum
+            fill_value = np.ma.minimum_fill_value(data)
+        else:
+            func = np.maximum
+            fill_value = np.ma.maximum_fill_value(data)
+        result = func.reduceat(np.ma.filled(data, fill_value), starts,
+                               axis=axis)
+        return np.ma.masked_where(count == 0, result)
+
+    # Use the same dtype as the aggregator
+    sample = data[(slice(0, 1), ) * data.ndim]
+    kwargs = {}
+    if weights is not None:
+        kwargs['weights'] = weights[(slice(0, 1), ) * data.ndim]
+    dtype = aggregator.aggregate(sample, axis, **kwargs).dtype
+
+    values = np.ma.filled(data, 0)
+    if weights is not None:
+        weights = np.where(mask, 0, weights)
+        values = values * weights
+    result = np.add.reduceat(values,
+                             starts,
+                             axis=axis,
+                             dtype=np.add.reduce(values[:0]).dtype)
+    if aggregator is iris.analysis.MEAN:
+        if weights is not None:
+            count = np.add.reduceat(weights, starts, axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = result / count
+    return np.ma.masked_where(count == 0, result.astype(dtype))
+
+
+def _aggregate_chunk(data, aggregator, axis, sizes, weights=None):
+    """Aggregate consecutive groups of time points of the given sizes."""
+    result = _aggregate_groups(data, aggregator, axis, sizes, weights)
+    if np.ma.isMaskedArray(result) and not np.ma.isMaskedArray(data):
+        # Like numpy, return NaN for undefined results of unmasked data
+        if np.ma.is_masked(result):
+            return np.ma.filled(result, np.nan)
+        return result.data
+    return result
+
+
+def _aggregate_groups(data, aggregator, axis, sizes, weights):
+    """Aggregate groups of time points, see :func:`_aggregate_chunk`."""
+    kwargs = {}
+    if weights is not None:
+        shape = [1] * data.ndim
+        shape[axis] = -1
+        weights = np.broadcast_to(weights.reshape(shape), data.shape)
+    sizes = np.asarray(sizes)
+    if np.all(sizes == sizes[0]):
+        # Regular sampling, e.g. 24 hours per day
+        shape = (data.shape[:axis] + (len(sizes), sizes[0]) +
+                 data.shape[axis + 1:])
+        if weights is not None:
+            kwargs['weights'] = weights.reshape(shape)
+        return aggregator.aggregate(data.reshape(shape), axis + 1, **kwargs)
+    if aggregator in (iris.analysis.MEAN, iris.analysis.SUM,
+                      iris.analysis.MIN, iris.analysis.MAX):
+        return _reduceat(data, aggregator, axis, sizes, weights)
+    results = []
+    start = 0
+    for size in sizes:
+        index = (slice(None), ) * axis + (slice(start, start + size), )
+        if weights is not None:
+            kwargs['weights'] = weights[index]
+        results.append(
+            np.ma.expand_dims(
+                aggregator.aggregate(data[index], axis, **kwargs), axis))
+        start += size
+    return np.ma.concatenate(results, axis=axis)
+
+
+def _aggregate_chunk_lazy(data, aggregator, axis, sizes, weights,
+                          out_dtype, block_info=None):
+    """Aggregate the groups in a chunk, see :func:`_aggregate_data`."""
+    index = block_info[0]['chunk-location'][axis]
+    start, stop = block_info[0]['array-location'][axis]
+    if weights is not None:
+        weights = weights[start:stop]
+    result = _aggregate_chunk(data, aggregator, axis, sizes[index], weights)
+    return result.astype(out_dtype, copy=False)
+
+
+def _aggregate_data(data, aggregator, axis, sizes, weights=None):
+    """Aggregate groups of consecutive time points.
+
+    Lazy data is rechunked along time so that every chunk contains whole
+    groups, then all chunks are aggregated independently.
+    """
+    if not isinstance(data, da.Array):
+        return _aggregate_chunk(data, aggregator, axis, sizes, weights)
+
+    chunk_sizes, group_counts = _get_chunks(sizes, max(data.chunks[axis]))
+    data = data.rechunk({axis: tuple(chunk_sizes)})
+    bounds = np.cumsum(group_counts) - group_counts
+    chunk_groups = [
+        sizes[start:start + count]
+        for start, count in zip(bounds, group_counts)
+    ]
+    # Use the same dtype as the lazy aggregator
+    sample = data[(slice(0, 1), ) * data.ndim]
+    kwargs = {}
+    if weights is not None:
+        kwargs['weights'] = da.from_array(weights[:1]).reshape(sample.shape)
+    if aggregator.lazy_func is None:
+        if isinstance(data._meta, np.ma.MaskedArray):
+            sample = np.ma.zeros(sample.shape, dtype=data.dtype)
+        else:
+            sample = np.zeros(sample.shape, dtype=data.dtype)
+        dtype = _aggregate_chunk(sample, aggregator, axis, [1],
+                                 weights if weights is None else
+                                 weights[:1]).dtype
+    else:
+        dtype = aggregator.lazy_aggregate(sample, axis, **kwargs).dtype
+    chunks = list(data.chunks)
+    chunks[axis] = tuple(group_counts)
+    return da.map_blocks(
+        _aggregate_chunk_lazy,
+        data,
+        aggregator=aggregator,
+        axis=axis,
+        sizes=chunk_groups,
+        weights=weights,
+        out_dtype=dtype,
+        dtype=dtype,
+        chunks=tuple(chunks),
+        meta=np.ma.zeros((0, ) * data.ndim, dtype=dtype),
+    )
+
+
+def _collapse_coord(coord, sizes):
+    """Collapse groups of points of a coordinate like iris does."""
+    starts = np.cumsum(sizes) - sizes
+    ends = starts + sizes - 1
+    if coord.dtype.kind in 'SU':
+        bounds = None
+        points = np.array([
+            '|'.join(coord.points[start:end + 1])
+            for start, end in zip(starts, ends)
+        ])
+    else:
+        if coord.has_bounds():
+            bounds = np.stack(
+                [coord.bounds[starts, 0], coord.bounds[ends, 1]], axis=-1)
+        else:
+            bounds = np.stack([coord.points[starts], coord.points[ends]],
+                              axis=-1)
+        points = bounds.mean(axis=-1)
+    try:
+        return coord.copy(points, bounds)
+    except ValueError:
+        # Points or bounds are not monotonic
+        return iris.coords.AuxCoord.from_coord(coord).copy(points, bounds)
+
+
+def _can_aggregate_time(cube, time_dim):
+    """Check if only 1D coordinates and no other metadata span time."""
+    for coord in cube.coords(contains_dimension=time_dim):
+        if coord.ndim > 1:
+            return False
+    for factory in cube.aux_factories:
+        for coord in factory.dependencies.values():
+            if coord is not None and time_dim in cube.coord_dims(coord):
+                return False
+    for measure in cube.cell_measures():
+        if time_dim in cube.cell_measure_dims(measure):
+            return False
+    # Ancillary variables are only available in iris 3 and later
+    for variable in getattr(cube, 'ancillary_variables', list)():
+        if time_dim in cube.ancillary_variable_dims(variable):
+            return False
+    return True
+
+
+def _weighted_mean_by(cube, names, weights, time_dim):
+    """Get the weighted mean of the groups given by coordinates `names`."""
+    data = cube.core_data()
+    shape = [1] * cube.ndim
+    shape[time_dim] = -1
+    weights = weights.reshape(shape)
+    if cube.has_lazy_data():
+        weights = da.from_array(weights, chunks=[
+            data.chunks[dim] if dim == time_dim else 1
+            for dim in range(data.ndim)
+        ])
+        weights = da.broadcast_to(weights, cube.shape, chunks=data.chunks)
+        weights = da.ma.masked_array(weights, mask=da.ma.getmaskarray(data))
+    else:
+        weights = np.ma.masked_array(np.broadcast_to(weights, cube.shape),
+                                     mask=np.ma.getmaskarray(data))
+    total = cube.copy(data * weights).aggregated_by(names, iris.analysis.SUM)
+    norm = cube.copy(weights).aggregated_by(names, iris.analysis.SUM)
+    return total.core_data() / norm.core_data()
+
+
+def _aggregate_time(cube, operator, ids, coords, weights=None):
+    """Aggregate consecutive time points that have the same group id.
+
+    This is a fast replacement of :meth:`iris.cube.Cube.aggregated_by` for
+    groups along time, the result is the same.
+
+    Parameters
+    ----------
+    cube: iris.cube.Cube
+        input cube.
+    operator: str
+        Name of the operator.
+    ids: numpy.ndarray
+        Group id of every time point.
+    coords: list(iris.coords.AuxCoord)
+        Coordinates along time describing the groups.
+    weights: numpy.ndarray, optional
+        Weight of every time point, only used if the operator is the mean.
+
+    Returns
+    -------
+    iris.cube.Cube
+        Cube with one point along time per group.
+    """
+    aggregator = get_iris_analysis_operation(operator)
+    time_dim = cube.coord_dims('time')[0]
+    if np.any(np.diff(ids) < 0) or not _can_aggregate_time(cube, time_dim):
+        cube = cube.copy()
+        for coord in coords:
+            if cube.coords(coord.name()):
+                cube.remove_coord(coord.name())
+            cube.add_aux_coord(coord, time_dim)
+        names = [coord.name() for coord in coords]
+        result = cube.aggregated_by(names, aggregator)
+        if weights is not None:
+            # Cube.aggregated_by cannot use weights, so the weighted mean
+            # is computed from weighted sums.
+            result.data = _weighted_mean_by(cube, names, weights,
+                                            time_dim).astype(result.dtype)
+        return result
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1])
+    sizes = np.diff(np.append(starts, len(ids)))
+    data = _aggregate_data(cube.core_data(), aggregator, time_dim, sizes,
+                           weights)
+
+    names = [coord.name() for coord in coords]
+    result = cube[(slice(None), ) * time_dim + (starts, )]
+    for coord in cube.coords(dimensions=time_dim):
+        result.remove_coord(coord.name())
+        if coord.name() in names:
+            continue
+        coord = _collapse_coord(coord, sizes)
+        if isinstance(coord, iris.coords.DimCoord):
+            result.add_dim_coord(coord, time_dim)
+        else:
+            result.add_aux_coord(coord, time_dim)
+    coords = [coord[starts] for coord in coords]
+    for coord in coords:
+        result.add_aux_coord(coord, time_dim)
+    result.data = data
+    aggregator.update_metadata(result, coords)
+    return result
+
+
+def _select_time(cube, indices):
+    """Select time points by their indices like :meth:`iris.cube.Cube.extract`.
+
+    Returns `None` if no time point is selected and removes the time
+    dimension if a single one is. Consecutive time points are selected
+    with a slice.
+    """
+    if not indices.size:
+        return None
+    time_dims = cube.coord_dims('time')
+    if not time_dims:
+        return cube
+    if indices.size == 1:
+        index = int(indices[0])
+    elif indices[-1] - indices[0] + 1 == indices.size:
+        index = slice(indices[0], indices[-1] + 1)
+    else:
+        index = indices
+    return cube[(slice(None), ) * time_dims[0] + (index, )]
+
+
 def extract_time(cube, start_year, start_month, start_day, end_year, end_month,
                  end_day):
     """
@@ -84,10 +541,13 @@ def extract_time(cube, start_year, start_month, start_day, end_year, end_month,
 
     t_1 = time_units.date2num(start_date)
     t_2 = time_units.date2num(end_date)
-    constraint = iris.Constraint(
-        time=lambda t: t_1 <= time_units.date2num(t.point) < t_2)
+    points = cube.coord('time').points
+    if cube.coord_dims('time') and points[0] <= points[-1]:
+        indices = np.arange(*np.searchsorted(points, [t_1, t_2]))
+    else:
+        indices = np.flatnonzero((t_1 <= points) & (points < t_2))
 
-    cube_slice = cube.extract(constraint)
+    cube_slice = _select_time(cube, indices)
     if cube_slice is None:
         start_cube = str(cube.coord('time').points[0])
         end_cube = str(cube.coord('time').points[-1])
@@ -122,13 +582,19 @@ def extract_season(cube, season):
     iris.cube.Cube
         data cube for specified season.
     """
-    if not cube.coords('clim_season'):
-        iris.coord_categorisation.add_season(cube, 'time', name='clim_season')
-    if not cube.coords('season_year'):
-        iris.coord_categorisation.add_season_year(cube,
-                                                  'time',
-                                                  name='season_year')
-    return cube.extract(iris.Constraint(clim_season=season.lower()))
+    time = cube.coord('time')
+    months = get_time_components(time.points, time.units)[1]
+    season = np.flatnonzero(_SEASONS == season.lower())
+    indices = np.flatnonzero(np.isin(months % 12 // 3, season))
+    cube = _select_time(cube, indices)
+    if cube is None:
+        return None
+
+    coords = _categorise_time(cube, 'season')[1]
+    for coord in coords:
+        if not cube.coords(coord.name()):
+            cube.add_aux_coord(coord, cube.coord_dims('time'))
+    return cube
 
 
 def extract_month(cube, month):
@@ -149,13 +615,41 @@ def extract_month(cube, month):
     """
     if month not in range(1, 13):
         raise ValueError('Please provide a month number between 1 and 12.')
-    return cube.extract(iris.Constraint(month_number=month))
+    time = cube.coord('time')
+    months = get_time_components(time.points, time.units)[1]
+    return _select_time(cube, np.flatnonzero(months == month))
+
+
+def _get_time_thickness(cube):
+    """Get the length of every time interval from the time bounds."""
+    time = cube.coord('time')
+    return np.abs(time.bounds[..., 1] - time.bounds[..., 0])
+
+
+def _get_group_weights(cube, operator):
+    """Get the time weights for aggregating groups of time points.
+
+    Only means are weighted, sums keep adding up the values of the time
+    points. Without time bounds, all time points have the same weight.
+    The weights of floating point data have the same type as the data, so
+    the mean does too.
+    """
+    if operator.lower() != 'mean' or not cube.coord('time').has_bounds():
+        return None
+    weights = _get_time_thickness(cube)
+    if np.issubdtype(cube.dtype, np.floating):
+        weights = weights.astype(cube.dtype)
+    return weights
 
 
 def get_time_weights(cube):
     """
     Compute the weighting of the time axis.
 
+    The weights of the time points are broadcast to the shape of the cube
+    without copying them. If the cube has lazy data, the weights are a dask
+    array with the same chunks as the data.
+
     Parameters
     ----------
     cube: iris.cube.Cube
@@ -163,20 +657,23 @@ def get_time_weights(cube):
 
     Returns
     -------
-    numpy.array
-        Array of time weights for averaging.
+    numpy.array or dask.array.Array
+        Read-only array of time weights for averaging.
     """
-    time = cube.coord('time')
-    time_thickness = time.bounds[..., 1] - time.bounds[..., 0]
+    time_thickness = _get_time_thickness(cube)
 
     # The weights need to match the dimensionality of the cube.
     slices = [None for i in cube.shape]
     coord_dim = cube.coord_dims('time')[0]
     slices[coord_dim] = slice(None)
-    time_thickness = np.abs(time_thickness[tuple(slices)])
-    ones = np.ones_like(cube.data)
-    time_weights = time_thickness * ones
-    return time_weights
+    if cube.has_lazy_data():
+        chunks = cube.lazy_data().chunks
+        time_thickness = da.from_array(time_thickness,
+                                       chunks=(chunks[coord_dim], ))
+        return da.broadcast_to(time_thickness[tuple(slices)],
+                               cube.shape,
+                               chunks=chunks)
+    return np.broadcast_to(time_thickness[tuple(slices)], cube.shape)
 
 
 def daily_statistics(cube, operator='mean'):
@@ -199,13 +696,8 @@ def daily_statistics(cube, operator='mean'):
     iris.cube.Cube
         Daily statistics cube
     """
-    if not cube.coords('day_of_year'):
-        iris.coord_categorisation.add_day_of_year(cube, 'time')
-    if not cube.coords('year'):
-        iris.coord_categorisation.add_year(cube, 'time')
-
-    operator = get_iris_analysis_operation(operator)
-    cube = cube.aggregated_by(['day_of_year', 'year'], operator)
+    ids, coords = _categorise_time(cube, 'day')
+    cube = _aggregate_time(cube, operator, ids, coords)
 
     cube.remove_coord('day_of_year')
     cube.remove_coord('year')
@@ -232,14 +724,8 @@ def monthly_statistics(cube, operator='mean'):
     iris.cube.Cube
         Monthly statistics cube
     """
-    if not cube.coords('month_number'):
-        iris.coord_categorisation.add_month_number(cube, 'time')
-    if not cube.coords('year'):
-        iris.coord_categorisation.add_year(cube, 'time')
-
-    operator = get_iris_analysis_operation(operator)
-    cube = cube.aggregated_by(['month_number', 'year'], operator)
-    return cube
+    ids, coords = _categorise_time(cube, 'month')
+    return _aggregate_time(cube, operator, ids, coords)
 
 
 def seasonal_statistics(cube, operator='mean'):
@@ -262,16 +748,8 @@ def seasonal_statistics(cube, operator='mean'):
     iris.cube.Cube
         Seasonal statistic cube
     """
-    if not cube.coords('clim_season'):
-        iris.coord_categorisation.add_season(cube, 'time', name='clim_season')
-    if not cube.coords('season_year'):
-        iris.coord_categorisation.add_season_year(cube,
-                                                  'time',
-                                                  name='season_year')
-
-    operator = get_iris_analysis_operation(operator)
-
-    cube = cube.aggregated_by(['clim_season', 'season_year'], operator)
+    ids, coords = _categorise_time(cube, 'season')
+    cube = _aggregate_time(cube, operator, ids, coords)
 
     # CMOR Units are days so we are safe to operate on days
     # Ranging on [90, 92] days makes this calendar-independent
@@ -299,9 +777,9 @@ def annual_statistics(cube, operator='mean'):
     """
     Compute annual statistics.
 
-    Note that this function does not weight the annual mean if
-    uneven time periods are present. Ie, all data inside the year
-    are treated equally.
+    The annual mean is weighted by the length of the time intervals,
+    given by the bounds of the time coordinate. If there are no bounds,
+    all data inside the year are treated equally.
 
     Parameters
     ----------
@@ -317,23 +795,18 @@ def annual_statistics(cube, operator='mean'):
     iris.cube.Cube
         Annual statistics cube
     """
-    # TODO: Add weighting in time dimension. See iris issue 3290
-    # https://github.com/SciTools/iris/issues/3290
-
-    operator = get_iris_analysis_operation(operator)
-
-    if not cube.coords('year'):
-        iris.coord_categorisation.add_year(cube, 'time')
-    return cube.aggregated_by('year', operator)
+    ids, coords = _categorise_time(cube, 'year')
+    weights = _get_group_weights(cube, operator)
+    return _aggregate_time(cube, operator, ids, coords, weights)
 
 
 def decadal_statistics(cube, operator='mean'):
     """
     Compute decadal statistics.
 
-    Note that this function does not weight the decadal mean if
-    uneven time periods are present. Ie, all data inside the decade
-    are treated equally.
+    The decadal mean is weighted by the length of the time intervals,
+    given by the bounds of the time coordinate. If there are no bounds,
+    all data inside the decade are treated equally.
 
     Parameters
     ----------
@@ -349,22 +822,111 @@ def decadal_statistics(cube, operator='mean'):
     iris.cube.Cube
         Decadal statistics cube
     """
-    # TODO: Add weighting in time dimension. See iris issue 3290
-    # https://github.com/SciTools/iris/issues/3290
-
-    operator = get_iris_analysis_operation(operator)
-
-    if not cube.coords('decade'):
-
-        def get_decade(coord, value):
-            """Callback function to get decades from cube."""
-            date = coord.units.num2date(value)
-            return date.year - date.year % 10
+    ids, coords = _categorise_time(cube, 'decade')
+    weights = _get_group_weights(cube, operator)
+    return _aggregate_time(cube, operator, ids, coords, weights)
+
+
+def _get_climatology_key(cube, operator, period):
+    """Get a key identifying the climatology of a cube."""
+    items = [
+        operator.lower(),
+        period.lower(),
+        repr(cube.metadata),
+        get_array_fingerprint(cube.core_data()),
+    ]
+    for coord in cube.coords():
+        items.extend([
+            repr(coord.metadata),
+            cube.coord_dims(coord),
+            get_array_fingerprint(coord.core_points()),
+            get_array_fingerprint(coord.core_bounds()),
+        ])
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+@contextlib.contextmanager
+def _climatology_input_files(filenames):
+    """Identify the climatologies stored on disk by these input files."""
+    previous = list(_CLIMATOLOGY_INPUT_FILES)
+    _CLIMATOLOGY_INPUT_FILES[:] = filenames
+    try:
+        yield
+    finally:
+        _CLIMATOLOGY_INPUT_FILES[:] = previous
+
+
+def _get_climatology_disk_key(cube, key):
+    """Get a key identifying the climatology of a cube across runs.
+
+    The names of lazy arrays only depend on the paths of the files they
+    are read from, so the identities (path, size and modification time)
+    of the input files are added for lazy data. Returns None if these
+    are not known.
+    """
+    lazy = cube.has_lazy_data() or any(
+        coord.has_lazy_points() or coord.has_lazy_bounds()
+        for coord in cube.coords())
+    if not lazy:
+        return key
+    identities = [get_file_identity(f) for f in _CLIMATOLOGY_INPUT_FILES]
+    if not identities or None in identities:
+        return None
+    return hashlib.sha1(repr([key, identities]).encode()).hexdigest()
+
+
+def _get_climatology(cube, operator, period):
+    """Get the climatology of a cube, computing it only once.
+
+    Climatologies are cached by a fingerprint of the cube, the operator
+    and the period, so e.g. anomalies of the same data do not compute
+    the climatology again. The cached climatologies have realized data,
+    as they are small compared to the time series. If ``cache_climatologies``
+    is set in the user configuration file, they are also stored in the
+    cache directory and reused in later runs.
+    """
+    key = _get_climatology_key(cube, operator, period)
+    disk_key = _get_climatology_disk_key(cube, key)
+    climatology = _CLIMATOLOGY_CACHE.pop(key, None)
+    if climatology is None and disk_key is not None:
+        climatology = _CLIMATOLOGY_DISK_CACHE.get(disk_key)
+    if climatology is None:
+        climatology = _compute_climatology(cube, operator, period)
+        if climatology.has_lazy_data():
+            climatology.data = climatology.lazy_data().compute()
+        if disk_key is not None:
+            _CLIMATOLOGY_DISK_CACHE.set(disk_key, climatology)
+    _CLIMATOLOGY_CACHE[key] = climatology
+    while len(_CLIMATOLOGY_CACHE) > _CLIMATOLOGY_CACHE_SIZE:
+        del _CLIMATOLOGY_CACHE[next(iter(_CLIMATOLOGY_CACHE))]
+    if cube.has_lazy_data():
+        # Keep the result lazy like the input, without computing it again
+        return climatology.copy(da.from_array(climatology.data))
+    return climatology.copy()
+
+
+def _compute_climatology(cube, operator, period):
+    """Compute the climatology of a cube, see :func:`climate_statistics`."""
+    period = period.lower()
 
-        iris.coord_categorisation.add_categorised_coord(
-            cube, 'decade', 'time', get_decade)
+    if period in ('full', ):
+        operator_method = get_iris_analysis_operation(operator)
+        if operator_accept_weights(operator):
+            time_weights = get_time_weights(cube)
+            cube = cube.collapsed('time',
+                                  operator_method,
+                                  weights=time_weights)
+        else:
+            cube = cube.collapsed('time', operator_method)
+        return cube
 
-    return cube.aggregated_by('decade', operator)
+    clim_coord = _get_period_coord(cube, period)
+    operator = get_iris_analysis_operation(operator)
+    clim_cube = cube.aggregated_by(clim_coord, operator)
+    cube.remove_coord(clim_coord)
+    clim_cube.remove_coord('time')
+    iris.util.promote_aux_coord_to_dim_coord(clim_cube, clim_coord.name())
+    return clim_cube
 
 
 def climate_statistics(cube, operator='mean', period='full'):
@@ -393,26 +955,7 @@ def climate_statistics(cube, operator='mean', period='full'):
     iris.cube.Cube
         Monthly statistics cube
     """
-    period = period.lower()
-
-    if period in ('full', ):
-        operator_method = get_iris_analysis_operation(operator)
-        if operator_accept_weights(operator):
-            time_weights = get_time_weights(cube)
-            cube = cube.collapsed('time',
-                                  operator_method,
-                                  weights=time_weights)
-        else:
-            cube = cube.collapsed('time', operator_method)
-        return cube
-
-    clim_coord = _get_period_coord(cube, period)
-    operator = get_iris_analysis_operation(operator)
-    clim_cube = cube.aggregated_by(clim_coord, operator)
-    cube.remove_coord(clim_coord)
-    clim_cube.remove_coord('time')
-    iris.util.promote_aux_coord_to_dim_coord(clim_cube, clim_coord.name())
-    return clim_cube
+    return _get_climatology(cube, operator, period)
 
 
 def anomalies(cube, period):
@@ -444,22 +987,21 @@ def anomalies(cube, period):
     cube_coord = _get_period_coord(cube, period)
     ref_coord = _get_period_coord(reference, period)
 
-    data = cube.core_data()
-    cube_time = cube.coord('time')
-    ref = {}
-    for ref_slice in reference.slices_over(ref_coord):
-        ref[ref_slice.coord(ref_coord).points[0]] = da.ravel(
-            ref_slice.core_data())
+    # Look up the index of the reference slice for every time point and
+    # subtract the reference expanded along time in a single operation.
+    sorter = np.argsort(ref_coord.points)
+    indices = sorter[np.searchsorted(ref_coord.points,
+                                     cube_coord.points,
+                                     sorter=sorter)]
     cube_coord_dim = cube.coord_dims(cube_coord)[0]
-    for i in range(cube_time.shape[0]):
-        time = cube_time.points[i]
-        indexes = cube_time.points == time
-        indexes = iris.util.broadcast_to_shape(indexes, data.shape,
-                                               (cube_coord_dim, ))
-        data[indexes] = data[indexes] - ref[cube_coord.points[i]]
-
-    cube = cube.copy(data)
-    return cube
+    slices = [slice(None)] * cube.ndim
+    slices[cube_coord_dim] = indices
+    ref = reference.core_data()
+    if cube.has_lazy_data():
+        # The reference is small along time, a single chunk keeps the
+        # number of tasks created by the indexing low.
+        ref = da.asarray(ref).rechunk({cube_coord_dim: -1})
+    return cube.copy(cube.core_data() - ref[tuple(slices)])
 
 
 def _get_period_coord(cube, period):
@@ -501,43 +1043,12 @@ def regrid_time(cube, frequency):
     iris.cube.Cube
         cube with converted time axis and units.
     """
-    # standardize time points
-    time_c = [cell.point for cell in cube.coord('time').cells()]
-    if frequency == 'yr':
-        time_cells = [
-            datetime.datetime(t.year, 7, 1, 0, 0, 0) for t in time_c
-        ]
-    elif frequency == 'mon':
-        time_cells = [
-            datetime.datetime(t.year, t.month, 15, 0, 0, 0) for t in time_c
-        ]
-    elif frequency == 'day':
-        time_cells = [
-            datetime.datetime(t.year, t.month, t.day, 0, 0, 0) for t in time_c
-        ]
-    elif frequency == '1hr':
-        time_cells = [
-            datetime.datetime(t.year, t.month, t.day, t.hour, 0, 0)
-            for t in time_c
-        ]
-    elif frequency == '3hr':
-        time_cells = [
-            datetime.datetime(t.year, t.month, t.day, t.hour - t.hour % 3, 0,
-                              0) for t in time_c
-        ]
-    elif frequency == '6hr':
-        time_cells = [
-            datetime.datetime(t.year, t.month, t.day, t.hour - t.hour % 6, 0,
-                              0) for t in time_c
-        ]
-
-    cube.coord('time').points = [
-        cube.coord('time').units.date2num(cl)
-        for cl in time_cells]
+    time = cube.coord('time')
+    time.points = _floor_time_points(time, frequency)
 
     # uniformize bounds
-    cube.coord('time').bounds = None
-    cube.coord('time').guess_bounds()
+    time.bounds = None
+    time.guess_bounds()
 
     # remove aux coords that will differ
     reset_aux = ['day_of_month', 'day_of_year']
@@ -546,11 +1057,12 @@ def regrid_time(cube, frequency):
             cube.remove_coord(auxcoord)
 
     # re-add the converted aux coords
-    iris.coord_categorisation.add_day_of_month(cube,
-                                               cube.coord('time'),
-                                               name='day_of_month')
-    iris.coord_categorisation.add_day_of_year(cube,
-                                              cube.coord('time'),
-                                              name='day_of_year')
+    years, _, days = get_time_components(time.points, time.units)[:3]
+    time_dims = cube.coord_dims(time)
+    cube.add_aux_coord(_get_categorised_coord(time, 'day_of_month', days),
+                       time_dims)
+    cube.add_aux_coord(
+        _get_categorised_coord(time, 'day_of_year',
+                               _get_day_of_year(time, years)), time_dims)
 
     return cube
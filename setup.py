@@ -191,6 +191,7 @@ setup(
     entry_points={
         'console_scripts': [
             'esmvaltool = esmvalcore._main:run',
+            'esmvaltool_index = esmvalcore._data_index:run',
         ],
     },
     cmdclass={
@@ -1,5 +1,9 @@
+from unittest import mock
+
 import pytest
 
+from esmvalcore._config import CFG_USER
+
 
 def pytest_addoption(parser):
     """Add a command line option to skip tests that require installation."""
@@ -18,3 +22,11 @@ def pytest_collection_modifyitems(config, items):
     for item in items:
         if "install" in item.keywords:
             item.add_marker(skip_install)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory):
+    """Use a separate cache directory for every test."""
+    cache_dir = str(tmp_path_factory.mktemp('cache'))
+    with mock.patch.dict(CFG_USER, {'cache_dir': cache_dir}):
+        yield cache_dir
@@ -1,11 +1,19 @@
 import os
 import shutil
+import sys
 import tempfile
 import unittest
+from unittest import mock
 
+import dask.array as da
+import numpy as np
+from iris.coords import DimCoord
 from iris.cube import Cube
 
-from esmvalcore.cmor.fix import Fix
+from esmvalcore.cmor._fixes import fix
+from esmvalcore.cmor._fixes.fix import (DataFix, FileOverlay, VirtualFile,
+                                        apply_data_fixes)
+from esmvalcore.cmor.fix import Fix, fix_data, fix_file
 
 
 class TestFix(unittest.TestCase):
@@ -46,6 +54,47 @@ class TestFix(unittest.TestCase):
     def test_get_fix_no_var(self):
         self.assertListEqual(Fix.get_fixes('CMIP5', 'BNU-ESM', 'BAD_VAR'), [])
 
+    def test_get_fixes_cached(self):
+        fixes = Fix.get_fixes('CMIP5', 'CanESM2', 'fgco2')
+        self.assertIs(Fix.get_fixes('CMIP5', 'CanESM2', 'fgCo2')[0],
+                      fixes[0])
+
+    def test_get_fixes_from_registered_package(self):
+        from esmvalcore.cmor._fixes.cmip5.canesm2 import FgCo2
+        package_dir = os.path.join(self.temp_folder, 'my_fixes', 'cmip5')
+        os.makedirs(package_dir)
+        for filename in ('__init__.py', os.path.join('cmip5', '__init__.py')):
+            with open(os.path.join(self.temp_folder, 'my_fixes', filename),
+                      'w'):
+                pass
+        with open(os.path.join(package_dir, 'canesm2.py'), 'w') as file:
+            file.write('from esmvalcore.cmor.fix import Fix\n\n\n'
+                       'class AllVars(Fix):\n    pass\n')
+
+        sys.path.insert(0, self.temp_folder)
+        try:
+            with mock.patch.object(fix, 'FIX_PACKAGES', list(
+                    fix.FIX_PACKAGES)):
+                fix.register_package('my_fixes')
+                fixes = Fix.get_fixes('CMIP5', 'CanESM2', 'fgco2')
+            fix._get_fixes.cache_clear()
+        finally:
+            sys.path.remove(self.temp_folder)
+        from my_fixes.cmip5.canesm2 import AllVars
+        self.assertListEqual(fixes, [FgCo2(), AllVars()])
+
+    def test_fix_file_overlay(self):
+        overlay = FileOverlay(rename_variables={'TAS': 'tas'})
+
+        class Tas(Fix):
+            file_overlay = overlay
+
+        with mock.patch.object(Fix, 'get_fixes', return_value=[Tas()]):
+            fixed = fix_file('file.nc', 'tas', 'CMIP5', 'CanESM2', 'fixed')
+        self.assertIsInstance(fixed, VirtualFile)
+        self.assertEqual(fixed, 'file.nc')
+        self.assertEqual(fixed.overlays, (overlay, ))
+
     def test_fix_metadata(self):
         cube = Cube([0])
         reference = Cube([0])
@@ -58,6 +107,56 @@ class TestFix(unittest.TestCase):
 
         self.assertEqual(Fix().fix_data(cube), reference)
 
+    def test_fix_data_data_fix(self):
+        class Tas(Fix):
+            data_fix = DataFix(mask_values=[0.], scale=2., offset=1.)
+
+        cube = Cube(np.array([0., 1., 2.], dtype=np.float32))
+        fixed = Tas().fix_data(cube)
+        self.assertEqual(fixed.data.dtype, np.float32)
+        np.testing.assert_array_equal(fixed.data.mask, [True, False, False])
+        np.testing.assert_array_equal(fixed.data[1:], [3., 5.])
+
+    def test_fix_data_mask_values_float32(self):
+        class Tos(Fix):
+            data_fix = DataFix(mask_values=[273.15])
+
+        cube = Cube(np.array([273.15, 280.], dtype=np.float32))
+        fixed = Tos().fix_data(cube)
+        np.testing.assert_array_equal(fixed.data.mask, [True, False])
+
+    def test_apply_data_fixes_lazy(self):
+        cube = Cube(da.arange(6., chunks=2).reshape(2, 3), units='m')
+        cube.add_dim_coord(DimCoord([0, 1], long_name='x'), 0)
+        data_fixes = [
+            DataFix(flip=['x'], scale=10.),
+            DataFix(mask_values=[0.], units='cm'),
+        ]
+        fixed = apply_data_fixes(cube, data_fixes, units='km')
+        self.assertTrue(fixed.has_lazy_data())
+        self.assertEqual(fixed.units, 'km')
+        expected = np.ma.masked_equal([[3., 4., 5.], [0., 1., 2.]], 0.)
+        np.testing.assert_allclose(fixed.data, expected * 1e-4)
+        np.testing.assert_array_equal(fixed.data.mask, expected.mask)
+
+    def test_apply_data_fixes_bad_units(self):
+        cube = Cube(da.zeros(3), units='m')
+        with self.assertRaises(ValueError):
+            apply_data_fixes(cube, [], units='K')
+
+    def test_fix_data_combines_data_fixes(self):
+        class Tas(Fix):
+            data_fix = DataFix(scale=2.)
+
+        cube = Cube(da.ones(3), var_name='tas', units='K')
+        checker = mock.Mock()
+        with mock.patch.object(Fix, 'get_fixes', return_value=[Tas()]):
+            with mock.patch('esmvalcore.cmor.fix._get_cmor_checker',
+                            return_value=checker):
+                fix_data(cube, 'tas', 'CMIP5', 'model', 'CMIP5', 'Amon')
+        checker.return_value.check_data.assert_called_once_with(
+            data_fixes=[Tas.data_fix])
+
     def test_fix_file(self):
         filepath = 'sample_filepath'
         self.assertEqual(Fix().fix_file(filepath, 'preproc'), filepath)
@@ -1,9 +1,12 @@
 """Integration tests for the variable_info module."""
 
 import os
+import shutil
+import tempfile
 import unittest
 
-from esmvalcore.cmor.table import CMIP3Info, CMIP5Info, CMIP6Info, CustomInfo
+from esmvalcore.cmor.table import (CMIP3Info, CMIP5Info, CMIP6Info,
+                                   CustomInfo, TableInfo, _LazyTables)
 
 
 class TestCMIP6Info(unittest.TestCase):
@@ -382,3 +385,49 @@ class TestCustomInfo(unittest.TestCase):
     def test_get_bad_variable(self):
         """Get none if a variable is not in the given table."""
         self.assertIsNone(self.variables_info.get_variable('Omon', 'badvar'))
+
+
+class TestCachedTables(unittest.TestCase):
+    """Test that parsed tables are cached."""
+
+    def setUp(self):
+        """Copy the CMIP3 tables to a temporary directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+        cwd = os.path.dirname(os.path.realpath(__file__))
+        shutil.copytree(
+            os.path.join(cwd, '..', '..', '..', 'esmvalcore', 'cmor',
+                         'tables', 'cmip3', 'Tables'),
+            os.path.join(self.tmp_dir, 'Tables'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_tables_loaded_lazily(self):
+        """Test that cached tables are only unpickled when used."""
+        parsed = CMIP3Info(self.tmp_dir, strict=True)
+        cached = CMIP3Info(self.tmp_dir, strict=True)
+        self.assertIsInstance(cached.tables, _LazyTables)
+        self.assertEqual(set(cached.tables), set(parsed.tables))
+        self.assertTrue(
+            all(isinstance(t, bytes) for t in cached.tables._tables.values()))
+
+        var = cached.get_variable('A1', 'tas')
+        self.assertEqual(var.short_name, 'tas')
+        self.assertEqual(var.units, parsed.get_variable('A1', 'tas').units)
+        self.assertIsInstance(cached.tables._tables['A1'], TableInfo)
+        self.assertIsInstance(cached.tables._tables['O1'], bytes)
+        self.assertEqual(set(cached.coords), set(parsed.coords))
+
+    def test_modified_table_parsed(self):
+        """Test that the tables are parsed again if a file changes."""
+        CMIP3Info(self.tmp_dir, strict=True)
+        table_file = os.path.join(self.tmp_dir, 'Tables', 'IPCC_table_A1')
+        with open(table_file) as file:
+            content = file.read()
+        with open(table_file, 'w') as file:
+            file.write(content.replace('variable_entry: tas\n',
+                                       'variable_entry: tasnew\n', 1))
+        variables_info = CMIP3Info(self.tmp_dir, strict=True)
+        self.assertIsNone(variables_info.get_variable('A1', 'tas'))
+        self.assertEqual(
+            variables_info.get_variable('A1', 'tasnew').short_name, 'tasnew')
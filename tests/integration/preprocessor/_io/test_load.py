@@ -1,6 +1,7 @@
 """Integration tests for :func:`esmvalcore.preprocessor._io.load`."""
 
 import os
+import pickle
 import tempfile
 import unittest
 
@@ -9,6 +10,7 @@ import numpy as np
 from iris.coords import DimCoord
 from iris.cube import Cube
 
+from esmvalcore.cmor._fixes.fix import FileOverlay, VirtualFile
 from esmvalcore.preprocessor._io import concatenate_callback, load
 
 
@@ -80,3 +82,31 @@ class TestLoad(unittest.TestCase):
         self.assertTrue((cube.coord('latitude').points == np.array([1,
                                                                     2])).all())
         self.assertEqual(cube.coord('latitude').units, 'degrees_north')
+
+    def test_load_virtual_file(self):
+        """Test that the changes of a virtual file are applied."""
+        cube = _create_sample_cube()
+        cube.attributes['old_name'] = 'value'
+        cube.attributes['removed'] = 'value'
+        temp_file = self._save_cube(cube)
+        overlay = FileOverlay(
+            rename_variables={'sample': 'tas', 'latitude': 'lat'},
+            rename_attributes={'old_name': 'new_name'},
+            attributes={'removed': None, 'added': 'value'},
+            fill_values={'sample': 2},
+        )
+        virtual_file = pickle.loads(
+            pickle.dumps(VirtualFile(temp_file, [overlay])))
+
+        cubes = load(virtual_file, callback=concatenate_callback)
+        cube = cubes[0]
+        self.assertEqual(1, len(cubes))
+        self.assertEqual(cube.var_name, 'tas')
+        self.assertEqual(cube.coord('latitude').var_name, 'lat')
+        self.assertEqual(cube.attributes['new_name'], 'value')
+        self.assertEqual(cube.attributes['added'], 'value')
+        self.assertNotIn('old_name', cube.attributes)
+        self.assertNotIn('removed', cube.attributes)
+        self.assertIs(type(cube.attributes['source_file']), str)
+        self.assertTrue(cube.has_lazy_data())
+        np.testing.assert_array_equal(cube.data.mask, [False, True])
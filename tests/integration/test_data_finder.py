@@ -7,7 +7,9 @@ import pytest
 import yaml
 
 import esmvalcore._config
-from esmvalcore._data_finder import get_input_filelist, get_output_file
+from esmvalcore._data_finder import (get_input_filelist, get_input_filelists,
+                                     get_output_file)
+from esmvalcore._data_index import DataIndex
 from esmvalcore.cmor.table import read_cmor_tables
 
 # Initialize with standard config developer file
@@ -100,3 +102,79 @@ def test_get_input_filelist(root, cfg):
     assert sorted(input_filelist) == sorted(ref_files)
     assert sorted(dirnames) == sorted(ref_dirs)
     assert sorted(filenames) == sorted(ref_patterns)
+
+
+def test_get_input_filelists(root, monkeypatch):
+    """Test that directories are scanned only once for many variables."""
+    cfg = CONFIG['get_input_filelist'][6]
+    create_tree(root, cfg.get('available_files'),
+                cfg.get('available_symlinks'))
+    rootpath = {cfg['variable']['project']: [root]}
+    drs = {cfg['variable']['project']: cfg['drs']}
+    variables = []
+    for exp in cfg['variable']['exp']:
+        variable = dict(cfg['variable'])
+        variable['exp'] = exp
+        variables.append(variable)
+
+    scanned = []
+    scandir = os.scandir
+
+    def spy(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', spy)
+    results = get_input_filelists(variables, rootpath, drs)
+    assert len(scanned) == len(set(scanned))
+
+    ref_files = [os.path.join(root, file) for file in cfg['found_files']]
+    files = [f for result in results for f in result[0]]
+    assert sorted(files) == sorted(ref_files)
+
+
+@pytest.mark.parametrize('cfg', CONFIG['get_input_filelist'])
+def test_get_input_filelist_index(root, cfg):
+    """Test retrieving input filelist using a data index."""
+    create_tree(root, cfg.get('available_files'),
+                cfg.get('available_symlinks'))
+    index = DataIndex(os.path.join(os.path.dirname(root), 'index.sqlite'))
+    index.update([root])
+
+    # Find files
+    rootpath = {cfg['variable']['project']: [root]}
+    drs = {cfg['variable']['project']: cfg['drs']}
+    reference = get_input_filelist(dict(cfg['variable']), rootpath, drs)
+    result = get_input_filelist(cfg['variable'], rootpath, drs, index)
+    index.close()
+
+    assert sorted(result[0]) == sorted(reference[0])
+    assert sorted(result[1]) == sorted(reference[1])
+    assert sorted(result[2]) == sorted(reference[2])
+
+
+def test_data_index_update(root):
+    """Test that refreshing the index picks up added and removed files."""
+    create_tree(root, ['a/x_2000.nc', 'a/b/y_2001.nc', 'c/z_2002-2003.nc'])
+    index = DataIndex(os.path.join(os.path.dirname(root), 'index.sqlite'))
+    index.update([root])
+    assert index.covers(os.path.join(root, 'a'))
+    assert not index.covers(os.path.dirname(root))
+    assert sorted(index.find_files([root], ['*.nc'])) == [
+        os.path.join(root, 'a', 'b', 'y_2001.nc'),
+        os.path.join(root, 'a', 'x_2000.nc'),
+        os.path.join(root, 'c', 'z_2002-2003.nc'),
+    ]
+    assert index.get_start_end_year(
+        os.path.join(root, 'c', 'z_2002-2003.nc')) == (2002, 2003)
+
+    create_file(os.path.join(root, 'a', 'b', 'y_2002.nc'))
+    shutil.rmtree(os.path.join(root, 'c'))
+    index.update([root])
+    assert sorted(index.find_files([root], ['*.nc'])) == [
+        os.path.join(root, 'a', 'b', 'y_2001.nc'),
+        os.path.join(root, 'a', 'b', 'y_2002.nc'),
+        os.path.join(root, 'a', 'x_2000.nc'),
+    ]
+    assert index.glob(os.path.join(root, '*')) == [os.path.join(root, 'a')]
+    index.close()
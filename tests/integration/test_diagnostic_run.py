@@ -14,6 +14,7 @@ def write_config_user_file(dirname):
     cfg = {
         'output_dir': str(dirname / 'output_dir'),
         'auxiliary_data_dir': str(dirname / 'extra_data'),
+        'cache_dir': str(dirname / 'cache'),
         'rootpath': {
             'default': str(dirname / 'input_dir'),
         },
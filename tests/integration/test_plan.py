@@ -0,0 +1,126 @@
+"""Tests for planning the tasks in a recipe."""
+import json
+
+import iris
+import numpy as np
+import pytest
+from iris.coords import DimCoord
+from iris.cube import Cube
+
+from esmvalcore._plan import get_plan, write_plan
+from esmvalcore._provenance import TrackedFile
+from esmvalcore._task import BaseTask
+from esmvalcore.preprocessor import PreprocessingTask, PreprocessorFile
+
+
+def create_input_file(filename):
+    """Create a file with two years of monthly data."""
+    time = DimCoord(np.arange(15, 730, 30.),
+                    standard_name='time',
+                    units='days since 2000-01-01')
+    lat = DimCoord([-45., 0., 45.], standard_name='latitude', units='degrees')
+    lon = DimCoord([0., 90., 180., 270.],
+                   standard_name='longitude',
+                   units='degrees')
+    cube = Cube(np.zeros((24, 3, 4), dtype=np.float32),
+                var_name='tas',
+                units='K',
+                dim_coords_and_dims=[(time, 0), (lat, 1), (lon, 2)])
+    iris.save(cube, filename)
+
+
+@pytest.fixture
+def tasks(tmp_path):
+    input_file = str(tmp_path / 'tas_2000-2001.nc')
+    create_input_file(input_file)
+    product = PreprocessorFile(
+        attributes={
+            'filename': str(tmp_path / 'preproc' / 'tas.nc'),
+            'short_name': 'tas',
+            'start_year': 2000,
+            'end_year': 2000,
+        },
+        settings={
+            'load': {},
+            'extract_time': {
+                'start_year': 2000,
+                'end_year': 2001,
+                'start_month': 1,
+                'end_month': 1,
+                'start_day': 1,
+                'end_day': 1,
+            },
+            'regrid': {
+                'target_grid': '60x60',
+                'scheme': 'linear',
+            },
+            'area_statistics': {
+                'operator': 'mean',
+            },
+        },
+        ancestors=[TrackedFile(input_file)],
+    )
+    preproc_task = PreprocessingTask([product], name='diag/tas')
+    diag_task = BaseTask(ancestors=[preproc_task], name='diag/plot')
+    return [diag_task]
+
+
+def test_get_plan(tasks):
+    plan = get_plan(tasks, max_parallel_tasks=2)
+    assert [t['name'] for t in plan['tasks']] == ['diag/tas', 'diag/plot']
+    assert plan['tasks'][1]['type'] == 'diagnostic'
+    assert plan['tasks'][1]['ancestors'] == ['diag/tas']
+
+    product = plan['tasks'][0]['products'][0]
+    assert product['input_size'] > 0
+    assert plan['input_size'] == product['input_size']
+    steps = {s['step']: s for s in product['steps']}
+    assert list(steps) == [
+        'load', 'extract_time', 'regrid', 'area_statistics', 'save'
+    ]
+    assert steps['load']['shape'] == [['T', 24], ['Y', 3], ['X', 4]]
+    assert steps['load']['dtype'] == 'float32'
+    assert steps['load']['size'] == 24 * 3 * 4 * 4
+    assert steps['extract_time']['shape'] == [['T', 12], ['Y', 3], ['X', 4]]
+    assert steps['regrid']['shape'] == [['T', 12], ['Y', 3], ['X', 6]]
+    assert steps['area_statistics']['shape'] == [['T', 12]]
+    assert product['peak_memory'] == 2 * steps['load']['size']
+    assert product['output_size'] == 12 * 4
+    assert plan['peak_memory'] == product['peak_memory']
+    assert plan['output_size'] == product['output_size']
+
+
+def test_write_plan(tasks, tmp_path):
+    filename = tmp_path / 'plan.json'
+    plan = write_plan(tasks, str(filename))
+    assert json.loads(filename.read_text()) == plan
+
+
+def test_get_plan_files_without_time(tmp_path):
+    """Test that files without a time axis are not concatenated."""
+    lat = DimCoord([-45., 0., 45.], standard_name='latitude', units='degrees')
+    lon = DimCoord([0., 90., 180., 270.],
+                   standard_name='longitude',
+                   units='degrees')
+    cube = Cube(np.zeros((3, 4), dtype=np.float32),
+                var_name='sftlf',
+                units='%',
+                dim_coords_and_dims=[(lat, 0), (lon, 1)])
+    input_files = [str(tmp_path / 'sftlf_{}.nc'.format(i)) for i in range(2)]
+    for input_file in input_files:
+        iris.save(cube, input_file)
+    product = PreprocessorFile(
+        attributes={
+            'filename': str(tmp_path / 'preproc' / 'sftlf.nc'),
+            'short_name': 'sftlf',
+        },
+        settings={'load': {}},
+        ancestors=[TrackedFile(f) for f in input_files],
+    )
+    task = PreprocessingTask([product], name='diag/sftlf')
+
+    plan = get_plan([task], max_parallel_tasks=1)
+
+    steps = plan['tasks'][0]['products'][0]['steps']
+    assert steps[0]['step'] == 'load'
+    assert steps[0]['shape'] == [['Y', 3], ['X', 4]]
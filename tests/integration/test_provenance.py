@@ -1,5 +1,10 @@
+import pickle
+
 from prov.constants import PROV_ATTR_GENERATED_ENTITY, PROV_ATTR_USED_ENTITY
-from prov.model import ProvDerivation
+from prov.model import ProvDerivation, ProvDocument
+
+from esmvalcore._provenance import (TrackedFile, export_provenance,
+                                    get_recipe_provenance, get_task_provenance)
 
 
 def get_file_record(prov, filename):
@@ -45,3 +50,57 @@ def check_product_wasderivedfrom(product):
     else:
         for ancestor in product._ancestors:
             check_product_wasderivedfrom(ancestor)
+
+
+def create_tracked_files(n_files):
+    """Create a chain of files, each derived from the previous one."""
+    class Task:
+        name = 'diagnostic/task'
+
+    recipe = get_recipe_provenance({'description': 'Test.'}, 'recipe.yml')
+    activity = get_task_provenance(Task(), recipe)
+    files = [TrackedFile('input.nc', {'tracking_id': '0'})]
+    for i in range(1, n_files):
+        files.append(
+            TrackedFile('file{}.nc'.format(i), {}, ancestors=[files[-1]]))
+    files[-1].initialize_provenance(activity)
+    return files
+
+
+def test_provenance_combines_ancestors():
+    files = create_tracked_files(4)
+    product = files[-1]
+    check_provenance(product)
+    for ancestor in files[:-1]:
+        assert get_file_record(product.provenance, ancestor.filename)
+    # The provenance of the ancestors is shared, not copied
+    assert product._sources == [files[-2]]
+    assert len(product._document.get_record('file:' + files[0].filename)) == 0
+
+
+def test_copy_provenance_shares_ancestors():
+    files = create_tracked_files(3)
+    product = files[-1]
+    copy = product.copy_provenance()
+    assert copy._sources == product._sources
+    assert copy._document is not product._document
+    assert copy.activity is product.activity
+
+    # Changes to the copy do not affect the original
+    copy.entity.add_attributes({'attribute:new': 'value'})
+    assert not product.entity.get_attribute('attribute:new')
+
+    # The copy survives pickling, as when returned from a task process
+    copy = pickle.loads(pickle.dumps(copy))
+    assert get_file_record(copy.provenance, files[0].filename)
+    assert ({r.identifier for r in copy.provenance.records} ==
+            {r.identifier for r in product.provenance.records})
+
+
+def test_export_provenance_database(tmp_path):
+    files = create_tracked_files(3)
+    filename = str(tmp_path / 'provenance.xml')
+    export_provenance([files[-1]], filename=filename)
+    provenance = ProvDocument.deserialize(filename, format='xml')
+    for tracked_file in files:
+        assert get_file_record(provenance, tracked_file.filename)
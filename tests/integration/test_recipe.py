@@ -1,4 +1,5 @@
 import os
+import threading
 from pathlib import Path
 from pprint import pformat
 from textwrap import dedent
@@ -82,7 +83,16 @@ def create_test_file(filename, tracking_id=None):
     iris.save(cube, filename)
 
 
+# Input files are looked up from multiple threads
+_LOCK = threading.Lock()
+
+
 def _get_filenames(root_path, filenames, tracking_id):
+    with _LOCK:
+        return _create_test_files(root_path, filenames, tracking_id)
+
+
+def _create_test_files(root_path, filenames, tracking_id):
     filename = filenames[0]
     filename = str(root_path / 'input' / filename)
     filenames = []
@@ -116,7 +126,7 @@ def patched_datafinder(tmp_path, monkeypatch):
 
     tracking_id = tracking_ids()
 
-    def find_files(_, filenames):
+    def find_files(_, filenames, tree=None):
         # Any occurrence of [something] in filename should have
         # been replaced before this function is called.
         for filename in filenames:
@@ -135,7 +145,7 @@ def patched_failing_datafinder(tmp_path, monkeypatch):
 
     tracking_id = tracking_ids()
 
-    def find_files(_, filenames):
+    def find_files(_, filenames, tree=None):
         # Any occurrence of [something] in filename should have
         # been replaced before this function is called.
         for filename in filenames:
@@ -1286,6 +1296,7 @@ def test_diagnostic_task_provenance(
     # Test that provenance was saved to netcdf, xml and svg plot
     cube = iris.load(product.filename)[0]
     assert 'provenance' in cube.attributes
+    recipe.write_provenance()
     prefix = os.path.splitext(product.filename)[0] + '_provenance'
     assert os.path.exists(prefix + '.xml')
     assert os.path.exists(prefix + '.svg')
@@ -1484,6 +1495,42 @@ def test_extract_shape_raises(tmp_path, patched_datafinder, config_user,
         assert invalid_arg in exc.value
 
 
+@pytest.mark.parametrize('settings', [
+    'operator: mean',
+    'shapefile: x',
+    'regions: [0, 10, 0, 10]',
+    'regions: {box: {start_longitude: 0}}',
+    'regions: {}\n              method: x',
+])
+def test_region_statistics_raises(tmp_path, patched_datafinder, config_user,
+                                  settings):
+    content = dedent(f"""
+        preprocessors:
+          test:
+            region_statistics:
+              {settings}
+
+        diagnostics:
+          test:
+            variables:
+              ta:
+                preprocessor: test
+                project: CMIP5
+                mip: Amon
+                exp: historical
+                start_year: 2000
+                end_year: 2005
+                ensemble: r1i1p1
+                additional_datasets:
+                  -
+                      dataset: GFDL-CM3
+            scripts: null
+        """)
+    with pytest.raises(RecipeError) as exc:
+        get_recipe(tmp_path, content, config_user)
+    assert 'region_statistics' in str(exc.value)
+
+
 def test_weighting_landsea_fraction(tmp_path, patched_datafinder, config_user):
     content = dedent("""
         preprocessors:
@@ -2111,3 +2158,118 @@ def test_fx_var_invalid_project(tmp_path, patched_datafinder, config_user):
     with pytest.raises(RecipeError) as rec_err_exp:
         get_recipe(tmp_path, content, config_user)
         assert msg in rec_err_exp
+
+
+def test_input_files_looked_up_once(tmp_path, patched_datafinder,
+                                    config_user, monkeypatch):
+    find_files = esmvalcore._data_finder.find_files
+    calls = []
+
+    def counting_find_files(dirnames, filenames, tree=None):
+        calls.append(tuple(filenames))
+        return find_files(dirnames, filenames, tree)
+
+    monkeypatch.setattr(esmvalcore._data_finder, 'find_files',
+                        counting_find_files)
+    content = dedent("""
+        preprocessors:
+          preproc:
+           area_statistics:
+             operator: mean
+             fx_files: ['areacella']
+
+        diagnostics:
+          diagnostic_1:
+            variables:
+              tas: &variable
+                preprocessor: preproc
+                project: CMIP5
+                mip: Amon
+                exp: historical
+                start_year: 2000
+                end_year: 2005
+                ensemble: r1i1p1
+                additional_datasets:
+                  - {dataset: CanESM2}
+                  - {dataset: MPI-ESM-LR}
+            scripts: null
+          diagnostic_2:
+            variables:
+              tas: *variable
+            scripts: null
+        """)
+    recipe = get_recipe(tmp_path, content, config_user)
+    assert len(recipe.tasks) == 2
+    assert len(calls) == 4
+    assert len(set(calls)) == 4
+    assert 'input_file_lookup' not in recipe._cfg
+
+    # The lookup is also removed if creating the tasks fails
+    def failing_create_tasks():
+        raise RecipeError('test')
+
+    monkeypatch.setattr(recipe, '_create_tasks', failing_create_tasks)
+    with pytest.raises(RecipeError):
+        recipe.initialize_tasks()
+    assert 'input_file_lookup' not in recipe._cfg
+
+
+def test_input_file_attributes_read_lazily(tmp_path, patched_datafinder,
+                                           config_user):
+    content = dedent("""
+        diagnostics:
+          diagnostic_name:
+            variables:
+              ta:
+                project: CMIP5
+                mip: Amon
+                exp: historical
+                start_year: 1999
+                end_year: 2005
+                ensemble: r1i1p1
+                additional_datasets:
+                  - {dataset: CanESM2}
+            scripts: null
+        """)
+    recipe = get_recipe(tmp_path, content, config_user)
+    task = recipe.tasks.pop()
+    product = next(iter(task.products))
+    assert len(product._ancestors) == 2
+    for ancestor in product._ancestors:
+        assert ancestor._attributes is None
+
+    task._initialize_product_provenance()
+    tracking_ids = [a.attributes['tracking_id'] for a in product._ancestors]
+    assert len(set(tracking_ids)) == 2
+    check_provenance(product)
+
+
+def test_match_products():
+    class Product:
+        def __init__(self, **attributes):
+            self.attributes = attributes
+
+    variables = [
+        {
+            'dataset': dataset,
+            'ensemble': ensemble,
+            'exp': ['historical', 'ssp585'],
+            'short_name': 'lwp',
+            'filename': f'lwp_{dataset}_{ensemble}.nc',
+        } for dataset in ('A', 'B') for ensemble in ('r1', 'r2')
+    ]
+    products = [
+        Product(dataset='A', ensemble='r2', exp=['historical', 'ssp585'],
+                short_name='clwvi', filename='clwvi_A_r2.nc'),
+        Product(dataset='B', ensemble='r3', short_name='clivi',
+                filename='clivi_B_r3.nc'),
+        Product(dataset='C', short_name='clivi', filename='clivi_C.nc'),
+    ]
+    grouped_products = esmvalcore._recipe._match_products(
+        products, variables)
+    assert grouped_products == {
+        'lwp_A_r2.nc': [products[0], products[2]],
+        'lwp_A_r1.nc': [products[2]],
+        'lwp_B_r1.nc': [products[1], products[2]],
+        'lwp_B_r2.nc': [products[1], products[2]],
+    }
@@ -3,6 +3,7 @@
 import sys
 import unittest
 from io import StringIO
+from unittest import mock
 
 import iris
 import iris.coord_categorisation
@@ -11,6 +12,7 @@ import iris.util
 import numpy as np
 from cf_units import Unit
 
+from esmvalcore.cmor import check
 from esmvalcore.cmor.check import CMORCheck, CMORCheckError
 
 
@@ -309,6 +311,76 @@ class TestCMORCheck(unittest.TestCase):
         self.var_info.coordinates['lat'].stored_direction = 'decreasing'
         self._check_fails_in_metadata()
 
+    def test_coords_check_cached(self):
+        """Check coordinates of cubes with the same grid only once."""
+        CMORCheck(self.cube, self.var_info).check_metadata()
+        cube = self.get_cube(self.var_info)
+        cube.coord('time').points = cube.coord('time').points + 1
+        checker = CMORCheck(cube, self.var_info)
+        with mock.patch.object(checker, '_check_coords') as check_coords:
+            checker.check_metadata()
+        check_coords.assert_not_called()
+
+    def test_coords_check_fingerprint_once(self):
+        """Compute the fingerprint of the coordinates once per cube."""
+        checker = CMORCheck(self.cube, self.var_info)
+        with mock.patch.object(
+                checker,
+                '_get_coords_fingerprint',
+                wraps=checker._get_coords_fingerprint) as fingerprint:
+            checker.check_metadata()
+        fingerprint.assert_called_once()
+
+    def test_coords_check_fingerprint_mask(self):
+        """Tell apart coordinates that only differ in their mask."""
+        fingerprints = []
+        for index in (0, 1):
+            cube = self.get_cube(self.var_info)
+            points = np.ma.masked_array(np.arange(float(cube.shape[0])))
+            points[index] = np.ma.masked
+            cube.add_aux_coord(
+                iris.coords.AuxCoord(points, var_name='sector'), 0)
+            fingerprints.append(
+                CMORCheck(cube, self.var_info)._get_coords_fingerprint())
+        self.assertNotEqual(fingerprints[0], fingerprints[1])
+
+    def test_coords_check_not_cached_if_fixed(self):
+        """Do not cache the checks of coordinates changed by a fix."""
+        self.cube.coord('latitude').units = 'degrees_n'
+        with mock.patch.dict(check._COORDS_CHECK_CACHE, clear=True):
+            self._check_cube(automatic_fixes=True)
+            self.assertEqual(check._COORDS_CHECK_CACHE, {})
+
+    def test_coords_check_cache_size(self):
+        """Keep only the most recently used fingerprints."""
+        with mock.patch.dict(check._COORDS_CHECK_CACHE, clear=True), \
+                mock.patch.object(check, '_COORDS_CHECK_CACHE_SIZE', 1):
+            CMORCheck(self.cube, self.var_info).check_metadata()
+            key = next(iter(check._COORDS_CHECK_CACHE))
+            coord = self.cube.coord('latitude')
+            self._update_coordinate_values(self.cube, coord,
+                                           coord.points[::-1])
+            self._check_fails_in_metadata()
+            self.assertEqual(len(check._COORDS_CHECK_CACHE), 1)
+            self.assertNotIn(key, check._COORDS_CHECK_CACHE)
+
+    def test_coords_check_cached_errors(self):
+        """Report cached errors again for cubes with the same grid."""
+        cube = self.get_cube(self.var_info)
+        self.var_info.coordinates['lat'].stored_direction = 'decreasing'
+        self._check_fails_in_metadata()
+        self.cube = cube
+        self._check_fails_in_metadata()
+
+    def test_coords_check_not_cached_other_grid(self):
+        """Check coordinates again if they are different."""
+        CMORCheck(self.cube, self.var_info).check_metadata()
+        coord = self.cube.coord('latitude')
+        values = np.linspace(coord.points[-1], coord.points[0],
+                             len(coord.points))
+        self._update_coordinate_values(self.cube, coord, values)
+        self._check_fails_in_metadata()
+
     def test_non_decreasing_fix(self):
         """Check automatic fix for non decreasing coordinate."""
         self.cube.data[0, 0, 0, 0, 0] = 70
@@ -201,4 +201,5 @@ class TestFixData(unittest.TestCase):
                     short_name='short_name',
                     table='cmor_table')
                 checker.assert_called_once_with(self.cube)
-                checker.return_value.check_data.assert_called_once_with()
+                checker.return_value.check_data.assert_called_once_with(
+                    data_fixes=[])
@@ -0,0 +1,67 @@
+"""Unit tests for :func:`esmvalcore._data_finder._compile_template`."""
+import pytest
+
+from esmvalcore._data_finder import _compile_template
+
+VARIABLE = {
+    'dataset': 'HadGEM2-ES',
+    'exp': ['historical', 'rcp85'],
+    'ensemble': 'r1i1p*',
+    'short_name': 'ta',
+    'tier': 3,
+}
+
+
+@pytest.mark.parametrize('path,match', [
+    ('Tier3/HadGEM2-ES/historical/r1i1p1', True),
+    ('Tier3/HadGEM2-ES/rcp85/r1i1p2', True),
+    ('Tier3/hadgem2-es/rcp85/r1i1p2', False),
+    ('Tier3/HadGEM2-ES/rcp45/r1i1p1', False),
+    ('Tier3/HadGEM2-ES/historical/r2i1p1', False),
+    ('Tier2/HadGEM2-ES/historical/r1i1p1', False),
+])
+def test_compile_template(path, match):
+    """Test compiling a template with lists and glob patterns as values."""
+    components, regex = _compile_template(
+        '/Tier{tier}/{dataset}/{exp}/{ensemble}/', VARIABLE)
+    assert len(components) == 4
+    assert bool(regex.fullmatch(path)) is match
+
+
+def test_compile_template_repeated_tag():
+    """Test that a repeated tag has the same value everywhere."""
+    _, regex = _compile_template('{exp}/{dataset}_{exp}', VARIABLE)
+    assert regex.fullmatch('rcp85/HadGEM2-ES_rcp85')
+    assert not regex.fullmatch('rcp85/HadGEM2-ES_historical')
+
+
+def test_compile_template_latestversion():
+    """Test that the latestversion tag is represented by None."""
+    components, regex = _compile_template(
+        '{dataset}/{latestversion}/{short_name}', VARIABLE)
+    assert components[1] is None
+    assert regex.fullmatch('HadGEM2-ES/v20200101/ta')
+    _, regex = _compile_template('{dataset}/{latestversion}', VARIABLE)
+    assert regex.fullmatch('HadGEM2-ES/v20200101')
+
+
+def test_compile_template_empty():
+    """Test compiling a template without directories."""
+    components, regex = _compile_template('/', VARIABLE)
+    assert components == []
+    assert regex.fullmatch('')
+
+
+def test_compile_template_missing_key():
+    """Test that a missing key raises."""
+    with pytest.raises(KeyError):
+        _compile_template('{mip}', VARIABLE)
+
+
+def test_compile_template_literal_names():
+    """Test that components without glob patterns are listed by name."""
+    components, _ = _compile_template('Tier{tier}/{exp}/{ensemble}',
+                                      VARIABLE)
+    assert components[0] == ('Tier3', )
+    assert components[1] == ('historical', 'rcp85')
+    assert components[2].fullmatch('r1i1p1')
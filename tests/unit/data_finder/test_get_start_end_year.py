@@ -3,8 +3,12 @@
 import unittest
 import os
 import tempfile
+import threading
+from unittest import mock
 
-from esmvalcore._data_finder import get_start_end_year
+import esmvalcore._data_finder
+from esmvalcore._cache import FileCache
+from esmvalcore._data_finder import get_start_end_year, get_start_end_years
 
 
 class TestGetStartEndYear(unittest.TestCase):
@@ -93,6 +97,84 @@ class TestGetStartEndYear(unittest.TestCase):
         self.assertEqual(1990, start)
         self.assertEqual(1991, end)
 
+    def test_read_file_non_standard_calendar(self):
+        """Test reading the years from a file with a 360 day calendar"""
+        import iris
+        from cf_units import Unit
+        from iris.cube import Cube
+        from iris.coords import DimCoord
+        cube = Cube([0, 0], var_name='var')
+        time = DimCoord([15, 7215],
+                        'time',
+                        units=Unit('days since 1990-01-01',
+                                   calendar='360_day'))
+        cube.add_dim_coord(time, 0)
+        iris.save(cube, self.temp_file)
+        start, end = get_start_end_year(self.temp_file)
+        self.assertEqual(1990, start)
+        self.assertEqual(2010, end)
+
+    def test_read_file_is_cached(self):
+        """Test that the years are read from a file only once"""
+        import iris
+        from iris.cube import Cube
+        from iris.coords import DimCoord
+        cube = Cube([0, 0], var_name='var')
+        time = DimCoord([0, 366], 'time', units='days since 1990-01-01')
+        cube.add_dim_coord(time, 0)
+        iris.save(cube, self.temp_file)
+        cache_dir = tempfile.mkdtemp()
+        cache = FileCache('time_ranges')
+        with mock.patch.object(esmvalcore._data_finder, '_TIME_RANGE_CACHE',
+                               cache), \
+                mock.patch.dict(esmvalcore._cache.CFG_USER,
+                                {'cache_dir': cache_dir}):
+            self.assertEqual((1990, 1991), get_start_end_year(self.temp_file))
+            # Clear the in-memory values to check the persistent cache
+            cache._memory.clear()
+            with mock.patch.object(esmvalcore._data_finder,
+                                   '_read_start_end_year') as read:
+                self.assertEqual({self.temp_file: (1990, 1991)},
+                                 get_start_end_years([self.temp_file]))
+                read.assert_not_called()
+            # Modifying the file invalidates the cache
+            os.utime(self.temp_file, ns=(0, 0))
+            self.assertIsNone(cache.get(self.temp_file))
+        os.remove(os.path.join(cache_dir, 'time_ranges.sqlite'))
+        os.rmdir(cache_dir)
+
+    def test_get_start_end_years(self):
+        """Test getting the years of many files at once"""
+        files = ['var_whatever_1980-1981.nc', '1990_var_whatever.nc']
+        self.assertEqual({
+            files[0]: (1980, 1981),
+            files[1]: (1990, 1990),
+        }, get_start_end_years(files))
+
+    def test_get_start_end_years_in_thread(self):
+        """Test that files are read without forking outside the main thread"""
+        files = ['var_whatever_a.nc', 'var_whatever_b.nc']
+        result = {}
+        with mock.patch.object(esmvalcore._data_finder, '_TIME_RANGE_CACHE',
+                               FileCache('time_ranges')), \
+                mock.patch.object(esmvalcore._data_finder,
+                                  '_read_start_end_year',
+                                  return_value=(1990, 1991)), \
+                mock.patch.dict(esmvalcore._cache.CFG_USER,
+                                {'cache_dir': None}), \
+                mock.patch('multiprocessing.Pool') as pool:
+            thread = threading.Thread(
+                target=lambda: result.update(get_start_end_years(files)))
+            thread.start()
+            thread.join()
+        pool.assert_not_called()
+        self.assertEqual({f: (1990, 1991) for f in files}, result)
+
+    def test_get_start_end_years_fails(self):
+        """Test get_start_end_years raises if no date is present"""
+        with self.assertRaises(ValueError):
+            get_start_end_years(['var_whatever_1980.nc', 'var_whatever'])
+
     def test_fails_if_no_date_present(self):
         """Test raises if no date is present"""
         with self.assertRaises(ValueError):
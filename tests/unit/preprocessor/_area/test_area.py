@@ -1,7 +1,11 @@
 """Unit tests for the :func:`esmvalcore.preprocessor._area` module."""
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 
+import dask.array as da
 import fiona
 import iris
 import numpy as np
@@ -10,9 +14,11 @@ from cf_units import Unit
 from shapely.geometry import Polygon, mapping
 
 import tests
+from esmvalcore.preprocessor import _area
 from esmvalcore.preprocessor._area import (_crop_cube, area_statistics,
                                            extract_named_regions,
-                                           extract_region, extract_shape)
+                                           extract_region, extract_shape,
+                                           region_statistics)
 
 
 class Test(tests.Test):
@@ -105,6 +111,58 @@ class Test(tests.Test):
         expected = np.array([1.])
         self.assert_array_equal(result.data, expected)
 
+    @mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+    def test_area_statistics_lazy_4d(self):
+        """Test that area weights are computed once and broadcast lazily."""
+        cube = iris.cube.Cube(
+            da.arange(150., chunks=25).reshape(3, 2, 5, 5),
+            dim_coords_and_dims=[
+                (iris.coords.DimCoord([0., 1., 2.], standard_name='time',
+                                      units='days since 1950-01-01'), 0),
+                (iris.coords.DimCoord([1000., 500.], var_name='plev'), 1),
+                (self.grid.coord('latitude'), 2),
+                (self.grid.coord('longitude'), 3),
+            ])
+        grid_areas = iris.analysis.cartography.area_weights(self.grid)
+        expected = np.average(cube.data.reshape(3, 2, 25), axis=-1,
+                              weights=grid_areas.ravel())
+        cube.data = cube.lazy_data()
+        with mock.patch('iris.analysis.cartography.area_weights',
+                        wraps=iris.analysis.cartography.area_weights) as func:
+            results = [area_statistics(cube, 'mean') for _ in range(2)]
+        func.assert_called_once()
+        for result in results:
+            self.assertTrue(result.has_lazy_data())
+            np.testing.assert_allclose(result.data, expected)
+
+    @mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+    def test_area_statistics_fx_file(self):
+        """Test that grid areas from a file are loaded once."""
+        cube = iris.cube.Cube(
+            np.arange(50.).reshape(2, 5, 5),
+            dim_coords_and_dims=[
+                (iris.coords.DimCoord([0., 1.], standard_name='time',
+                                      units='days since 1950-01-01'), 0),
+                (self.grid.coord('latitude'), 1),
+                (self.grid.coord('longitude'), 2),
+            ])
+        areas = self.grid.copy(np.arange(1., 26.).reshape(5, 5))
+        areas.var_name = 'areacella'
+        expected = np.average(cube.data.reshape(2, 25), axis=-1,
+                              weights=areas.data.ravel())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fx_file = os.path.join(tmp_dir, 'areacella.nc')
+            iris.save(areas, fx_file)
+            fx_files = {'areacella': fx_file}
+            with mock.patch('iris.load_cube', wraps=iris.load_cube) as func:
+                results = [
+                    area_statistics(cube, 'mean', fx_files=fx_files)
+                    for _ in range(2)
+                ]
+        func.assert_called_once()
+        for result in results:
+            np.testing.assert_allclose(result.data, expected)
+
     def test_extract_region(self):
         """Test for extracting a region from a 2D field."""
         result = extract_region(self.grid, 1.5, 2.5, 1.5, 2.5)
@@ -491,5 +549,175 @@ def test_extract_shape_wrong_method_raises():
                              "'contains', 'representative'.")
 
 
+@pytest.mark.parametrize('enabled', [True, False])
+@mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+def test_area_statistics_cache_area_weights(make_testcube, cache_dir,
+                                            enabled):
+    """Test that cell areas are only stored if enabled by the user."""
+    with mock.patch.dict('esmvalcore._cache.CFG_USER',
+                         {'cache_area_weights': enabled}):
+        area_statistics(make_testcube, 'mean')
+
+    assert os.path.exists(os.path.join(cache_dir, 'area_weights')) is enabled
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+@mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+@mock.patch.dict(_area._REGION_WEIGHTS_CACHE, clear=True)
+def test_region_statistics_shapes(make_testcube, square_composite_shape,
+                                  tmp_path, lazy):
+    """Test that the statistics of shapes match `area_statistics`."""
+    cube = make_testcube
+    cube.data = np.ma.masked_array(np.arange(25.).reshape(5, 5),
+                                   mask=np.eye(5, dtype=bool))
+    shapefile = tmp_path / 'test_shape.shp'
+    expected = area_statistics(
+        extract_shape(cube.copy(), shapefile, crop=False, decomposed=True),
+        'mean')
+    if lazy:
+        cube.data = da.from_array(cube.data, chunks=(2, 5))
+
+    result = region_statistics(cube, 'mean', shapefile=shapefile)
+
+    assert result.has_lazy_data() is lazy
+    assert result.shape == (square_composite_shape.shape[0], )
+    np.testing.assert_allclose(result.data, np.ravel(expected.data))
+    np.testing.assert_array_equal(result.coord('region').points,
+                                  range(square_composite_shape.shape[0]))
+
+
+@mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+@mock.patch.dict(_area._REGION_WEIGHTS_CACHE, clear=True)
+def test_region_statistics_fractional_shape(make_testcube, tmp_path):
+    """Test that cells are weighted by the fraction inside the shape."""
+    write_shapefile(Polygon([(1., 1.), (1., 3.), (2.5, 3.), (2.5, 1.)]),
+                    tmp_path / 'test_shape.shp')
+    areas = iris.analysis.cartography.area_weights(make_testcube)
+
+    result = region_statistics(make_testcube,
+                               'sum',
+                               shapefile=tmp_path / 'test_shape.shp',
+                               fractional=True)
+
+    expected = areas[1:3, 1].sum() + 0.5 * areas[1:3, 2].sum()
+    np.testing.assert_allclose(result.data, [expected])
+
+
+@pytest.mark.parametrize('fractional,expected', [
+    (False, 340.),
+    (True, (.5 * 325. + 335. + 345.) / 2.5),
+])
+@mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+@mock.patch.dict(_area._REGION_WEIGHTS_CACHE, clear=True)
+def test_region_statistics_negative_longitude_shape(tmp_path, fractional,
+                                                    expected):
+    """Test a shape at negative longitudes on a 0 to 360 degrees grid."""
+    lons = iris.coords.DimCoord(np.linspace(5., 355., 36),
+                                standard_name='longitude',
+                                units='degrees_east')
+    lats = iris.coords.DimCoord(np.linspace(-85., 85., 18),
+                                standard_name='latitude',
+                                units='degrees_north')
+    lons.guess_bounds()
+    lats.guess_bounds()
+    cube = iris.cube.Cube(np.broadcast_to(lons.points, (18, 36)),
+                          dim_coords_and_dims=[(lats, 0), (lons, 1)])
+    write_shapefile(Polygon([(-35., 0.), (-35., 20.), (-10., 20.),
+                             (-10., 0.)]), tmp_path / 'test_shape.shp')
+
+    result = region_statistics(cube,
+                               'mean',
+                               shapefile=tmp_path / 'test_shape.shp',
+                               fractional=fractional)
+
+    np.testing.assert_allclose(np.ma.filled(result.data, np.nan), [expected])
+
+
+@mock.patch.dict(_area._GRID_AREAS_CACHE, clear=True)
+@mock.patch.dict(_area._REGION_WEIGHTS_CACHE, clear=True)
+def test_region_statistics_boxes():
+    """Test the statistics of boxes on a 3D cube and caching of weights."""
+    cube = iris.cube.Cube(
+        np.arange(3. * 18 * 36).reshape(3, 18, 36),
+        dim_coords_and_dims=[
+            (iris.coords.DimCoord([0., 1., 2.], standard_name='time',
+                                  units='days since 1950-01-01'), 0),
+            (iris.coords.DimCoord(np.linspace(-85., 85., 18),
+                                  standard_name='latitude',
+                                  units='degrees_north'), 1),
+            (iris.coords.DimCoord(np.linspace(5., 355., 36),
+                                  standard_name='longitude',
+                                  units='degrees_east'), 2),
+        ])
+    regions = {
+        'tropics': {
+            'start_longitude': 0.,
+            'end_longitude': 360.,
+            'start_latitude': -30.,
+            'end_latitude': 30.,
+        },
+        'europe': {
+            'start_longitude': -10.,
+            'end_longitude': 40.,
+            'start_latitude': 35.,
+            'end_latitude': 70.,
+        },
+    }
+    cube.coord('latitude').guess_bounds()
+    cube.coord('longitude').guess_bounds()
+    expected = [
+        area_statistics(extract_region(cube.copy(), **box), 'mean').data
+        for box in regions.values()
+    ]
+    cube.data = cube.lazy_data()
+
+    with mock.patch.object(_area,
+                           '_get_region_fractions',
+                           wraps=_area._get_region_fractions) as func:
+        results = [
+            region_statistics(cube, 'mean', regions=regions)
+            for _ in range(2)
+        ]
+
+    func.assert_called_once()
+    for result in results:
+        assert result.has_lazy_data()
+        assert result.shape == (3, 2)
+        assert result.cell_methods[-1].method == 'mean'
+        np.testing.assert_array_equal(result.coord('region').points,
+                                      ['tropics', 'europe'])
+        np.testing.assert_allclose(result.data, np.stack(expected, axis=-1))
+
+
+def test_region_statistics_fractional_box(make_testcube):
+    """Test that cells are weighted by the fraction inside the box."""
+    box = {
+        'start_longitude': 1.5,
+        'end_longitude': 3.,
+        'start_latitude': 0.,
+        'end_latitude': 1.,
+    }
+    areas = iris.analysis.cartography.area_weights(make_testcube)
+
+    result = region_statistics(make_testcube,
+                               'sum',
+                               regions={'box': box},
+                               fractional=True)
+
+    expected = 0.5 * areas[0, 1] + areas[0, 2]
+    np.testing.assert_allclose(result.data, [expected])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    {'shapefile': 'test.shp', 'regions': {}},
+    {'regions': {}, 'operator': 'median'},
+])
+def test_region_statistics_raises(make_testcube, kwargs):
+    """Test that invalid arguments raise an error."""
+    with pytest.raises(ValueError):
+        region_statistics(make_testcube, **kwargs)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+"""Unit tests for the :mod:`esmvalcore.preprocessor._rolling_window`."""
+import dask.array as da
+import iris.analysis
+import iris.coords
+import numpy as np
+import pytest
+from cf_units import Unit
+from iris.cube import Cube
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+
+from esmvalcore.preprocessor._rolling_window import rolling_window_statistics
+
+
+def _create_sample_cube(data):
+    cube = Cube(data, var_name='tas', units='K')
+    cube.add_dim_coord(
+        iris.coords.DimCoord(
+            np.arange(data.shape[1]) + 0.5,
+            standard_name='time',
+            units=Unit('days since 1950-01-01 00:00:00',
+                       calendar='gregorian'),
+        ),
+        1,
+    )
+    cube.add_dim_coord(
+        iris.coords.DimCoord(
+            np.arange(data.shape[0]),
+            standard_name='latitude',
+            units='degrees',
+        ),
+        0,
+    )
+    return cube
+
+
+def _get_sample_data():
+    data = np.arange(60.).reshape(2, 30) ** 1.5
+    data[0, 3] = -5.
+    data[1, 17] = 1000.
+    return np.ma.masked_array(data, mask=np.arange(60).reshape(2, 30) % 7 == 0)
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+@pytest.mark.parametrize('operator', ['mean', 'sum', 'min', 'max'])
+@pytest.mark.parametrize('window_length', [2, 5, 13])
+def test_rolling_window_statistics(lazy, operator, window_length):
+    """Test that the result is the same as the one of iris."""
+    data = _get_sample_data()
+    cube = _create_sample_cube(data)
+    expected = cube.rolling_window('time',
+                                   getattr(iris.analysis, operator.upper()),
+                                   window_length)
+    if lazy:
+        cube.data = da.from_array(data, chunks=(1, 4))
+
+    result = rolling_window_statistics(cube, 'time', operator, window_length)
+
+    assert result.has_lazy_data() is lazy
+    assert result.shape == (2, 31 - window_length)
+    assert_array_almost_equal(result.data, expected.data)
+    assert_array_equal(np.ma.getmaskarray(result.data),
+                       np.ma.getmaskarray(expected.data))
+    assert result.coord('time') == expected.coord('time')
+    assert result.cell_methods == expected.cell_methods
+
+
+def test_rolling_window_statistics_all_masked():
+    """Test that windows without valid values are masked."""
+    data = np.ma.masked_array(np.ones((1, 6)), mask=[[0, 1, 1, 1, 0, 0]])
+    cube = _create_sample_cube(data)
+
+    result = rolling_window_statistics(cube, window_length=3)
+
+    assert_array_equal(result.data.mask, [[False, True, False, False]])
+    assert_array_equal(result.data.data[:, 2:], [[1., 1.]])
+
+
+def test_rolling_window_statistics_non_finite():
+    """Test that non-finite values only affect their own windows."""
+    data = np.array([[1., np.nan, 1., 1., np.inf, 1., 1.]])
+    cube = _create_sample_cube(data)
+
+    result = rolling_window_statistics(cube, operator='sum', window_length=2)
+
+    assert_array_equal(result.data, [[np.nan, np.nan, 2., np.inf, np.inf,
+                                      2.]])
+
+
+def test_rolling_window_statistics_median():
+    """Test operators that are not computed lazily."""
+    cube = _create_sample_cube(_get_sample_data())
+    expected = cube.rolling_window('time', iris.analysis.MEDIAN, 5)
+
+    result = rolling_window_statistics(cube, operator='median')
+
+    assert result == expected
+
+
+@pytest.mark.parametrize('window_length', [1, 31])
+def test_rolling_window_statistics_invalid_window(window_length):
+    """Test that invalid window lengths raise an error."""
+    cube = _create_sample_cube(_get_sample_data())
+    with pytest.raises(ValueError):
+        rolling_window_statistics(cube, window_length=window_length)
@@ -1,9 +1,12 @@
 """Unit tests for the :func:`esmvalcore.preprocessor._time` module."""
 
 import unittest
+from unittest import mock
+
 import pytest
 import tests
 
+import dask.array as da
 import numpy as np
 from numpy.testing import assert_array_equal
 
@@ -18,8 +21,9 @@ from esmvalcore.preprocessor._time import (
     regrid_time,
     decadal_statistics, annual_statistics, seasonal_statistics,
     monthly_statistics, daily_statistics,
-    climate_statistics, anomalies
+    climate_statistics, anomalies, get_time_weights
 )
+from esmvalcore.preprocessor import _time
 
 
 def _create_sample_cube():
@@ -57,6 +61,15 @@ class TestExtractMonth(tests.Test):
             np.array([1, 1]),
             sliced.coord('month_number').points)
 
+    def test_get_january_lazy(self):
+        """Test january extraction from a lazy cube without month coord."""
+        cube = _create_sample_cube()
+        cube.remove_coord('month_number')
+        cube.data = cube.lazy_data()
+        sliced = extract_month(cube, 1)
+        self.assertTrue(sliced.has_lazy_data())
+        assert_array_equal(np.array([15., 375.]), sliced.coord('time').points)
+
     def test_bad_month_raises(self):
         """Test january extraction"""
         with self.assertRaises(ValueError):
@@ -97,6 +110,19 @@ class TestTimeSlice(tests.Test):
             np.arange(0, 360),
             sliced.coord('time').points)
 
+    def test_extract_time_lazy(self):
+        """Test extract_time returns a lazy slice."""
+        cube = self.cube.copy(self.cube.lazy_data())
+        sliced = extract_time(cube, 1950, 3, 1, 1950, 5, 17)
+        self.assertTrue(sliced.has_lazy_data())
+        assert_array_equal(np.array([3, 4, 5]), sliced.data)
+
+    def test_extract_time_one_point(self):
+        """Test extract_time removes time if a single point is selected."""
+        sliced = extract_time(self.cube, 1950, 3, 1, 1950, 4, 1)
+        self.assertEqual(sliced.shape, ())
+        assert_array_equal(np.array([75.]), sliced.coord('time').points)
+
     def test_extract_time_no_slice(self):
         """Test fail of extract_time."""
         with self.assertRaises(ValueError):
@@ -139,6 +165,19 @@ class TestExtractSeason(tests.Test):
             np.array([1, 2, 12, 1, 2, 12]),
             sliced.coord('month_number').points)
 
+    def test_get_djf_lazy(self):
+        """Test function for winter does not modify a lazy input cube"""
+        cube = self.cube.copy(self.cube.lazy_data())
+        sliced = extract_season(cube, 'djf')
+        self.assertTrue(sliced.has_lazy_data())
+        assert_array_equal(np.array([1, 2, 12, 13, 14, 24]), sliced.data)
+        assert_array_equal(
+            np.array([1950, 1950, 1951, 1951, 1951, 1952]),
+            sliced.coord('season_year').points)
+        assert_array_equal(
+            np.unique(sliced.coord('clim_season').points), ['djf'])
+        self.assertFalse(cube.coords('clim_season'))
+
     def test_get_mam(self):
         """Test function for spring"""
         sliced = extract_season(self.cube, 'mam')
@@ -244,6 +283,21 @@ class TestClimatology(tests.Test):
         expected = np.array([211.])
         assert_array_equal(result.data, expected)
 
+    def test_time_mean_lazy(self):
+        """Test for time average of a lazy 2D field with uneven bounds."""
+        data = da.from_array(np.array([[1., 2.], [5., 6.]]), chunks=(1, 2))
+        times = np.array([5., 25.])
+        bounds = np.array([[0., 1.], [1., 4.]])
+        cube = self._create_cube(data, times, bounds)
+
+        weights = get_time_weights(cube)
+        self.assertIsInstance(weights, da.Array)
+        self.assertEqual(weights.chunks, data.chunks)
+
+        result = climate_statistics(cube, operator='mean')
+        self.assertTrue(result.has_lazy_data())
+        assert_array_equal(result.data, np.array([4., 5.]))
+
     def test_season_climatology(self):
         """Test for time avg of a realisitc time axis and 365 day calendar"""
         data = np.ones((6, ))
@@ -522,6 +576,37 @@ class TestDailyStatistics(tests.Test):
         expected = np.array([6., 22.])
         assert_array_equal(result.data, expected)
 
+    def test_mean_lazy(self):
+        """Test average of a lazy field with hourly data."""
+        data = da.arange(48 * 2, chunks=10).reshape(48, 2)
+        times = np.arange(0.5, 48)
+        cube = self._create_cube(data, times)
+
+        result = daily_statistics(cube, 'mean')
+        self.assertTrue(result.has_lazy_data())
+        expected = np.array([[23., 24.], [71., 72.]])
+        assert_array_equal(result.data, expected)
+        assert_array_equal(result.coord('time').bounds, [[0., 24.],
+                                                         [24., 48.]])
+        self.assertFalse(result.coords('day_of_year'))
+
+    def test_irregular_masked(self):
+        """Test statistics of masked data with missing time points."""
+        data = np.ma.masked_equal([1., 2., 3., 9., 4., 5.], 9.)
+        times = np.array([1., 7., 13., 19., 30., 36.])
+        for lazy in (False, True):
+            cube = self._create_cube(data, times)
+            if lazy:
+                cube.data = cube.lazy_data().rechunk(2)
+            for operator, expected in [('mean', [2., 4.5]),
+                                       ('sum', [6., 9.]),
+                                       ('min', [1., 4.]),
+                                       ('max', [3., 5.]),
+                                       ('median', [2., 4.5])]:
+                result = daily_statistics(cube, operator)
+                self.assertEqual(result.has_lazy_data(), lazy)
+                assert_array_equal(result.data, expected)
+
 
 class TestRegridTimeYearly(tests.Test):
     """Tests for regrid_time with monthly frequency."""
@@ -605,6 +690,29 @@ class TestRegridTimeMonthly(tests.Test):
         diff_cube = newcube_2 - newcube_1
         assert_array_equal(diff_cube.data, expected)
 
+    def test_regrid_time_mon_360_day(self):
+        """Test monthly regridding with a 360 day calendar."""
+        cube = Cube(np.arange(24), var_name='co2', units='J')
+        cube.add_dim_coord(
+            iris.coords.DimCoord(
+                np.arange(24) * 30. + 3.5,
+                standard_name='time',
+                units=Unit('days since 1950-01-01', calendar='360_day'),
+            ),
+            0,
+        )
+        newcube = regrid_time(cube, frequency='mon')
+        assert_array_equal(newcube.coord('time').points,
+                           np.arange(24) * 30. + 14.)
+        assert_array_equal(newcube.coord('day_of_month').points, 15)
+        assert_array_equal(newcube.coord('day_of_year').points[:13],
+                           np.append(np.arange(12) * 30 + 15, 15))
+
+    def test_regrid_time_invalid_frequency(self):
+        """Test regrid_time with an unsupported frequency."""
+        with self.assertRaises(ValueError):
+            regrid_time(self.cube_1, frequency='fx')
+
 
 class TestRegridTimeDaily(tests.Test):
     """Tests for regrid_time with daily frequency."""
@@ -838,6 +946,44 @@ def test_annual_sum(existing_coord):
     assert_array_equal(result.coord('time').points, expected_time)
 
 
+@pytest.mark.parametrize('lazy', [True, False])
+def test_annual_average_weighted(lazy):
+    """Test for annual average weighted by the length of the months."""
+    cube = make_time_series(number_years=2)
+    bounds = cube.coord('time').bounds.astype(float)
+    bounds[1:12, 0] -= 1.
+    bounds[:11, 1] -= 1.
+    cube.coord('time').bounds = bounds
+    data = np.ma.masked_equal(np.arange(24.), 13.)
+    cube.data = da.from_array(data, chunks=5) if lazy else data
+
+    result = annual_statistics(cube)
+    assert result.has_lazy_data() is lazy
+    weights = bounds[:, 1] - bounds[:, 0]
+    weights[13] = 0.
+    expected = [np.average(data.data[:12], weights=weights[:12]),
+                np.average(data.data[12:], weights=weights[12:])]
+    np.testing.assert_allclose(result.data, expected)
+    assert expected[0] != np.mean(data[:12])
+
+    result = annual_statistics(cube, 'sum')
+    assert_array_equal(result.data, data.reshape(2, 12).sum(axis=1))
+
+
+def test_annual_average_weighted_fallback():
+    """Test weighted annual average of a cube with a cell measure."""
+    cube = make_time_series(number_years=2)
+    cube.coord('time').bounds = cube.coord('time').bounds * [[1., 1.01]]
+    cube.data = np.arange(24.)
+    cube.add_cell_measure(
+        iris.coords.CellMeasure(np.ones(24), measure='area'), 0)
+    expected = annual_statistics(cube.copy(np.arange(24.)))
+
+    result = annual_statistics(cube)
+    np.testing.assert_allclose(result.data, expected.data)
+    assert result.cell_methods == expected.cell_methods
+
+
 @pytest.mark.parametrize('existing_coord', [True, False])
 def test_decadal_average(existing_coord):
     """Test for decadal average."""
@@ -954,5 +1100,79 @@ def test_anomalies(period):
     assert_array_equal(result.coord('time').points, cube.coord('time').points)
 
 
+@pytest.mark.parametrize('period', ['day', 'month', 'season'])
+def test_anomalies_lazy(period):
+    cube = make_map_data(number_years=2)
+    expected = anomalies(cube.copy(), period)
+    cube.data = cube.lazy_data().rechunk((1, 2, 100))
+    result = anomalies(cube, period)
+    assert result.has_lazy_data()
+    assert_array_equal(result.data, expected.data)
+
+
+@mock.patch.dict(_time._CLIMATOLOGY_CACHE, clear=True)
+def test_anomalies_reuse_climatology():
+    """Test that the climatology is computed once for the same data."""
+    cube = make_map_data(number_years=2)
+    with mock.patch.object(_time,
+                           '_compute_climatology',
+                           wraps=_time._compute_climatology) as compute:
+        climatology = climate_statistics(cube.copy(), period='month')
+        result = anomalies(cube.copy(), 'month')
+        expected = anomalies(cube.copy(), 'day')
+        assert compute.call_count == 2
+        cube.data = cube.data + 1.
+        anomalies(cube.copy(), 'month')
+        assert compute.call_count == 3
+
+    assert climatology.shape == (2, 2, 12)
+    assert_array_equal(result.data[..., :30],
+                       cube.data[..., :30] - 1. -
+                       climatology.data[..., :1])
+    assert expected.shape == cube.shape
+
+
+@mock.patch.dict(_time._CLIMATOLOGY_CACHE, clear=True)
+def test_climate_statistics_cache_dir(tmp_path):
+    """Test that climatologies are stored in the cache directory."""
+    cube = make_map_data(number_years=2)
+    cfg = {'cache_dir': str(tmp_path), 'cache_climatologies': True}
+    with mock.patch.dict('esmvalcore._cache.CFG_USER', cfg):
+        expected = climate_statistics(cube.copy(), 'max', 'season')
+        _time._CLIMATOLOGY_CACHE.clear()
+        with mock.patch.object(_time, '_compute_climatology') as compute:
+            result = climate_statistics(cube.copy(), 'max', 'season')
+        compute.assert_not_called()
+
+    assert len(list((tmp_path / 'climatologies').iterdir())) == 1
+    assert result == expected
+
+
+@mock.patch.dict(_time._CLIMATOLOGY_CACHE, clear=True)
+def test_climate_statistics_cache_dir_lazy(tmp_path):
+    """Test that climatologies of lazy data are stored by input file."""
+    cube = make_map_data(number_years=2)
+    cube.data = cube.lazy_data()
+    input_file = tmp_path / 'input.nc'
+    input_file.write_text('data')
+    cache_dir = tmp_path / 'cache'
+    cfg = {'cache_dir': str(cache_dir), 'cache_climatologies': True}
+    with mock.patch.dict('esmvalcore._cache.CFG_USER', cfg):
+        climate_statistics(cube.copy(), 'max', 'season')
+        assert not cache_dir.exists()
+        with _time._climatology_input_files([str(input_file)]):
+            for content in ('data', 'modified data'):
+                _time._CLIMATOLOGY_CACHE.clear()
+                input_file.write_text(content)
+                with mock.patch.object(
+                        _time,
+                        '_compute_climatology',
+                        wraps=_time._compute_climatology) as compute:
+                    climate_statistics(cube.copy(), 'max', 'season')
+                compute.assert_called_once()
+
+    assert len(list((cache_dir / 'climatologies').iterdir())) == 2
+
+
 if __name__ == '__main__':
     unittest.main()
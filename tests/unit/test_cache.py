@@ -0,0 +1,29 @@
+"""Unit tests for :mod:`esmvalcore._cache`."""
+import dask.array as da
+import numpy as np
+
+from esmvalcore._cache import get_array_fingerprint
+
+
+def test_get_array_fingerprint_none():
+    assert get_array_fingerprint(None) is None
+
+
+def test_get_array_fingerprint_values():
+    array = np.arange(4.)
+    assert get_array_fingerprint(array) == get_array_fingerprint(array.copy())
+    assert get_array_fingerprint(array) != get_array_fingerprint(array + 1.)
+    assert (get_array_fingerprint(array) != get_array_fingerprint(
+        array.astype(np.float32)))
+
+
+def test_get_array_fingerprint_mask():
+    array = np.ma.masked_array(np.arange(4.), mask=[False, True, False, True])
+    other = np.ma.masked_array(array.data, mask=[True, False, False, False])
+    assert get_array_fingerprint(array) != get_array_fingerprint(other)
+    assert get_array_fingerprint(array) != get_array_fingerprint(array.data)
+
+
+def test_get_array_fingerprint_lazy():
+    array = da.arange(4., chunks=2)
+    assert get_array_fingerprint(array) == array.name
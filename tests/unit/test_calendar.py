@@ -0,0 +1,53 @@
+"""Unit tests for :mod:`esmvalcore._calendar`."""
+import cf_units
+import numpy as np
+import pytest
+
+from esmvalcore._calendar import get_time_components
+
+CALENDARS = [
+    'standard',
+    'gregorian',
+    'proleptic_gregorian',
+    'julian',
+    'noleap',
+    '365_day',
+    'all_leap',
+    '366_day',
+    '360_day',
+]
+
+
+def get_expected(points, units):
+    """Get the components from date objects."""
+    dates = units.num2date(points)
+    return (
+        [d.year for d in dates],
+        [d.month for d in dates],
+        [d.day for d in dates],
+        [d.hour * 3600 + d.minute * 60 + d.second for d in dates],
+    )
+
+
+@pytest.mark.parametrize('calendar', CALENDARS)
+@pytest.mark.parametrize('origin', [
+    'days since 1850-01-01 00:00:00',
+    'hours since 1990-03-01 06:00:00',
+    'days since 1500-01-01',
+])
+def test_get_time_components(calendar, origin):
+    units = cf_units.Unit(origin, calendar=calendar)
+    points = np.linspace(-1e5, 2e5, 1001)
+    if origin.startswith('hours'):
+        points *= 24
+    result = get_time_components(points, units)
+    expected = get_expected(points, units)
+    for values, expected_values in zip(result, expected):
+        assert values.dtype == np.int64
+        np.testing.assert_array_equal(values, expected_values)
+
+
+def test_get_time_components_empty():
+    units = cf_units.Unit('days since 1850-01-01', calendar='standard')
+    result = get_time_components([], units)
+    assert [len(values) for values in result] == [0, 0, 0, 0]